@@ -0,0 +1,264 @@
+"""
+SakhiCircle: Batched Audit Log Writer
+Prediction audit records are queued in memory and written by one background
+task with insert_many, so /predict never waits on a MongoDB write.
+
+A batch is flushed when it reaches batch_size records or flush_interval
+seconds after its first record, whichever comes first. When the queue is full,
+callers wait briefly (backpressure) and then spill the record to a bounded
+JSON-lines file. Batches that fail to insert are spilled too, and the file is
+replayed into MongoDB once writes succeed again. stop() drains the queue.
+
+Several worker processes may share one spill file: appends and the hand-over
+to replay take a short file lock, and only one process replays at a time.
+(Locking needs fcntl; on Windows run a single worker or give each its own
+spill path.)
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+
+from bson import json_util
+
+from file_lock import file_lock
+
+
+class AuditLogger:
+    """
+    Background batch writer for audit records.
+
+    insert is an async callable taking a list of documents (e.g. a repository's
+    insert_many); it should raise when the database is unavailable.
+    """
+
+    def __init__(self, insert: Callable[[list], Awaitable], batch_size: int = 100,
+                 flush_interval: float = 1.0, max_queue: int = 10000, enqueue_timeout: float = 0.05,
+                 spill_path: Optional[str] = None, spill_max_bytes: int = 50 * 1024 * 1024,
+                 retry_interval: float = 30.0):
+        self.insert = insert
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.retry_interval = retry_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._next_replay = 0.0
+        self.logged = 0
+        self.written = 0
+        self.batches = 0
+        self.insert_failures = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the flush task on the running event loop."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closing = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything still queued, then stop. Records left after the timeout are spilled."""
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            print("⚠️ Audit log drain timed out; spilling the rest to disk")
+            self._task.cancel()
+            rest = []
+            while not self._queue.empty():
+                rest.append(self._queue.get_nowait())
+            await self._spill(rest)
+        self._task = None
+
+    # ---------- producers ----------
+
+    async def log(self, entry: dict):
+        """Queue one record. Waits at most enqueue_timeout when the queue is full, then spills it."""
+        self.logged += 1
+        if self._task is None or self._closing:
+            # Not running (startup failed or shutting down): keep the record on disk
+            await self._spill([entry])
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(entry), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                await self._spill([entry])
+
+    async def log_many(self, entries: list):
+        for entry in entries:
+            await self.log(entry)
+
+    # ---------- consumer ----------
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not (self._closing and self._queue.empty()):
+            batch = []
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._closing:
+                    # Draining: take what is queued without waiting for more
+                    if self._queue.empty():
+                        break
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            if batch:
+                await self._flush(batch)
+            elif self._spill_pending() and loop.time() >= self._next_replay:
+                await self._replay()
+
+    async def _flush(self, batch: list):
+        try:
+            await self.insert(batch)
+        except Exception as e:
+            self.insert_failures += 1
+            if self.insert_failures == 1 or self.insert_failures % 100 == 0:
+                print(f"⚠️ Audit log write failed ({self.insert_failures} batches so far): {e}")
+            await self._spill(batch)
+            self._next_replay = asyncio.get_running_loop().time() + self.retry_interval
+            return
+        self.written += len(batch)
+        self.batches += 1
+        if self._spill_pending() and not self._closing:
+            # Writes work again: bring back whatever was spilled while they did not
+            await self._replay()
+
+    # ---------- spill file ----------
+
+    @property
+    def _replay_path(self) -> str:
+        return f"{self.spill_path}.replay"
+
+    @property
+    def _lock_path(self) -> str:
+        return f"{self.spill_path}.lock"
+
+    def _spill_pending(self) -> bool:
+        return bool(self.spill_path) and (
+            os.path.exists(self.spill_path) or os.path.exists(self._replay_path)
+        )
+
+    async def _spill(self, entries: list):
+        """
+        Append records to the spill file, dropping what does not fit under
+        spill_max_bytes. The file lock and the write run on a thread, so
+        waiting for another worker's spill never blocks the event loop.
+        """
+        if not entries:
+            return
+        if not self.spill_path:
+            self.dropped += len(entries)
+            return
+        try:
+            spilled = await asyncio.to_thread(self._append_lines, entries)
+        except OSError as e:
+            print(f"⚠️ Audit log spill failed: {e}")
+            spilled = 0
+        self.spilled += spilled
+        self.dropped += len(entries) - spilled
+
+    def _append_lines(self, entries: list) -> int:
+        """Append entries under the spill lock; returns how many fit."""
+        written = 0
+        with file_lock(self._lock_path), open(self.spill_path, "a", encoding="utf-8") as f:
+            size = f.tell()
+            for entry in entries:
+                line = json_util.dumps(entry) + "\n"
+                if size + len(line) > self.spill_max_bytes:
+                    continue
+                f.write(line)
+                size += len(line)
+                written += 1
+        return written
+
+    def _claim_spill(self) -> bool:
+        """Move the spill file aside for replay, unless another worker already took it."""
+        with file_lock(self._lock_path):
+            if not os.path.exists(self.spill_path):
+                return False
+            os.replace(self.spill_path, self._replay_path)
+            return True
+
+    @staticmethod
+    def _read_lines(path: str) -> list:
+        with open(path, encoding="utf-8") as f:
+            return [json_util.loads(line) for line in f if line.strip()]
+
+    @staticmethod
+    def _write_lines(path: str, entries: list):
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json_util.dumps(entry) + "\n" for entry in entries)
+
+    async def _replay(self):
+        """Insert spilled records. New spills go to a fresh file while the old one is replayed."""
+        with file_lock(f"{self._replay_path}.lock", blocking=False) as acquired:
+            if not acquired:
+                # Another worker is replaying the shared file
+                self._next_replay = asyncio.get_running_loop().time() + self.retry_interval
+                return
+            if not os.path.exists(self._replay_path) and not await asyncio.to_thread(self._claim_spill):
+                return
+            entries = await asyncio.to_thread(self._read_lines, self._replay_path)
+            for i in range(0, len(entries), self.batch_size):
+                try:
+                    await self.insert(entries[i:i + self.batch_size])
+                except Exception:
+                    # Keep only what was not written, and try again later
+                    await asyncio.to_thread(self._write_lines, self._replay_path, entries[i:])
+                    self._next_replay = asyncio.get_running_loop().time() + self.retry_interval
+                    return
+                self.replayed += len(entries[i:i + self.batch_size])
+            await asyncio.to_thread(os.remove, self._replay_path)
+
+    # ---------- metrics ----------
+
+    @property
+    def queue_depth(self) -> int:
+        """Records waiting for the writer task."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict:
+        """Counters for /health."""
+        spill_bytes = 0
+        if self.spill_path:
+            for path in (self.spill_path, self._replay_path):
+                if os.path.exists(path):
+                    spill_bytes += os.path.getsize(path)
+        return {
+            "running": self._task is not None,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "logged": self.logged,
+            "written": self.written,
+            "batches": self.batches,
+            "insert_failures": self.insert_failures,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "spill_bytes": spill_bytes
+        }
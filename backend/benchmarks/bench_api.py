@@ -0,0 +1,114 @@
+"""
+SakhiCircle: End-to-End API Benchmark
+Runs the FastAPI app in process behind httpx's ASGI transport (no server, no
+sockets), seeds loan_requests at each requested size and drives the
+load_test.py scenarios against it: authenticated loan listings, /predict and
+/health, with many concurrent clients.
+
+    python benchmarks/bench_api.py [--docs 1000 10000] [--scenarios reads predict] [--json out.json]
+    python benchmarks/bench_api.py --mongo-uri mongodb://localhost:27017 --docs 1000 100000 1000000
+
+Without --mongo-uri the database is mongomock (see mongo_fixtures.py). It
+scans collections in Python, so use it for the API's own overhead at small
+sizes and a local mongod for the 100k / 1M runs. With --mongo-uri the data
+goes into --db-name (default sakhiscore_bench), whose loan_requests
+collection is replaced.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+import load_test
+from common import BACKEND_DIR, write_results
+from mongo_fixtures import MongomockAsyncClient, seed_loan_requests
+
+sys.path.insert(0, BACKEND_DIR)
+
+
+def configure_environment(args, work_dir: str):
+    """API settings for a self-contained run; must happen before main is imported."""
+    os.environ.update({
+        "MONGO_URI": args.mongo_uri or "mongodb://mongomock",
+        "ENABLE_DEFAULT_USERS": "true",
+        "BACKGROUND_STARTUP": "false",
+        "MODEL_WATCH_INTERVAL": "0",
+        "MODEL_REGISTRY_DIR": os.path.join(work_dir, "models"),
+        "EXPLANATION_STORE": "local",
+        "EXPLANATION_STORE_DIR": os.path.join(work_dir, "explanations"),
+        "AUDIT_SPILL_PATH": os.path.join(work_dir, "audit_spill.jsonl"),
+        # Sampled timing lines would interleave with the results
+        "TIMING_LOG_SAMPLE_RATE": "0",
+    })
+
+
+async def run(args) -> list:
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as api
+    api.DB_NAME = args.db_name
+    if not args.mongo_uri:
+        client = MongomockAsyncClient()
+
+        async def connect_mongomock(uri, **kwargs):
+            return client
+        api.connect_mongo = connect_mongomock
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await api.startup_event()
+    try:
+        for name, component in api.readiness.items():
+            if component["status"] != "ready":
+                raise SystemExit(f"❌ {name} not ready: {component['error']}")
+        member = api.session_user(await api.repos.users.find_by_username("lakshmi"))
+        transport = httpx.ASGITransport(app=api.app)
+
+        results = []
+        for n_docs in args.docs:
+            seed_seconds = await seed_loan_requests(api.db, n_docs, member)
+            print(f"🌱 {n_docs:,} loan_requests seeded in {seed_seconds:.1f} s")
+            for scenario in args.scenarios:
+                result = await load_test.run_target(
+                    "http://bench", scenario, args.concurrency, args.duration, args.warmup, transport=transport
+                )
+                del result["url"]
+                result.update(docs=n_docs, database="mongod" if args.mongo_uri else "mongomock")
+                results.append(result)
+                print(f"{'✅' if not result['errors'] else '⚠️'} {n_docs:>9,} docs [{scenario}] "
+                      f"{result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+                      f"p99 {result['latency_ms']['p99']} ms, {result['errors']} errors "
+                      f"{' '.join(result['error_kinds'])}")
+        return results
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await api.shutdown_event()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process ASGI load test against seeded data")
+    parser.add_argument("--mongo-uri", help="Local mongod to use instead of mongomock")
+    parser.add_argument("--db-name", default="sakhiscore_bench", help="Database seeded with --mongo-uri")
+    parser.add_argument("--docs", type=int, nargs="+",
+                        help="loan_requests sizes (default 1k/100k/1M with --mongo-uri, else 1k/10k)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(load_test.SCENARIOS),
+                        default=["reads", "predict", "health"])
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each run")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+    args.docs = args.docs or ([1_000, 100_000, 1_000_000] if args.mongo_uri else [1_000, 10_000])
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(args, work_dir)
+        results = asyncio.run(run(args))
+    print(f"⏱️ {time.perf_counter() - started:.1f} s")
+    if args.json_path:
+        write_results(args.json_path, "api", results)
@@ -0,0 +1,134 @@
+"""
+SakhiCircle: Hot Path Microbenchmarks
+Times the per-request work behind the busiest endpoints in process, without
+HTTP or MongoDB:
+
+    predict        model probability for one row (/predict)
+    shap           SHAP values for one row
+    explain        explain_rows() for one row, explanation cache miss and hit
+    png            SHAP waterfall PNG render, median of --png-renders (/predict?include_image=true)
+    verify_token   signed-token check, and the session-cache hit of opaque tokens
+    loan_json      encoding N loan_requests documents the way the list endpoints stream them
+
+    python benchmarks/bench_hot_paths.py [--only predict shap] [--loan-docs 100 500 10000] [--json out.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta
+
+from common import BACKEND_DIR, time_call, write_results
+from mongo_fixtures import loan_request_document
+
+sys.path.insert(0, BACKEND_DIR)
+
+BENCHMARKS = ["predict", "shap", "explain", "png", "verify_token", "loan_json"]
+
+
+def run_sync(coroutine):
+    """Result of a coroutine that never suspends (e.g. a cache hit), without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended; it needs an event loop")
+
+
+def main(args) -> list:
+    # Sampled timing lines would interleave with the results
+    os.environ["TIMING_LOG_SAMPLE_RATE"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as api
+        bundle = api.build_model_bundle()
+    print(f"🌲 Model {bundle.version} ({bundle.info()['source']})")
+
+    from inference import sample_inputs
+    row = sample_inputs(1, seed=1)
+    inputs = tuple(float(v) for v in row[0])
+    results = []
+
+    def record(name: str, seconds: float, **extra):
+        results.append({"name": name, "us_per_call": round(seconds * 1e6, 2), **extra})
+        print(f"   {name:<28} {seconds * 1e6:>12.1f} µs")
+
+    if "predict" in args.only:
+        record("predict_one_row", time_call(lambda: bundle.predict_proba(row, api.FEATURE_NAMES)))
+    if "shap" in args.only:
+        record("shap_one_row", time_call(lambda: bundle.shap_values(row)))
+    if "explain" in args.only:
+        def explain_miss():
+            api.explanation_cache.clear()
+            api.explain_rows([inputs], bundle)
+        record("explain_rows_cache_miss", time_call(explain_miss))
+        record("explain_rows_cache_hit", time_call(lambda: api.explain_rows([inputs], bundle)))
+    if "png" in args.only:
+        from shap_renderer import render_shap_waterfall
+        # The title emoji is missing from matplotlib's default font
+        warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+        values, expected = bundle.shap_values(row)
+        render_shap_waterfall(values[0], expected, row[0], api.FEATURE_NAMES)  # imports matplotlib and shap
+        timings = []
+        for _ in range(args.png_renders):
+            started = time.perf_counter()
+            png_bytes = len(render_shap_waterfall(values[0], expected, row[0], api.FEATURE_NAMES))
+            timings.append(time.perf_counter() - started)
+        record("png_waterfall_render", statistics.median(timings), png_bytes=png_bytes)
+    if "verify_token" in args.only:
+        user = {"_id": "6650f0c2a1b2c3d4e5f60718", "username": "lakshmi", "role": "user",
+                "branch_id": "BR001", "shg_name": "Shakti Mahila SHG", "full_name": "Lakshmi Devi"}
+        api.TOKEN_SECRET = api.TOKEN_SECRET or "benchmark-secret"
+        signed = api.sign_token(user, datetime.utcnow() + timedelta(hours=1))
+        record("verify_signed_token", time_call(lambda: api.verify_signed_token(signed)))
+        api.session_cache.set("opaque-token", api.session_user(user))
+        record("verify_token_session_cache_hit", time_call(lambda: run_sync(api.verify_token("opaque-token"))))
+
+    if "loan_json" in args.only:
+        rng = random.Random(42)
+        started = datetime.utcnow()
+        from bson.objectid import ObjectId
+        template = [
+            dict(loan_request_document(i, rng, {}, started), _id=ObjectId())
+            for i in range(max(args.loan_docs))
+        ]
+        for doc in template:
+            for field in api.LOAN_LIST_PROJECTION:
+                doc.pop(field, None)
+        for n in args.loan_docs:
+            docs = template[:n]
+
+            def encode():
+                # stream_page: one json.dumps per document as the cursor yields it
+                return "".join(
+                    ("," if i else "") + json.dumps(api.serialize_loan_request(dict(doc)), default=str)
+                    for i, doc in enumerate(docs)
+                )
+            body_bytes = len(encode())
+            seconds = time_call(encode)
+            record(f"loan_json_{n}_docs", seconds, docs=n, body_bytes=body_bytes,
+                   us_per_doc=round(seconds * 1e6 / n, 3))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the API's per-request hot paths")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--loan-docs", type=int, nargs="+", default=[100, 500, 10000],
+                        help="List sizes for loan_json (LIST_MAX_LIMIT is 500 per page)")
+    parser.add_argument("--png-renders", type=int, default=5, help="Renders timed for png (median)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = main(args)
+    print(f"⏱️ {time.perf_counter() - started:.1f} s")
+    if args.json_path:
+        write_results(args.json_path, "hot_paths", results)
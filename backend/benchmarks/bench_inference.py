@@ -0,0 +1,85 @@
+"""
+SakhiCircle: Inference Benchmark
+Times sklearn's RandomForestClassifier against the compiled NumPy forest, and
+shap.TreeExplainer against TreeShap (both in inference.py), for single-row and
+batch scoring.
+
+    python benchmarks/bench_inference.py [--model shg_model.pkl] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import timeit
+
+import pandas as pd
+import shap
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from inference import compile_model, compile_tree_shap, sample_inputs  # noqa: E402
+
+FEATURE_NAMES = ['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']
+
+
+def time_call(fn, min_seconds: float = 1.0) -> float:
+    """Seconds per call, averaged over enough calls to run at least min_seconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main(args) -> list:
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    compiled = compile_model(model)
+    explainer = shap.TreeExplainer(model)
+    tree_shap = compile_tree_shap(model, explainer)
+    print(f"🌲 {compiled.n_trees} trees, {len(compiled.threshold)} nodes, depth {compiled.max_depth}, "
+          f"sklearn n_jobs={model.n_jobs}")
+
+    results = []
+    for rows in args.rows:
+        X = sample_inputs(rows, seed=rows)
+        X_df = pd.DataFrame(X, columns=FEATURE_NAMES)
+        result = {
+            "rows": rows,
+            # What /predict did before: predict() then predict_proba() on a DataFrame
+            "sklearn_predict_and_proba_us": time_call(lambda: (model.predict(X_df), model.predict_proba(X_df))) * 1e6,
+            "sklearn_proba_us": time_call(lambda: model.predict_proba(X_df)) * 1e6,
+            "compiled_proba_us": time_call(lambda: compiled.predict_proba(X)) * 1e6,
+            "max_abs_error": compiled.max_abs_error(model, X),
+        }
+        result["speedup"] = result["sklearn_proba_us"] / result["compiled_proba_us"]
+        if rows <= args.shap_max_rows:
+            result["shap_explainer_us"] = time_call(lambda: explainer.shap_values(X)) * 1e6
+            result["tree_shap_us"] = time_call(lambda: tree_shap.shap_values(X)) * 1e6
+            result["shap_max_abs_error"] = tree_shap.max_abs_error(explainer, X)
+            result["shap_speedup"] = result["shap_explainer_us"] / result["tree_shap_us"]
+        results.append(result)
+        print(f"   {rows:>6} rows: sklearn {result['sklearn_proba_us']:>10.1f} µs "
+              f"(+predict {result['sklearn_predict_and_proba_us']:>10.1f} µs), "
+              f"compiled {result['compiled_proba_us']:>10.1f} µs, "
+              f"{result['speedup']:.1f}x, max error {result['max_abs_error']:.1g}")
+        if "shap_speedup" in result:
+            print(f"   {'':>6}       shap {result['shap_explainer_us']:>10.1f} µs, "
+                  f"TreeShap {result['tree_shap_us']:>10.1f} µs, "
+                  f"{result['shap_speedup']:.1f}x, max error {result['shap_max_abs_error']:.1g}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="sklearn vs compiled forest scoring latency")
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(__file__), "..", "shg_model.pkl"))
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--shap-max-rows", type=int, default=1000, help="Skip SHAP timings above this batch size")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,125 @@
+"""
+SakhiCircle: Model Load Benchmark
+Starts N worker processes that load the model the way the API does, either by
+unpickling shg_model.pkl (plus compiled forest, TreeExplainer and TreeShap) or
+by mapping the artifact from model_artifact.py, and reports load time and
+memory per worker once all of them are loaded.
+
+PSS (proportional set size, Linux only) splits shared pages between the
+processes mapping them, so its sum is the real memory cost of N workers.
+
+    python benchmarks/bench_model_load.py [--workers 8] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def child(mode: str, model_path: str):
+    """Load once, report, then stay alive until the parent closes stdin."""
+    sys.path.insert(0, BACKEND_DIR)
+    started = time.perf_counter()
+    # Modules the API imports either way; unpickling additionally imports sklearn
+    from model_artifact import ModelArtifact, artifact_path
+    from inference import compile_model, compile_tree_shap
+    if mode == "pickle":
+        import shap
+    imported = time.perf_counter()
+
+    if mode == "artifact":
+        loaded = (ModelArtifact(artifact_path(model_path)),)
+    else:
+        import pickle
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        explainer = shap.TreeExplainer(model)
+        loaded = (model, compile_model(model), explainer, compile_tree_shap(model, explainer))
+    print(json.dumps({
+        "import_seconds": round(imported - started, 4),
+        "load_seconds": round(time.perf_counter() - imported, 4)
+    }), flush=True)
+    sys.stdin.read()
+    del loaded
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss / Pss / private pages of a process from /proc (zeros where unavailable)."""
+    fields = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    fields[name] = int(rest.split()[0])
+    except OSError:
+        pass
+    return {
+        "rss_kb": fields["Rss"],
+        "pss_kb": fields["Pss"],
+        "private_kb": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def run(mode: str, workers: int, model_path: str) -> dict:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--model", model_path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+    try:
+        reports = [json.loads(p.stdout.readline()) for p in processes]
+        memory = [memory_kb(p.pid) for p in processes]
+    finally:
+        for p in processes:
+            p.stdin.close()
+            p.wait()
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "import_seconds_median": round(statistics.median(r["import_seconds"] for r in reports), 4),
+        "load_seconds_median": round(statistics.median(r["load_seconds"] for r in reports), 4),
+        "rss_mb_per_worker": round(statistics.fmean(m["rss_kb"] for m in memory) / 1024, 1),
+        "private_mb_per_worker": round(statistics.fmean(m["private_kb"] for m in memory) / 1024, 1),
+        "pss_mb_total": round(sum(m["pss_kb"] for m in memory) / 1024, 1),
+    }
+
+
+def main(args) -> list:
+    results = []
+    for mode in args.modes:
+        result = run(mode, args.workers, args.model)
+        results.append(result)
+        print(f"📦 {mode:>8}: import {result['import_seconds_median'] * 1000:8.1f} ms, "
+              f"load {result['load_seconds_median'] * 1000:8.1f} ms, "
+              f"RSS {result['rss_mb_per_worker']:6.1f} MB/worker, "
+              f"private {result['private_mb_per_worker']:6.1f} MB/worker, "
+              f"PSS {result['pss_mb_total']:7.1f} MB for {args.workers} workers")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pickle vs memory-mapped model loading across worker processes")
+    parser.add_argument("--model", default=os.path.join(BACKEND_DIR, "shg_model.pkl"))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", choices=["pickle", "artifact"], default=["pickle", "artifact"])
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    parser.add_argument("--child", choices=["pickle", "artifact"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.model)
+    else:
+        results = main(args)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(results, f, indent=2)
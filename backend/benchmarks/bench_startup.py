@@ -0,0 +1,137 @@
+"""
+SakhiCircle: Startup Benchmark
+Measures, in fresh interpreter processes, how long the API takes to import,
+to start accepting requests and for each background component (database,
+model, explainer, render pool) to become ready.
+
+    python benchmarks/bench_startup.py [--runs 5] [--blocking] [--json out.json]
+
+--blocking sets BACKGROUND_STARTUP=false, i.e. the old behaviour where the
+server only accepts requests once everything is loaded. Point MONGO_URI at a
+reachable deployment, otherwise the database component fails after the
+server selection timeout.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def child(timeout: float):
+    """Runs inside the measured process; prints one JSON line of timings."""
+    started = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+    import asyncio
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+    imported = time.perf_counter() - started
+
+    async def run() -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await main.startup_event()
+            accepting = time.perf_counter() - started
+            heavy_modules = sorted(
+                name for name in ("shap", "sklearn", "pandas", "matplotlib") if name in sys.modules
+            )
+            deadline = time.perf_counter() + timeout
+            while time.perf_counter() < deadline:
+                states = [c["status"] for c in main.readiness.values()]
+                if all(state in ("ready", "failed") for state in states) and main.render_pool.ready:
+                    break
+                await asyncio.sleep(0.01)
+            render_pool_ready = time.perf_counter() - started if main.render_pool.ready else None
+            await main.shutdown_event()
+        # Component times are measured from module import, the process from interpreter start
+        offset = main.PROCESS_STARTED - started
+        return {
+            "import_seconds": round(imported, 3),
+            "accepting_requests_seconds": round(accepting, 3),
+            "components": {
+                name: {
+                    "status": state["status"],
+                    "seconds": round(state["seconds"] + offset, 3) if state["seconds"] is not None else None,
+                }
+                for name, state in main.readiness.items()
+            },
+            "render_pool_ready_seconds": round(render_pool_ready, 3) if render_pool_ready else None,
+            "heavy_modules_at_accept": heavy_modules,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def measure(blocking: bool, timeout: float) -> dict:
+    # The child's stdout must be its one JSON line, without sampled timing lines
+    env = dict(os.environ, BACKGROUND_STARTUP="false" if blocking else "true", TIMING_LOG_SAMPLE_RATE="0")
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(timeout)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main(args) -> dict:
+    runs = [measure(args.blocking, args.timeout) for _ in range(args.runs)]
+
+    def median(values):
+        values = [v for v in values if v is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    summary = {
+        "mode": "blocking" if args.blocking else "background",
+        "runs": len(runs),
+        "import_seconds": median(r["import_seconds"] for r in runs),
+        "accepting_requests_seconds": median(r["accepting_requests_seconds"] for r in runs),
+        "components": {
+            name: {
+                "status": runs[-1]["components"][name]["status"],
+                "seconds": median(r["components"][name]["seconds"] for r in runs),
+            }
+            for name in runs[-1]["components"]
+        },
+        "render_pool_ready_seconds": median(r["render_pool_ready_seconds"] for r in runs),
+        "heavy_modules_at_accept": runs[-1]["heavy_modules_at_accept"],
+        "samples": runs,
+    }
+    print(f"🚀 {summary['mode']} startup, median of {len(runs)} runs")
+    print(f"   import main:        {summary['import_seconds']:.3f} s")
+    print(f"   accepting requests: {summary['accepting_requests_seconds']:.3f} s")
+    for name, component in summary["components"].items():
+        seconds = f"{component['seconds']:.3f} s" if component["seconds"] is not None else "-"
+        print(f"   {name + ':':<19} {seconds} ({component['status']})")
+    if summary["render_pool_ready_seconds"] is not None:
+        print(f"   {'render_pool:':<19} {summary['render_pool_ready_seconds']:.3f} s")
+    print(f"   loaded when accepting: {', '.join(summary['heavy_modules_at_accept']) or 'none of shap/sklearn/pandas/matplotlib'}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time API import, readiness and background warm-up")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--blocking", action="store_true", help="Measure with BACKGROUND_STARTUP=false")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for components")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.timeout)
+    else:
+        summary = main(args)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(summary, f, indent=2)
@@ -0,0 +1,64 @@
+"""
+SakhiCircle: Training Benchmark
+Runs model_trainer.py on synthetic datasets of increasing size and reports
+wall time, fit time, accuracy and peak memory for each, so the streaming /
+parallel path can be checked for roughly linear time and flat memory.
+
+    python benchmarks/bench_training.py [--samples 1000 100000 1000000] [--workers 4] [--json out.json]
+
+Models are written to a temporary directory; the tracked shg_model.pkl and
+shg_data.csv are never touched.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def run(samples: int, workers: int, chunk_size: int, fmt: str, directory: str) -> dict:
+    report_path = os.path.join(directory, f"report-{samples}.json")
+    subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, "model_trainer.py"),
+         "--samples", str(samples), "--workers", str(workers), "--chunk-size", str(chunk_size),
+         "--format", fmt, "--output", os.path.join(directory, f"model-{samples}.pkl"),
+         "--report-json", report_path],
+        cwd=directory, stdout=subprocess.DEVNULL, check=True
+    )
+    with open(report_path) as f:
+        return json.load(f)
+
+
+def main(args) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for samples in args.samples:
+            report = run(samples, args.workers, args.chunk_size, args.format, directory)
+            results.append(report)
+            memory = report['peak_rss_mb']
+            print(f"🏋️ {samples:>11,} rows: {report['chunks']:>4} chunks, "
+                  f"wall {report['wall_seconds']:8.1f} s, fit {report['timings']['fit_seconds']:8.1f} s, "
+                  f"accuracy {report['accuracy']:.2%}"
+                  + (f", peak RSS {memory['trainer']:7.1f} MB trainer / {memory['largest_worker']:7.1f} MB worker"
+                     if memory else ""))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training time and memory across dataset sizes")
+    parser.add_argument("--samples", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=["both", "pickle", "artifact"], default="pickle",
+                        help="Output format (artifact export adds SHAP validation time)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
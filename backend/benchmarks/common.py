@@ -0,0 +1,51 @@
+"""
+SakhiCircle: Benchmark Helpers
+Timing and JSON output shared by the benchmark scripts. Every JSON result
+file carries the commit, host and interpreter it was measured on, so runs
+can be compared across builds and machines.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def time_call(fn, min_seconds: float = 1.0) -> float:
+    """Seconds per call, best of 3 repeats of enough calls to run at least min_seconds each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def run_metadata() -> dict:
+    """Where and on what a benchmark ran."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "argv": sys.argv[1:],
+    }
+
+
+def write_results(path: str, benchmark: str, results) -> dict:
+    """Write {"benchmark", "metadata", "results"} to path and return it."""
+    document = {"benchmark": benchmark, "metadata": run_metadata(), "results": results}
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, default=str)
+    return document
@@ -0,0 +1,162 @@
+"""
+SakhiCircle: HTTP Load Test
+Drives a running API with many concurrent clients and reports throughput and
+latency percentiles per target, so two builds can be compared side by side.
+
+Compare the async data layer with the previous synchronous pymongo build:
+
+    git worktree add /tmp/sakhi-sync <commit before the async driver>
+    (cd /tmp/sakhi-sync/backend && uvicorn main:app --port 8001)
+    (cd backend && uvicorn main:app --port 8000)
+    python benchmarks/load_test.py --url http://localhost:8001 --url http://localhost:8000 \\
+        --concurrency 200 --duration 30
+
+Each target needs the default users (ENABLE_DEFAULT_USERS=true) and should
+point at the same MongoDB deployment; the difference is largest against a
+remote cluster, where every round trip is several milliseconds.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+# (method, path, role, body) - role None means unauthenticated
+SCENARIOS = {
+    "reads": [
+        ("GET", "/loan/all?limit=20", "manager", None),
+        ("GET", "/loan/history?limit=20", "manager", None),
+        ("GET", "/loan/my_requests?limit=20", "user", None),
+        ("GET", "/loan/pending_admin_review?limit=20", "admin", None),
+        ("GET", "/shg/group_data", "admin", None),
+        ("GET", "/shg/my_group_data", "user", None),
+        ("GET", "/logs?limit=10", None, None),
+    ],
+    "predict": [
+        ("POST", "/predict", None, {"savings": 2500, "attendance": 85, "repayment": 75}),
+    ],
+    "health": [
+        ("GET", "/health", None, None),
+    ],
+}
+
+DEFAULT_CREDENTIALS = {
+    "admin": ("shakti_shg", "shakti123"),
+    "manager": ("manager", "manager123"),
+    "user": ("lakshmi", "lakshmi123"),
+}
+
+
+async def login(client: httpx.AsyncClient, roles: set) -> dict:
+    """Authorization headers for every role the scenario needs."""
+    headers = {}
+    for role in roles:
+        username, password = DEFAULT_CREDENTIALS[role]
+        response = await client.post("/login", json={"username": username, "password": password})
+        response.raise_for_status()
+        headers[role] = {"Authorization": f"Bearer {response.json()['token']}"}
+    return headers
+
+
+async def worker(client: httpx.AsyncClient, requests: list, headers: dict,
+                 deadline: float, offset: int, latencies: list, errors: list):
+    """Issue requests back to back until the deadline, cycling through the scenario."""
+    i = offset
+    while time.perf_counter() < deadline:
+        method, path, role, body = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers=headers.get(role))
+            await response.aread()
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+async def run_target(url: str, scenario: str, concurrency: int, duration: float, warmup: float,
+                     transport: httpx.AsyncBaseTransport = None) -> dict:
+    """Load one server (or an in-process app through `transport`) and summarize the run."""
+    requests = SCENARIOS[scenario]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0, transport=transport) as client:
+        headers = await login(client, {role for _, _, role, _ in requests if role})
+
+        if warmup > 0:
+            await asyncio.gather(*(
+                worker(client, requests, headers, time.perf_counter() + warmup, n, [], [])
+                for n in range(concurrency)
+            ))
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            worker(client, requests, headers, deadline, n, latencies, errors)
+            for n in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_kinds": sorted({str(e) for e in errors}),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+    }
+
+
+async def main(args) -> list:
+    results = []
+    for url in args.url:
+        result = await run_target(url, args.scenario, args.concurrency, args.duration, args.warmup)
+        results.append(result)
+        print(f"{'✅' if not result['errors'] else '⚠️'} {url} [{args.scenario}] "
+              f"{result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+              f"p99 {result['latency_ms']['p99']} ms, {result['errors']} errors")
+
+    if len(results) > 1 and results[0]["throughput_rps"]:
+        base = results[0]["throughput_rps"]
+        for result in results[1:]:
+            print(f"📈 {result['url']}: {result['throughput_rps'] / base:.2f}x throughput of {results[0]['url']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test for the SakhiCircle API")
+    parser.add_argument("--url", action="append", help="Base URL to test; repeat to compare servers")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="reads")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per target")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each run")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+    args.url = args.url or ["http://localhost:8000"]
+
+    results = asyncio.run(main(args))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,154 @@
+"""
+SakhiCircle: Benchmark Database Fixtures
+An in-process MongoDB stand-in for benchmarks (mongomock behind the subset of
+the AsyncMongoClient API that repository.py and indexes.py use) and seeding of
+loan_requests with realistic documents.
+
+mongomock evaluates every query in Python by scanning the collection, so it
+measures the API's own overhead well but not how queries scale with
+collection size; point the benchmarks at a local mongod for that.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+STATUSES = ["Pending Admin Review", "Pending Manager Review", "Approved", "Rejected"]
+SHG_NAMES = ["Shakti Mahila SHG"] + [f"Benchmark SHG {i:03d}" for i in range(1, 200)]
+BRANCHES = [f"BR{i:03d}" for i in range(1, 21)]
+SEED_BATCH_SIZE = 10_000
+
+
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n: int):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    async def to_list(self, length=None) -> list:
+        await asyncio.sleep(0)
+        return list(self._cursor) if length is None else [doc for _, doc in zip(range(length), self._cursor)]
+
+    async def __aiter__(self):
+        for doc in self._cursor:
+            yield doc
+            await asyncio.sleep(0)
+
+
+class _AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs) -> _AsyncCursor:
+        return _AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline: list, **kwargs) -> _AsyncCursor:
+        return _AsyncCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            # Yield like a network round trip would, so handlers interleave
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+        return call
+
+
+class _AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name: str) -> _AsyncCollection:
+        return _AsyncCollection(self._database[name])
+
+    async def command(self, name, *args, **kwargs) -> dict:
+        return {"ok": 1.0}
+
+
+class MongomockAsyncClient:
+    """mongomock.MongoClient with AsyncMongoClient's calling conventions."""
+
+    def __init__(self):
+        import mongomock
+        self._client = mongomock.MongoClient()
+
+    def __getitem__(self, name: str) -> _AsyncDatabase:
+        return _AsyncDatabase(self._client[name])
+
+    @property
+    def admin(self) -> _AsyncDatabase:
+        return self["admin"]
+
+    async def close(self):
+        self._client.close()
+
+
+def loan_request_document(index: int, rng: random.Random, user: dict, started: datetime) -> dict:
+    """A loan_requests document shaped like the ones /loan/apply stores."""
+    savings = round(rng.uniform(100, 5000), 2)
+    attendance = round(rng.uniform(50, 100), 1)
+    repayment = round(rng.uniform(0, 100), 1)
+    score = int(min(100, 0.3 * (savings - 100) / 49 + 0.3 * attendance + 0.4 * repayment))
+    submitted_at = (started - timedelta(minutes=index)).isoformat()
+    return {
+        "request_id": str(ObjectId()),
+        "group_id": f"G{index % 500:04d}",
+        "shg_name": user.get("shg_name") or rng.choice(SHG_NAMES),
+        "member_name": user.get("full_name") or f"Member {index}",
+        "contact": "9876500000",
+        "loan_amount": rng.choice([5000, 10000, 15000, 25000, 50000]),
+        "loan_purpose": rng.choice(["Dairy", "Tailoring", "Education", "Medical", "Farming"]),
+        "savings": savings,
+        "attendance": attendance,
+        "repayment": repayment,
+        "score": score,
+        "risk": "Low Risk" if score >= 60 else "High Risk",
+        "explanation_id": f"{index:064x}",
+        "explanation": {
+            "base_value": 0.62,
+            "shap_values": [round(rng.uniform(-0.3, 0.3), 4) for _ in range(3)],
+            "feature_names": ["Savings_Per_Member", "Attendance_Rate", "Internal_Loan_Repayment"]
+        },
+        "explanation_image_ref": "",
+        # A member has at most one application under review at a time
+        "status": rng.choice(STATUSES[2:] if user else STATUSES),
+        "user_id": user.get("_id", f"bench-user-{index % 5000}"),
+        "username": user.get("username", f"bench_user_{index % 5000}"),
+        "branch_id": user.get("branch_id") or rng.choice(BRANCHES),
+        "submitted_at": submitted_at,
+        "updated_at": submitted_at,
+        "admin_notes": "",
+        "manager_notes": ""
+    }
+
+
+async def seed_loan_requests(database, n_docs: int, member: dict = None, member_share: int = 1000,
+                             seed: int = 42) -> float:
+    """
+    Replace loan_requests with n_docs documents; one in member_share belongs
+    to `member` (a session dict, see main.session_user) so their own listings
+    are non-empty.
+    Returns the seconds taken.
+    """
+    started = datetime.utcnow()
+    timer = asyncio.get_running_loop().time()
+    rng = random.Random(seed)
+    collection = database["loan_requests"]
+    await collection.delete_many({})
+    member = member or {}
+    for start in range(0, n_docs, SEED_BATCH_SIZE):
+        batch = [
+            loan_request_document(i, rng, member if member and i % member_share == 0 else {}, started)
+            for i in range(start, min(start + SEED_BATCH_SIZE, n_docs))
+        ]
+        await collection.insert_many(batch, ordered=False)
+    return asyncio.get_running_loop().time() - timer
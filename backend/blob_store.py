@@ -0,0 +1,103 @@
+"""
+SakhiCircle: Explanation Image Store
+Content-addressed storage for SHAP waterfall PNGs, so loan_requests documents
+only carry a short reference instead of an inline Base64 image.
+Blobs are keyed by the sha256 of their bytes, which deduplicates identical images.
+Both stores are async: GridFS goes through PyMongo's async driver and the local
+store runs its file I/O in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from gridfs import AsyncGridFSBucket
+from gridfs.errors import FileExists, NoFile
+from pymongo.errors import DuplicateKeyError
+
+
+def blob_digest(data: bytes) -> str:
+    """Content address of a blob."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_valid_digest(digest: str) -> bool:
+    """True if digest looks like a sha256 hex string (guards filesystem paths)."""
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+class LocalBlobStore:
+    """Blobs stored as files in a local directory, fanned out by digest prefix."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.png")
+
+    def _put(self, data: bytes) -> str:
+        digest = blob_digest(data)
+        path = self._path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def _get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def put(self, data: bytes) -> str:
+        """Store a blob (no-op if already present) and return its digest."""
+        return await asyncio.to_thread(self._put, data)
+
+    async def get(self, digest: str) -> Optional[bytes]:
+        """Fetch a blob by digest, or None if missing."""
+        if not is_valid_digest(digest):
+            return None
+        return await asyncio.to_thread(self._get, digest)
+
+
+class GridFSBlobStore:
+    """Blobs stored in a MongoDB GridFS bucket, using the digest as the file _id."""
+
+    def __init__(self, database, bucket_name: str = "explanation_images"):
+        """database is an async (AsyncMongoClient) database."""
+        self.bucket = AsyncGridFSBucket(database, bucket_name=bucket_name)
+        self.files = database[f"{bucket_name}.files"]
+
+    async def put(self, data: bytes) -> str:
+        """Store a blob (no-op if already present) and return its digest."""
+        digest = blob_digest(data)
+        if await self.files.find_one({"_id": digest}, {"_id": 1}) is not None:
+            return digest
+        try:
+            await self.bucket.upload_from_stream_with_id(
+                digest, f"{digest}.png", data,
+                metadata={"contentType": "image/png"}
+            )
+        except (FileExists, DuplicateKeyError):
+            # Another worker stored the same image first
+            pass
+        return digest
+
+    async def get(self, digest: str) -> Optional[bytes]:
+        """Fetch a blob by digest, or None if missing."""
+        if not is_valid_digest(digest):
+            return None
+        try:
+            stream = await self.bucket.open_download_stream(digest)
+            return await stream.read()
+        except NoFile:
+            return None
@@ -0,0 +1,91 @@
+"""
+SakhiCircle: In-Process Cache
+Small thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after ttl seconds.
+
+    A ttl of 0 (or less) disables expiry, leaving a plain LRU cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or default."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove and return a value without counting a hit or miss."""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def pop_where(self, predicate: Callable[[Any, Any], bool]) -> int:
+        """Remove every entry for which predicate(key, value) is true; returns the count."""
+        with self._lock:
+            keys = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters for /health."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,195 @@
+"""
+SakhiCircle: Loan Events
+Pushes loan request changes to the dashboards over Server-Sent Events, so
+they apply small deltas instead of re-fetching whole queues.
+
+Events come from the endpoints themselves (LOAN_EVENTS_SOURCE=local, one
+process) or from a MongoDB change stream on loan_requests (change_stream,
+needs a replica set; every worker then sees every change). Each subscriber
+only receives what its dashboard shows:
+
+    user      their own requests
+    admin     requests of their SHG
+    manager   requests entering or leaving the manager queue, in their branch
+
+A subscriber that falls too far behind gets a "resync" event (refetch the
+list) instead of an unbounded queue. Clients reconnecting with Last-Event-ID
+get the events they missed while they are still in the bus's history.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Callable, Optional
+
+from loan_states import APPROVED, LEGACY_PENDING, PENDING_MANAGER_REVIEW, REJECTED
+
+# Statuses on which a request enters or leaves the manager queue
+MANAGER_QUEUE_STATUSES = {PENDING_MANAGER_REVIEW, LEGACY_PENDING, APPROVED, REJECTED}
+
+# Never pushed: rendered images and SHAP snapshots are fetched on demand
+EVENT_EXCLUDED_FIELDS = ("explanation_image", "explanation")
+EVENT_PROJECTION = {field: 0 for field in EVENT_EXCLUDED_FIELDS}
+
+_RESYNC = object()  # queued in place of events a slow subscriber lost
+_CLOSED = object()  # queued on shutdown to end every stream
+
+
+def loan_event(kind: str, request: dict) -> dict:
+    """An event for a serialized loan request; kind is "created" or "status_changed"."""
+    return {
+        "type": kind,
+        "request_id": request["_id"],
+        "status": request.get("status"),
+        "shg_name": request.get("shg_name"),
+        "branch_id": request.get("branch_id"),
+        "user_id": request.get("user_id"),
+        "version": request.get("version", 0),
+        "request": request
+    }
+
+
+def visible_to(event: dict, session: dict) -> bool:
+    """Whether a session's dashboard shows the request in this event."""
+    role = session.get("role")
+    if role == "user":
+        return event["user_id"] == session["_id"]
+    if role == "admin":
+        return bool(event["shg_name"]) and event["shg_name"] == session.get("shg_name")
+    if role == "manager":
+        branch = session.get("branch_id")
+        return event["status"] in MANAGER_QUEUE_STATUSES and (
+            not branch or not event["branch_id"] or event["branch_id"] == branch
+        )
+    return False
+
+
+def format_sse(event: str, data, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscription:
+    def __init__(self, accepts: Callable[[dict], bool], queue_size: int):
+        self.accepts = accepts
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+
+class EventBus:
+    """
+    In-process fan-out of events to SSE subscribers. publish() never waits:
+    it is called from request handlers on the event loop.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._seq = 0
+        self.published = 0
+        self.resyncs = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: dict):
+        self._seq += 1
+        self.published += 1
+        self._history.append((self._seq, event))
+        for subscription in self._subscribers:
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.queue.put_nowait((self._seq, event))
+            except asyncio.QueueFull:
+                # Drop the backlog; the client refetches its list instead
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait((self._seq, _RESYNC))
+                self.resyncs += 1
+
+    def since(self, last_id: int) -> Optional[list]:
+        """Events after last_id, or None if some are gone (left the history, or the process restarted)."""
+        if last_id == self._seq:
+            return []
+        if last_id > self._seq:
+            return None
+        if not self._history or self._history[0][0] > last_id + 1:
+            return None
+        return [(seq, event) for seq, event in self._history if seq > last_id]
+
+    def close(self):
+        for subscription in self._subscribers:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait((self._seq, _CLOSED))
+
+    async def stream(self, accepts: Callable[[dict], bool], last_event_id: Optional[int] = None,
+                     heartbeat: float = 15.0):
+        """SSE text for one subscriber; ends when the client disconnects or the bus closes."""
+        subscription = _Subscription(accepts, self.queue_size)
+        self._subscribers.add(subscription)
+        try:
+            sent = self._seq
+            yield format_sse("ready", {"last_event_id": sent}, sent)
+            if last_event_id is not None:
+                missed = self.since(last_event_id)
+                if missed is None:
+                    yield format_sse("resync", {"reason": "history"}, sent)
+                else:
+                    for seq, event in missed:
+                        if accepts(event):
+                            yield format_sse("loan", event, seq)
+            while True:
+                try:
+                    seq, event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                if event is _CLOSED:
+                    return
+                if event is _RESYNC:
+                    yield format_sse("resync", {"reason": "slow_consumer"}, seq)
+                elif seq > sent:
+                    yield format_sse("loan", event, seq)
+                sent = max(sent, seq)
+        finally:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "last_event_id": self._seq
+        }
+
+
+async def watch_loan_changes(loan_requests, publish: Callable[[str, dict], None], retry_seconds: float = 5.0):
+    """
+    Publish inserts and status changes from a change stream on loan_requests
+    (LoanRequestRepository) until cancelled, resuming after errors. Raises if
+    the server does not support change streams at all.
+    """
+    resume_after = None
+    opened = False
+    while True:
+        try:
+            async with await loan_requests.watch_status_changes(EVENT_EXCLUDED_FIELDS, resume_after) as stream:
+                opened = True
+                async for change in stream:
+                    resume_after = change["_id"]
+                    if change.get("fullDocument") is not None:
+                        publish("created" if change["operationType"] == "insert" else "status_changed",
+                                change["fullDocument"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not opened:
+                raise
+            print(f"⚠️ Loan change stream interrupted, resuming in {retry_seconds}s: {e}")
+            await asyncio.sleep(retry_seconds)
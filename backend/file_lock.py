@@ -0,0 +1,29 @@
+"""
+SakhiCircle: Cross-Process File Lock
+flock() on a lock file, for state that several uvicorn workers share on disk
+(the audit spill file, the password hashing calibration). Needs fcntl; on
+Windows the lock is a no-op.
+"""
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """Exclusive lock on path across processes; yields False if not blocking and another holds it."""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            # Closing the file releases the lock
+            yield True
@@ -0,0 +1,212 @@
+"""
+SakhiCircle: MongoDB Index Registry
+Declares every index the API relies on, next to the query shapes that need it.
+ensure_indexes() is idempotent and runs at startup; check_query_plans() asks
+MongoDB to explain each registered query shape and reports whether the winning
+plan uses the expected index without a collection scan or in-memory sort.
+All functions take an async (AsyncMongoClient) database.
+
+Run `python indexes.py` to create the indexes and print the plan check.
+"""
+
+from datetime import datetime
+
+from pymongo.errors import OperationFailure
+
+# Every index the API needs. "options" are passed straight to create_index.
+INDEX_REGISTRY = [
+    # /login, /register, /admin/create_user, create_default_admin
+    {"collection": "users", "name": "username_unique",
+     "keys": [("username", 1)], "options": {"unique": True}},
+    # /shg/group_data member list
+    {"collection": "users", "name": "shg_role",
+     "keys": [("shg_name", 1), ("role", 1)], "options": {}},
+    # verify_token
+    {"collection": "auth_tokens", "name": "token_unique",
+     "keys": [("token", 1)], "options": {"unique": True}},
+    # Expired tokens are removed by MongoDB itself
+    {"collection": "auth_tokens", "name": "expires_at_ttl",
+     "keys": [("expires_at", 1)], "options": {"expireAfterSeconds": 0}},
+    # /loan/my_requests
+    {"collection": "loan_requests", "name": "user_submitted",
+     "keys": [("user_id", 1), ("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /loan/apply: one application under review per member (loan_states.py)
+    {"collection": "loan_requests", "name": "user_open_application_unique",
+     "keys": [("user_id", 1)],
+     "options": {"unique": True, "partialFilterExpression": {"open_application": True}}},
+    # /loan/all, /loan/history?status=..., /get_requests?status=...
+    {"collection": "loan_requests", "name": "status_submitted",
+     "keys": [("status", 1), ("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /loan/pending_admin_review, /loan/history?shg_name=...&status=...
+    {"collection": "loan_requests", "name": "shg_status_submitted",
+     "keys": [("shg_name", 1), ("status", 1), ("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /shg/group_data recent requests, /loan/history?shg_name=...
+    {"collection": "loan_requests", "name": "shg_submitted",
+     "keys": [("shg_name", 1), ("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /loan/history?branch_id=...
+    {"collection": "loan_requests", "name": "branch_status_submitted",
+     "keys": [("branch_id", 1), ("status", 1), ("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /loan/history unfiltered
+    {"collection": "loan_requests", "name": "submitted",
+     "keys": [("submitted_at", -1), ("_id", -1)], "options": {}},
+    # /score/history/{shg_name}
+    {"collection": "score_logs", "name": "shg_timestamp",
+     "keys": [("shg_name", 1), ("timestamp", -1)], "options": {}},
+    # /score/log rollup upserts, /score/trends/{shg_name}
+    {"collection": "score_rollups", "name": "shg_month_unique",
+     "keys": [("shg_name", 1), ("month", 1)], "options": {"unique": True}},
+    # /score/trends?branch_id=...
+    {"collection": "score_rollups", "name": "branch_shg_month",
+     "keys": [("branch_id", 1), ("shg_name", 1), ("month", 1)], "options": {}},
+    # /shg/* group lookups and upserts
+    {"collection": "shg_groups", "name": "shg_name_unique",
+     "keys": [("shg_name", 1)], "options": {"unique": True}},
+    # /logs
+    {"collection": "shg_logs", "name": "timestamp",
+     "keys": [("timestamp", -1)], "options": {}},
+]
+
+# Representative query shapes issued by the endpoints, with the index each should use.
+QUERY_SHAPES = [
+    {"endpoint": "POST /login", "collection": "users",
+     "filter": {"username": "lakshmi"}, "index": "username_unique"},
+    {"endpoint": "GET /shg/group_data (members)", "collection": "users",
+     "filter": {"shg_name": "Shakti Mahila SHG", "role": "user"}, "index": "shg_role"},
+    {"endpoint": "verify_token", "collection": "auth_tokens",
+     "filter": {"token": "t", "expires_at": {"$gt": datetime(2026, 1, 1)}}, "index": "token_unique"},
+    {"endpoint": "GET /loan/my_requests", "collection": "loan_requests",
+     "filter": {"user_id": "u"}, "sort": [("submitted_at", -1), ("_id", -1)], "index": "user_submitted"},
+    {"endpoint": "GET /loan/all", "collection": "loan_requests",
+     "filter": {"status": "Pending Manager Review"}, "sort": [("submitted_at", -1), ("_id", -1)],
+     "index": "status_submitted"},
+    {"endpoint": "GET /loan/pending_admin_review", "collection": "loan_requests",
+     "filter": {"status": "Pending Admin Review", "shg_name": "Shakti Mahila SHG"},
+     "sort": [("submitted_at", -1), ("_id", -1)], "index": "shg_status_submitted"},
+    {"endpoint": "GET /shg/group_data (loans)", "collection": "loan_requests",
+     "filter": {"shg_name": "Shakti Mahila SHG"}, "sort": [("submitted_at", -1)], "index": "shg_submitted"},
+    {"endpoint": "GET /loan/history?branch_id=", "collection": "loan_requests",
+     "filter": {"branch_id": "BR001", "status": "Approved"}, "sort": [("submitted_at", -1), ("_id", -1)],
+     "index": "branch_status_submitted"},
+    {"endpoint": "GET /loan/history", "collection": "loan_requests",
+     "filter": {}, "sort": [("submitted_at", -1), ("_id", -1)], "index": "submitted"},
+    {"endpoint": "GET /score/history/{shg_name}", "collection": "score_logs",
+     "filter": {"shg_name": "Shakti Mahila SHG"}, "sort": [("timestamp", -1)], "index": "shg_timestamp"},
+    {"endpoint": "GET /score/trends/{shg_name}", "collection": "score_rollups",
+     "filter": {"shg_name": "Shakti Mahila SHG", "month": {"$gte": "2026-01"}}, "sort": [("month", 1)],
+     "index": "shg_month_unique"},
+    {"endpoint": "GET /score/trends?branch_id=", "collection": "score_rollups",
+     "filter": {"branch_id": "BR001", "month": {"$gte": "2026-01"}}, "sort": [("shg_name", 1), ("month", 1)],
+     "index": "branch_shg_month"},
+    {"endpoint": "GET /shg/my_group_data", "collection": "shg_groups",
+     "filter": {"shg_name": "Shakti Mahila SHG"}, "index": "shg_name_unique"},
+    {"endpoint": "GET /logs", "collection": "shg_logs",
+     "filter": {}, "sort": [("timestamp", -1)], "index": "timestamp"},
+]
+
+
+async def ensure_indexes(database) -> list:
+    """
+    Create every registered index. Safe to run on every startup: existing
+    indexes with the same spec are left alone. Failures (e.g. duplicate
+    usernames blocking a unique index) are reported, not raised.
+    """
+    report = []
+    for spec in INDEX_REGISTRY:
+        entry = {"collection": spec["collection"], "name": spec["name"]}
+        try:
+            await database[spec["collection"]].create_index(spec["keys"], name=spec["name"], **spec["options"])
+            entry["ok"] = True
+        except OperationFailure as e:
+            entry["ok"] = False
+            entry["error"] = str(e)
+        report.append(entry)
+    return report
+
+
+async def index_usage(database) -> list:
+    """$indexStats for every collection in the registry."""
+    stats = []
+    for name in sorted({spec["collection"] for spec in INDEX_REGISTRY}):
+        async for row in await database[name].aggregate([{"$indexStats": {}}]):
+            stats.append({
+                "collection": name,
+                "name": row["name"],
+                "key": row["key"],
+                "ops": row["accesses"]["ops"],
+                "since": row["accesses"]["since"],
+                "registered": any(
+                    spec["collection"] == name and spec["name"] == row["name"]
+                    for spec in INDEX_REGISTRY
+                ) or row["name"] == "_id_"
+            })
+    return stats
+
+
+def _plan_stages(plan: dict):
+    """Yield every stage in an explain() plan tree (classic and SBE formats)."""
+    if not isinstance(plan, dict):
+        return
+    yield plan
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def check_query_plans(database) -> list:
+    """
+    Explain each registered query shape and compare the winning plan with the
+    index the registry says it should use.
+    """
+    results = []
+    for shape in QUERY_SHAPES:
+        command = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = dict(shape["sort"])
+        explained = await database.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = list(_plan_stages(explained["queryPlanner"]["winningPlan"]))
+
+        used = sorted({s["indexName"] for s in stages if s.get("stage") == "IXSCAN" and "indexName" in s})
+        collscan = any(s.get("stage") == "COLLSCAN" for s in stages)
+        blocking_sort = any(s.get("stage") == "SORT" for s in stages)
+        results.append({
+            "endpoint": shape["endpoint"],
+            "collection": shape["collection"],
+            "expected_index": shape["index"],
+            "used_indexes": used,
+            "collscan": collscan,
+            "blocking_sort": blocking_sort,
+            "ok": shape["index"] in used and not collscan and not blocking_sort
+        })
+    return results
+
+
+async def _main() -> int:
+    import os
+    from dotenv import load_dotenv
+    from pymongo import AsyncMongoClient
+
+    load_dotenv()
+    client = AsyncMongoClient(os.getenv("MONGO_URI"), serverSelectionTimeoutMS=5000)
+    db = client[os.getenv("DB_NAME", "sakhiscore")]
+
+    for entry in await ensure_indexes(db):
+        print(f"{'✅' if entry['ok'] else '❌'} {entry['collection']}.{entry['name']} {entry.get('error', '')}")
+
+    print()
+    failures = 0
+    for result in await check_query_plans(db):
+        failures += not result["ok"]
+        print(f"{'✅' if result['ok'] else '❌'} {result['endpoint']}: expected {result['expected_index']}, "
+              f"used {result['used_indexes'] or 'none'}"
+              f"{' (COLLSCAN)' if result['collscan'] else ''}{' (in-memory SORT)' if result['blocking_sort'] else ''}")
+    await client.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,322 @@
+"""
+SakhiCircle: Compiled Forest Inference
+Flattens a fitted sklearn RandomForestClassifier into contiguous NumPy node
+arrays and evaluates every tree at once, without sklearn's input validation,
+DataFrame conversion or joblib dispatch. Used for /predict scoring and small
+batches; the sklearn model stays loaded for large batches, where its Cython
+tree walk is faster.
+
+TreeShap computes exact tree-path-dependent SHAP values (what
+shap.TreeExplainer returns for a forest without background data) from
+per-leaf arrays built once per model.
+
+Both can be rebuilt from their plain arrays (arrays() / from_arrays()),
+which is how model_artifact.py stores them for memory-mapped loading.
+
+Run `python inference.py` to check both against sklearn and shap.
+"""
+
+import math
+
+import numpy as np
+
+
+class _ArrayState:
+    """Rebuild an instance from its NumPy arrays and scalars, without the sklearn model."""
+
+    ARRAYS: tuple = ()
+    SCALARS: tuple = ()
+
+    def arrays(self) -> tuple:
+        """(arrays, scalars): everything needed to rebuild this object."""
+        return (
+            {name: getattr(self, name) for name in self.ARRAYS},
+            {name: getattr(self, name) for name in self.SCALARS}
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, scalars: dict):
+        """Instance backed by the given arrays (which may be read-only memory maps)."""
+        instance = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(instance, name, arrays[name])
+        for name in cls.SCALARS:
+            setattr(instance, name, scalars[name])
+        return instance
+
+
+class CompiledForest(_ArrayState):
+    """
+    All trees of a forest in one node table.
+
+    Leaves point to themselves and compare against +inf, so every row can
+    take exactly max_depth steps down every tree with no branching on leaves.
+    Inputs are cast to float32 before comparing, as sklearn does, so
+    threshold ties resolve identically.
+    """
+
+    ARRAYS = ("classes_", "roots", "feature", "threshold", "children", "value")
+    SCALARS = ("n_features", "n_trees", "max_depth")
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        self.classes_ = np.asarray(model.classes_)
+        self.n_features = int(model.n_features_in_)
+        self.n_trees = len(trees)
+        self.max_depth = max(int(tree.max_depth) for tree in trees)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        n_nodes = int(offsets[-1])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.feature = np.zeros(n_nodes, dtype=np.intp)
+        self.threshold = np.full(n_nodes, np.inf)
+        # children[2 * node] is the left child, children[2 * node + 1] the right;
+        # leaves are their own children
+        self.children = np.empty(2 * n_nodes, dtype=np.intp)
+        self.value = np.empty((n_nodes, len(self.classes_)))
+
+        for tree, offset in zip(trees, offsets[:-1]):
+            end = offset + tree.node_count
+            nodes = slice(offset, end)
+            is_leaf = tree.children_left < 0
+            local = np.arange(tree.node_count)
+            self.feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            self.threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+            self.children[2 * offset:2 * end:2] = offset + np.where(is_leaf, local, tree.children_left)
+            self.children[2 * offset + 1:2 * end:2] = offset + np.where(is_leaf, local, tree.children_right)
+            # Per-node class distribution, normalized like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            self.value[nodes] = value / totals
+
+    def leaves(self, X) -> np.ndarray:
+        """Leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        feature, threshold, children = self.feature, self.threshold, self.children
+        if X.shape[0] == 1:
+            # Single row: walk all trees as one vector of node ids
+            x = X[0]
+            nodes = self.roots
+            for _ in range(self.max_depth):
+                nodes = children[2 * nodes + (x[feature[nodes]] > threshold[nodes])]
+            return nodes[None, :]
+
+        # Rows x trees at once; flat X indexing avoids take_along_axis overhead
+        flat = X.ravel()
+        row_base = (np.arange(X.shape[0]) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            nodes = children[2 * nodes + (flat[row_base + feature[nodes]] > threshold[nodes])]
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, shape (n_rows, n_classes); same as model.predict_proba."""
+        return self.value[self.leaves(X)].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def max_abs_error(self, model, X) -> float:
+        """Largest probability difference from sklearn over the rows of X."""
+        X = np.asarray(X)
+        if hasattr(model, "feature_names_in_"):
+            import pandas as pd
+            X_model = pd.DataFrame(X, columns=model.feature_names_in_)
+        else:
+            X_model = X
+        return float(np.max(np.abs(self.predict_proba(X) - model.predict_proba(X_model))))
+
+
+class TreeShap(_ArrayState):
+    """
+    Exact SHAP values for one class of a forest with few features.
+
+    For every leaf we store, per feature, the interval (lo, hi] that feature
+    must fall in to reach the leaf and the product of cover ratios along the
+    leaf's splits on that feature. The path-dependent expectation for a feature
+    subset S is then
+
+        v(S) = sum over leaves of value * prod_{j in S} [lo_j < x_j <= hi_j] * prod_{j not in S} cover_j
+
+    and the Shapley values follow from v over all 2^M subsets, which is cheap
+    for this model's three features.
+    """
+
+    MAX_FEATURES = 12
+    ARRAYS = ("low", "high", "inverse_cover", "weighted_value", "shapley_weights")
+    SCALARS = ("n_features", "n_leaves", "expected_value", "chunk_rows")
+
+    def __init__(self, model, class_index: int = 1):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        n_features = int(model.n_features_in_)
+        if n_features > self.MAX_FEATURES:
+            raise ValueError(f"{n_features} features is too many for subset enumeration")
+        self.n_features = n_features
+
+        lows, highs, covers, values = [], [], [], []
+        for tree in trees:
+            value = tree.value[:, 0, :]
+            value = value[:, class_index] / value.sum(axis=1)
+            weight = tree.weighted_n_node_samples
+            stack = [(0, np.full(n_features, -np.inf), np.full(n_features, np.inf), np.ones(n_features))]
+            while stack:
+                node, lo, hi, cover = stack.pop()
+                left, right = tree.children_left[node], tree.children_right[node]
+                if left < 0:
+                    lows.append(lo)
+                    highs.append(hi)
+                    covers.append(cover)
+                    values.append(value[node] / len(trees))
+                    continue
+                feature, threshold = tree.feature[node], tree.threshold[node]
+                for child, goes_right in ((left, False), (right, True)):
+                    child_lo, child_hi, child_cover = lo.copy(), hi.copy(), cover.copy()
+                    if goes_right:
+                        child_lo[feature] = max(lo[feature], threshold)
+                    else:
+                        child_hi[feature] = min(hi[feature], threshold)
+                    child_cover[feature] *= weight[child] / weight[node]
+                    stack.append((child, child_lo, child_hi, child_cover))
+
+        covers = np.array(covers)
+        # Feature-major so each feature's bounds are contiguous
+        self.low = np.ascontiguousarray(np.array(lows).T)
+        self.high = np.ascontiguousarray(np.array(highs).T)
+        self.inverse_cover = np.ascontiguousarray(1.0 / covers.T)
+        # Leaf value times every cover ratio: the contribution to v(empty set)
+        self.weighted_value = np.array(values) * covers.prod(axis=1)
+        self.n_leaves = len(values)
+        self.expected_value = float(self.weighted_value.sum())
+
+        # phi = v @ shapley_weights, with v indexed by subset bitmask
+        n_subsets = 1 << n_features
+        self.shapley_weights = np.zeros((n_subsets, n_features))
+        for j in range(n_features):
+            for mask in range(n_subsets):
+                if mask >> j & 1:
+                    continue
+                size = bin(mask).count("1")
+                weight = math.factorial(size) * math.factorial(n_features - size - 1) / math.factorial(n_features)
+                self.shapley_weights[mask | 1 << j, j] += weight
+                self.shapley_weights[mask, j] -= weight
+        # Rows per chunk, keeping the (subsets, rows, leaves) work array near 16 MB
+        self.chunk_rows = max(1, 2_000_000 // (n_subsets * self.n_leaves))
+
+    def _subset_values(self, X: np.ndarray) -> np.ndarray:
+        """v(S) for every subset bitmask S, shape (n_rows, 2^M)."""
+        n_subsets = 1 << self.n_features
+        products = np.empty((n_subsets, X.shape[0], self.n_leaves))
+        products[0] = self.weighted_value
+        for j in range(self.n_features):
+            # Swap feature j's cover ratio for its path indicator
+            x = X[:, j:j + 1]
+            ratio = np.where((x > self.low[j]) & (x <= self.high[j]), self.inverse_cover[j], 0.0)
+            np.multiply(products[:1 << j], ratio, out=products[1 << j:2 << j])
+        return products.sum(axis=2).T
+
+    def shap_values(self, X) -> np.ndarray:
+        """SHAP values, shape (n_rows, n_features)."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        chunks = [
+            self._subset_values(X[start:start + self.chunk_rows]) @ self.shapley_weights
+            for start in range(0, X.shape[0], self.chunk_rows)
+        ]
+        return np.concatenate(chunks) if chunks else np.zeros((0, self.n_features))
+
+    def max_abs_error(self, explainer, X, class_index: int = 1) -> float:
+        """Largest difference from shap.TreeExplainer over the rows of X (values and base value)."""
+        reference = explainer.shap_values(np.asarray(X))
+        if isinstance(reference, list):
+            reference = reference[class_index]
+        else:
+            reference = np.asarray(reference)
+            if reference.ndim == 3:
+                reference = reference[:, :, class_index]
+        base = np.asarray(explainer.expected_value).ravel()
+        base_error = abs(self.expected_value - float(base[class_index] if base.size > 1 else base[0]))
+        return max(float(np.max(np.abs(self.shap_values(X) - reference))), base_error)
+
+
+def sample_inputs(n: int = 2000, seed: int = 0) -> np.ndarray:
+    """Random rows over the API's input ranges (savings, attendance, repayment)."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(100, 5000, n),
+        rng.uniform(0, 100, n),
+        rng.uniform(0, 100, n),
+    ])
+
+
+def compile_model(model, tolerance: float = 1e-9, check_rows: int = 2000) -> CompiledForest:
+    """
+    Compile a forest and verify it against sklearn on random inputs and on the
+    split thresholds themselves (where float32 rounding matters most).
+    Raises ValueError if any probability differs by more than tolerance.
+    """
+    compiled = CompiledForest(model)
+
+    checks = [sample_inputs(check_rows)]
+    split_nodes = np.isfinite(compiled.threshold)
+    if split_nodes.any():
+        rng = np.random.default_rng(1)
+        base = sample_inputs(int(split_nodes.sum()), seed=2)
+        base[np.arange(len(base)), compiled.feature[split_nodes]] = compiled.threshold[split_nodes]
+        checks.append(base[rng.permutation(len(base))[:check_rows]])
+
+    # The single-row path is separate; check it too
+    checks.append(sample_inputs(1, seed=4))
+    checks.extend(row[None, :] for row in checks[-2][:50])
+    for X in checks:
+        error = compiled.max_abs_error(model, X)
+        if error > tolerance:
+            raise ValueError(f"Compiled forest differs from sklearn by {error:.3g} (tolerance {tolerance:g})")
+    return compiled
+
+
+def compile_tree_shap(model, explainer=None, tolerance: float = 1e-9, check_rows: int = 500) -> TreeShap:
+    """
+    Build TreeShap for the positive class and verify it against shap.TreeExplainer.
+    Raises ValueError if any SHAP value differs by more than tolerance.
+    """
+    tree_shap = TreeShap(model)
+    if explainer is None:
+        import shap
+        explainer = shap.TreeExplainer(model)
+
+    for X in (sample_inputs(check_rows, seed=5), sample_inputs(1, seed=6)):
+        error = tree_shap.max_abs_error(explainer, X)
+        if error > tolerance:
+            raise ValueError(f"TreeShap differs from shap.TreeExplainer by {error:.3g} (tolerance {tolerance:g})")
+    return tree_shap
+
+
+if __name__ == "__main__":
+    import os
+    import pickle
+
+    model_path = os.path.join(os.path.dirname(__file__), "shg_model.pkl")
+    with open(model_path, "rb") as f:
+        forest = pickle.load(f)
+
+    compiled = compile_model(forest)
+    X = sample_inputs(10000, seed=3)
+    print(f"✅ {compiled.n_trees} trees, {len(compiled.threshold)} nodes, depth {compiled.max_depth}")
+    print(f"   max |p_compiled - p_sklearn| over {len(X)} rows: {compiled.max_abs_error(forest, X):.3g}")
+
+    import shap
+    tree_shap = compile_tree_shap(forest)
+    X = X[:2000]
+    print(f"✅ TreeShap: {tree_shap.n_leaves} leaves, expected value {tree_shap.expected_value:.6f}")
+    print(f"   max |phi - shap.TreeExplainer| over {len(X)} rows: "
+          f"{tree_shap.max_abs_error(shap.TreeExplainer(forest), X):.3g}")
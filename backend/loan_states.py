@@ -0,0 +1,183 @@
+"""
+SakhiCircle: Loan Request State Machine
+The statuses a loan request moves through and the transitions between them:
+
+    Pending Admin Review --forward--> Pending Manager Review --approve--> Approved
+            |                                  |  (or legacy "Pending")
+            +--reject_by_admin--> Rejected by Admin   +--reject--> Rejected
+
+Each transition is one conditional find_one_and_update: it only matches a
+request in one of the transition's source statuses (and, for admins, in
+their own SHG), sets the new status, bumps `version` and returns the updated
+document. Two reviewers clicking at once cannot both succeed, and a client
+that read `version` can pass it back to fail instead of overwriting a change
+it has not seen. apply_transitions() runs many of them in one bulk_write.
+
+Requests under review carry `open_application: true`; a partial unique index
+on (user_id) over those documents (see indexes.py) allows one open
+application per member, so /loan/apply inserts without checking first.
+"""
+
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+from bson.objectid import ObjectId
+
+PENDING_ADMIN_REVIEW = "Pending Admin Review"
+PENDING_MANAGER_REVIEW = "Pending Manager Review"
+LEGACY_PENDING = "Pending"  # /submit_request, reviewed by the manager directly
+APPROVED = "Approved"
+REJECTED = "Rejected"
+REJECTED_BY_ADMIN = "Rejected by Admin"
+
+# Statuses of an application that is still being reviewed
+OPEN_STATUSES = [PENDING_ADMIN_REVIEW, PENDING_MANAGER_REVIEW]
+# Final decisions
+DECIDED_STATUSES = [APPROVED, REJECTED, REJECTED_BY_ADMIN]
+
+
+class Transition(NamedTuple):
+    sources: tuple
+    target: str
+    actor_field: str
+    time_field: str
+    notes_field: str
+
+
+TRANSITIONS = {
+    "forward": Transition((PENDING_ADMIN_REVIEW,), PENDING_MANAGER_REVIEW, "forwarded_by", "forwarded_at", "admin_notes"),
+    "reject_by_admin": Transition((PENDING_ADMIN_REVIEW,), REJECTED_BY_ADMIN, "rejected_by", "rejected_at", "admin_notes"),
+    "approve": Transition((PENDING_MANAGER_REVIEW, LEGACY_PENDING), APPROVED, "reviewed_by", "reviewed_at", "manager_notes"),
+    "reject": Transition((PENDING_MANAGER_REVIEW, LEGACY_PENDING), REJECTED, "reviewed_by", "reviewed_at", "manager_notes"),
+}
+
+
+class TransitionRejected(Exception):
+    """The request does not exist (404) or is no longer in a state the transition accepts (409)."""
+
+    def __init__(self, status_code: int, detail: str, current: Optional[dict] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.current = current
+
+
+def transition_update(name: str, actor: str, notes: Optional[str] = None, now: Optional[datetime] = None) -> dict:
+    """The update document for a transition."""
+    transition = TRANSITIONS[name]
+    timestamp = (now or datetime.utcnow()).isoformat()
+    fields = {
+        "status": transition.target,
+        "updated_at": timestamp,
+        transition.actor_field: actor,
+        transition.time_field: timestamp
+    }
+    if notes:
+        fields[transition.notes_field] = notes
+    update = {"$set": fields, "$inc": {"version": 1}}
+    if transition.target not in OPEN_STATUSES:
+        update["$unset"] = {"open_application": ""}
+    return update
+
+
+def transition_filter(name: str, request_id: str, shg_name: Optional[str] = None,
+                      expected_version: Optional[int] = None) -> dict:
+    """Matches the request only while the transition is allowed."""
+    query = {"_id": ObjectId(request_id), "status": {"$in": list(TRANSITIONS[name].sources)}}
+    if shg_name is not None:
+        query["shg_name"] = shg_name
+    if expected_version is not None:
+        # Requests created before versioning have no field; they are version 0
+        query["version"] = expected_version if expected_version else {"$in": [0, None]}
+    return query
+
+
+async def apply_transition(loan_requests, name: str, request_id: str, actor: str, notes: Optional[str] = None,
+                           shg_name: Optional[str] = None, expected_version: Optional[int] = None,
+                           projection: Optional[dict] = None) -> dict:
+    """
+    Run one transition on a LoanRequestRepository and return the updated
+    document. shg_name limits it to one SHG's requests (admins). Raises
+    TransitionRejected; only then is the request read again, to say why.
+    """
+    if not ObjectId.is_valid(request_id):
+        raise TransitionRejected(404, "Loan request not found")
+    updated = await loan_requests.find_one_and_update(
+        transition_filter(name, request_id, shg_name, expected_version),
+        transition_update(name, actor, notes),
+        projection
+    )
+    if updated is not None:
+        return updated
+
+    scope = {"_id": ObjectId(request_id)}
+    if shg_name is not None:
+        scope["shg_name"] = shg_name
+    current = await loan_requests.find_one(scope, {"status": 1, "version": 1})
+    if current is None:
+        raise TransitionRejected(404, "Loan request not found")
+    current = {"status": current.get("status"), "version": current.get("version", 0)}
+    if current["status"] not in TRANSITIONS[name].sources:
+        raise TransitionRejected(409, f"Loan request already processed (status: {current['status']})", current)
+    raise TransitionRejected(409, f"Loan request was modified (version {current['version']})", current)
+
+
+async def apply_transitions(loan_requests, actions: list, actor: str, shg_name: Optional[str] = None,
+                            projection: Optional[dict] = None,
+                            on_applied: Optional[Callable[[dict], None]] = None) -> list:
+    """
+    Many transitions in two round trips: one unordered bulk_write of the
+    conditional updates, then one read of the requests to report each
+    outcome. actions are (name, request_id, notes, expected_version);
+    returns one {"request_id", "result", "status", "version"} per action, in
+    order, with result ok, conflict, not_found or duplicate (an id repeated
+    within the batch is applied once).
+
+    Each update stamps the batch's id, so an action succeeded exactly when
+    its request carries the stamp afterwards. on_applied is called with each
+    updated request as read back (with `projection`, default only the status).
+    """
+    batch_id = str(ObjectId())
+    now = datetime.utcnow()
+    results = []
+    updates = []
+    seen = set()
+    for name, request_id, notes, expected_version in actions:
+        result = {"request_id": request_id, "action": name}
+        results.append(result)
+        if not ObjectId.is_valid(request_id):
+            result["result"] = "not_found"
+            continue
+        key = str(ObjectId(request_id))
+        if key in seen:
+            result["result"] = "duplicate"
+        else:
+            seen.add(key)
+            result["key"] = key
+            update = transition_update(name, actor, notes, now)
+            update["$set"]["review_batch"] = batch_id
+            updates.append((transition_filter(name, request_id, shg_name, expected_version), update))
+
+    if updates:
+        await loan_requests.bulk_update(updates)
+        ids = [ObjectId(request_id) for request_id in seen]
+        scope = {"_id": {"$in": ids}}
+        if shg_name is not None:
+            scope["shg_name"] = shg_name
+        current = {
+            str(doc["_id"]): doc
+            for doc in await loan_requests.find_many(scope, projection or {"status": 1, "version": 1, "review_batch": 1})
+        }
+        for result in results:
+            if "result" in result:
+                continue
+            doc = current.get(result.pop("key"))
+            if doc is None:
+                result["result"] = "not_found"
+                continue
+            result["result"] = "ok" if doc.get("review_batch") == batch_id else "conflict"
+            result["status"] = doc.get("status")
+            result["version"] = doc.get("version", 0)
+            if on_applied is not None and result["result"] == "ok":
+                on_applied(doc)
+    return results
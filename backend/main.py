@@ -5,34 +5,49 @@ Role-Based Access Control: Admin, Manager, User
 """
 
 import os
+import asyncio
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file FIRST
 load_dotenv()
 
-import pickle
 import base64
+import json
 import hashlib
+import hmac
 import secrets
-from io import BytesIO
-from datetime import datetime, timedelta
-from typing import Optional, Literal
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Literal, List
 
 import numpy as np
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend for server
-import matplotlib.pyplot as plt
-import shap
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo import AsyncMongoClient
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from bson.objectid import ObjectId
-import httpx
-from fastapi import UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
+
+from audit_log import AuditLogger
+from blob_store import GridFSBlobStore, LocalBlobStore
+from cache import TTLCache
+from events import EVENT_EXCLUDED_FIELDS, EVENT_PROJECTION, EventBus, loan_event, visible_to, watch_loan_changes
+from indexes import ensure_indexes, index_usage, check_query_plans
+from loan_states import (
+    APPROVED, DECIDED_STATUSES, PENDING_ADMIN_REVIEW, TransitionRejected, apply_transition, apply_transitions
+)
+from metrics import (
+    REGISTRY, RequestMetricsMiddleware, MongoCommandMetrics, MongoPoolMetrics,
+    configure_timing_log, monitor_event_loop_lag, stage_timer
+)
+from model_artifact import artifact_path
+from model_registry import ModelBundle, ModelRegistry, load_bundle
+from passwords import PasswordHasher, ScryptParams, calibrate_shared
+from rate_limit import TokenBucketLimiter, acquire_all
+from revocation import RevocationList
+from repository import Repositories, connect as connect_mongo
+from shap_renderer import RenderPool, to_data_uri
 # ============================================================
 # FastAPI App Initialization
 # ============================================================
@@ -53,6 +68,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Latency per route for GET /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Fraction of stage timings also printed as JSON lines ({"event": "timing", ...})
+TIMING_LOG_SAMPLE_RATE = float(os.getenv("TIMING_LOG_SAMPLE_RATE", "0.01"))
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))  # seconds; 0 disables
+configure_timing_log(TIMING_LOG_SAMPLE_RATE)
+
+# ============================================================
+# Startup Readiness
+# ============================================================
+
+# MongoDB connection and model/SHAP warm-up run in the background after startup,
+# so the server accepts requests (and /login works) before the explainer is ready.
+# Set BACKGROUND_STARTUP=false to block startup until everything is loaded.
+BACKGROUND_STARTUP = os.getenv("BACKGROUND_STARTUP", "true").lower() == "true"
+STARTUP_RETRY_AFTER = os.getenv("STARTUP_RETRY_AFTER", "5")  # Retry-After header while warming up
+PROCESS_STARTED = time.perf_counter()
+
+# Per component: pending -> starting -> ready | failed, with seconds since process start
+readiness = {
+    name: {"status": "pending", "seconds": None, "error": None}
+    for name in ("database", "model", "explainer")
+}
+startup_tasks: list = []
+
+def mark_component(name: str, status: str, error: Optional[str] = None):
+    """Record a startup state change for /health."""
+    readiness[name] = {
+        "status": status,
+        "seconds": round(time.perf_counter() - PROCESS_STARTED, 3),
+        "error": error
+    }
+
+def require_component(name: str, unavailable_detail: str):
+    """503 until a component is ready; Retry-After while it is still warming up."""
+    state = readiness[name]["status"]
+    if state == "ready":
+        return
+    if state in ("pending", "starting"):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service is starting up ({name} not ready yet)",
+            headers={"Retry-After": STARTUP_RETRY_AFTER}
+        )
+    raise HTTPException(status_code=503, detail=unavailable_detail)
 
 # ============================================================
 # MongoDB Connection
@@ -62,45 +123,117 @@ MONGO_URI = os.getenv("MONGO_URI")
 if not MONGO_URI:
     print("⚠️ MONGO_URI not set in .env file!")
 DB_NAME = "sakhiscore"
-COLLECTION_NAME = "shg_logs"
-REQUESTS_COLLECTION = "loan_requests"
-USERS_COLLECTION = "users"
-TOKENS_COLLECTION = "auth_tokens"
-SCORE_LOGS_COLLECTION = "score_logs"  # New: Historical score tracking
+# Connection pool per worker process; sized so hundreds of requests can wait on Atlas at once
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "200"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "8"))
 
-mongo_client: Optional[MongoClient] = None
+mongo_client: Optional[AsyncMongoClient] = None
 db = None
-collection = None
-requests_collection = None
-users_collection = None
-tokens_collection = None
-score_logs_collection = None  # New: Historical score logs
+repos: Optional[Repositories] = None  # All collection access goes through these
+
+# Prediction audit records are written to shg_logs in batches by a background task
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", os.path.join(os.path.dirname(__file__), "audit_spill.jsonl"))
+AUDIT_SPILL_MAX_BYTES = int(os.getenv("AUDIT_SPILL_MAX_BYTES", str(50 * 1024 * 1024)))
+
+async def insert_audit_batch(entries: list):
+    """Audit log sink; raising makes the logger spill the batch to disk."""
+    if repos is None:
+        raise ConnectionFailure("Database not connected")
+    await repos.prediction_logs.insert_many(entries)
+
+audit_log = AuditLogger(
+    insert_audit_batch,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    max_queue=AUDIT_QUEUE_SIZE,
+    spill_path=AUDIT_SPILL_PATH,
+    spill_max_bytes=AUDIT_SPILL_MAX_BYTES
+)
+
+# Where SHAP waterfall PNGs for loan requests live: "gridfs" or "local"
+EXPLANATION_STORE = os.getenv("EXPLANATION_STORE", "gridfs")
+EXPLANATION_STORE_DIR = os.getenv("EXPLANATION_STORE_DIR", os.path.join(os.path.dirname(__file__), "explanation_store"))
+blob_store = None
+
+# Loan change events pushed to dashboards over SSE (/loan/events): "local" publishes
+# from this process's endpoints; "change_stream" follows MongoDB so every worker
+# sees every change (needs a replica set, falls back to local otherwise)
+LOAN_EVENTS_SOURCE = os.getenv("LOAN_EVENTS_SOURCE", "local")
+LOAN_EVENTS_HEARTBEAT = float(os.getenv("LOAN_EVENTS_HEARTBEAT", "15"))
+LOAN_EVENTS_HISTORY = int(os.getenv("LOAN_EVENTS_HISTORY", "1000"))
+LOAN_EVENTS_QUEUE_SIZE = int(os.getenv("LOAN_EVENTS_QUEUE_SIZE", "256"))
+loan_events = EventBus(history=LOAN_EVENTS_HISTORY, queue_size=LOAN_EVENTS_QUEUE_SIZE)
+loan_events_source = LOAN_EVENTS_SOURCE
+
+def publish_loan_event(kind: str, doc: dict, source: str = "local"):
+    """Push a created or updated loan request to subscribed dashboards."""
+    if source != loan_events_source:
+        return
+    request = {field: value for field, value in doc.items() if field not in EVENT_EXCLUDED_FIELDS}
+    loan_events.publish(loan_event(kind, serialize_loan_request(request)))
 
-def connect_to_mongodb():
+async def follow_loan_changes():
+    """Feed loan_events from a change stream; without change stream support, publish locally."""
+    global loan_events_source
+    try:
+        await watch_loan_changes(
+            repos.loan_requests, lambda kind, doc: publish_loan_event(kind, doc, source="change_stream")
+        )
+    except Exception as e:
+        loan_events_source = "local"
+        print(f"⚠️ Loan change stream unavailable, publishing events from this process only: {e}")
+
+async def connect_to_mongodb():
     """Initialize MongoDB connection."""
-    global mongo_client, db, collection, requests_collection, users_collection, tokens_collection, score_logs_collection
+    global mongo_client, db, repos, blob_store
+    mark_component("database", "starting")
     try:
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-        # Test connection
-        mongo_client.admin.command('ping')
+        # Connects and pings the server
+        mongo_client = await connect_mongo(
+            MONGO_URI,
+            max_pool_size=MONGO_MAX_POOL_SIZE,
+            min_pool_size=MONGO_MIN_POOL_SIZE,
+            max_connecting=MONGO_MAX_CONNECTING,
+            event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()]
+        )
         db = mongo_client[DB_NAME]
-        collection = db[COLLECTION_NAME]
-        requests_collection = db[REQUESTS_COLLECTION]
-        users_collection = db[USERS_COLLECTION]
-        tokens_collection = db[TOKENS_COLLECTION]
-        score_logs_collection = db[SCORE_LOGS_COLLECTION]  # New: Score logs
+        repos = Repositories(db)
+        if EXPLANATION_STORE == "gridfs":
+            blob_store = GridFSBlobStore(db)
         print("✅ Connected to MongoDB successfully!")
         
+        # Provision every index the API's queries rely on (idempotent)
+        flagged = await repos.loan_requests.flag_open_applications()
+        if flagged:
+            print(f"✅ Marked {flagged} loan requests under review as open applications")
+        for entry in await ensure_indexes(db):
+            if not entry["ok"]:
+                print(f"⚠️ Index {entry['collection']}.{entry['name']} not created: {entry['error']}")
+        
         # Create default admin if not exists
-        create_default_admin()
+        await create_default_admin()
+        
+        if LOAN_EVENTS_SOURCE == "change_stream":
+            startup_tasks.append(asyncio.create_task(follow_loan_changes()))
         
+        mark_component("database", "ready")
         return True
     except ConnectionFailure as e:
         print(f"⚠️ MongoDB connection failed: {e}")
         print("📝 Running without database logging...")
+        mark_component("database", "failed", str(e))
+        return False
+    except Exception as e:
+        # Background startup must not lose the error in an unobserved task
+        print(f"❌ MongoDB setup failed: {e}")
+        mark_component("database", "failed", str(e))
         return False
 
-def create_default_admin():
+async def create_default_admin():
     """
     Create default users for testing.
     DISABLED: Set ENABLE_DEFAULT_USERS=true in environment to enable.
@@ -111,16 +244,15 @@ def create_default_admin():
         print("ℹ️ Default user creation disabled. Set ENABLE_DEFAULT_USERS=true to enable.")
         return
     
-    global users_collection
-    if users_collection is None:
+    if repos is None:
         return
     
     try:
         # Create SHG Representative (Admin) - logs in with SHG credentials to update group data
-        existing_admin = users_collection.find_one({"username": "shakti_shg"})
+        existing_admin = await repos.users.find_by_username("shakti_shg")
         if not existing_admin:
-            hashed_password = hashlib.sha256("shakti123".encode()).hexdigest()
-            users_collection.insert_one({
+            hashed_password = await hash_password("shakti123")
+            await repos.users.insert({
                 "username": "shakti_shg",
                 "password": hashed_password,
                 "role": "admin",
@@ -135,10 +267,10 @@ def create_default_admin():
             print("✅ SHG Representative created (username: shakti_shg, password: shakti123) - SHG: Shakti Mahila SHG")
         
         # Create default manager if not exists
-        existing_manager = users_collection.find_one({"username": "manager"})
+        existing_manager = await repos.users.find_by_username("manager")
         if not existing_manager:
-            hashed_password = hashlib.sha256("manager123".encode()).hexdigest()
-            users_collection.insert_one({
+            hashed_password = await hash_password("manager123")
+            await repos.users.insert({
                 "username": "manager",
                 "password": hashed_password,
                 "role": "manager",
@@ -152,10 +284,10 @@ def create_default_admin():
             print("✅ Default manager created (username: manager, password: manager123)")
         
         # Create SHG Member (User) - can request loans
-        existing_user = users_collection.find_one({"username": "lakshmi"})
+        existing_user = await repos.users.find_by_username("lakshmi")
         if not existing_user:
-            hashed_password = hashlib.sha256("lakshmi123".encode()).hexdigest()
-            users_collection.insert_one({
+            hashed_password = await hash_password("lakshmi123")
+            await repos.users.insert({
                 "username": "lakshmi",
                 "password": hashed_password,
                 "role": "user",
@@ -170,10 +302,10 @@ def create_default_admin():
             print("✅ SHG Member created (username: lakshmi, password: lakshmi123) - SHG: Shakti Mahila SHG")
         
         # Create second member in same SHG (to show grouping)
-        existing_user2 = users_collection.find_one({"username": "radha"})
+        existing_user2 = await repos.users.find_by_username("radha")
         if not existing_user2:
-            hashed_password = hashlib.sha256("radha123".encode()).hexdigest()
-            users_collection.insert_one({
+            hashed_password = await hash_password("radha123")
+            await repos.users.insert({
                 "username": "radha",
                 "password": hashed_password,
                 "role": "user",
@@ -195,29 +327,171 @@ def create_default_admin():
 # ============================================================
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'shg_model.pkl')
-model = None
-explainer = None
+# Memory-mapped export of the model (model_artifact.py); preferred over the pickle when current
+MODEL_ARTIFACT_PATH = os.getenv("MODEL_ARTIFACT_PATH", artifact_path(MODEL_PATH))
+MODEL_ARTIFACT_VERIFY = os.getenv("MODEL_ARTIFACT_VERIFY", "true").lower() == "true"
+FEATURE_NAMES = ['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+BULK_REVIEW_MAX_ITEMS = int(os.getenv("BULK_REVIEW_MAX_ITEMS", "1000"))
+SHAP_RENDER_WORKERS = int(os.getenv("SHAP_RENDER_WORKERS", "2"))
+SHAP_RENDER_QUEUE_SIZE = int(os.getenv("SHAP_RENDER_QUEUE_SIZE", "8"))
+SHAP_RENDER_TIMEOUT = float(os.getenv("SHAP_RENDER_TIMEOUT", "10"))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "4096"))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", "86400"))
+EXPLANATION_CACHE_PRECISION = int(os.getenv("EXPLANATION_CACHE_PRECISION", "2"))
+EXPLANATION_IMAGE_CACHE_SIZE = int(os.getenv("EXPLANATION_IMAGE_CACHE_SIZE", "256"))  # ~100 KB per PNG
+EXPLANATION_IMAGE_MAX_AGE = int(os.getenv("EXPLANATION_IMAGE_MAX_AGE", "31536000"))
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "500"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "64"))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))  # seconds a /analytics/portfolio result is served
+# Above this many rows sklearn's predict_proba beats the compiled forest (when the pickle is loaded)
+COMPILED_FOREST_MAX_ROWS = int(os.getenv("COMPILED_FOREST_MAX_ROWS", "500"))
+# Versioned models (model_registry.py); without published versions the files above are served
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "models"))
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))  # seconds; 0 disables
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR)
+# The bundle being served. Replaced by one assignment on reload; handlers read it
+# once, so requests already running finish on the version they started with.
+active_model: Optional[ModelBundle] = None
+model_reload_task: Optional[asyncio.Task] = None
+model_reload_state = {"status": "idle", "version": None, "started_at": None, "finished_at": None, "error": None}
+explanation_cache = TTLCache(maxsize=EXPLANATION_CACHE_SIZE, ttl=EXPLANATION_CACHE_TTL)
+# Model hash prefix -> the last bundles replaced by a reload
+retired_models = TTLCache(maxsize=2, ttl=EXPLANATION_CACHE_TTL)
+explanation_image_cache = TTLCache(maxsize=EXPLANATION_IMAGE_CACHE_SIZE, ttl=EXPLANATION_CACHE_TTL)
+# (branch_id, submitted_from, submitted_to) -> /analytics/portfolio response
+portfolio_cache = TTLCache(maxsize=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL)
+render_pool = RenderPool(
+    max_workers=SHAP_RENDER_WORKERS,
+    max_queue=SHAP_RENDER_QUEUE_SIZE,
+    timeout=SHAP_RENDER_TIMEOUT
+)
 
-def load_model():
-    """Load the trained RandomForest model and initialize SHAP explainer."""
-    global model, explainer
+def build_model_bundle(version: Optional[str] = None, on_stage=None) -> ModelBundle:
+    """
+    Load and warm up a model version (blocking; run it in a thread).
+    Uses the registry's current version when none is given, or shg_model.pkl /
+    MODEL_ARTIFACT_PATH while the registry is empty.
+    """
+    if version is None:
+        version = model_registry.current()
+    if version is None:
+        model_path, artifact_file = MODEL_PATH, MODEL_ARTIFACT_PATH
+    else:
+        model_path, artifact_file = model_registry.paths(version)
+    return load_bundle(
+        model_path, artifact_file, version=version,
+        verify_artifact=MODEL_ARTIFACT_VERIFY,
+        compiled_max_rows=COMPILED_FOREST_MAX_ROWS,
+        on_stage=on_stage
+    )
+
+def activate_model(bundle: ModelBundle):
+    """Swap in a fully loaded bundle."""
+    global active_model
+    if active_model is not None and active_model.model_hash != bundle.model_hash:
+        # Explanation ids handed out by the old version still resolve for a while
+        retired_models.set(active_model.model_hash[:EXPLANATION_ID_HASH_CHARS], active_model)
+    active_model = bundle
+    # Entries are keyed by model hash, so this only frees the old version's memory
+    explanation_cache.clear()
+    explanation_image_cache.clear()
+
+async def warm_up_model():
+    """Load and activate the model at startup, off the event loop."""
+    def on_stage(stage: str):
+        if stage == "model":
+            mark_component("model", "ready")
+            mark_component("explainer", "starting")
     
-    if not os.path.exists(MODEL_PATH):
-        print(f"⚠️ Model not found at {MODEL_PATH}")
+    mark_component("model", "starting")
+    try:
+        bundle = await asyncio.to_thread(build_model_bundle, None, on_stage)
+    except FileNotFoundError as e:
+        print(f"⚠️ {e}")
         print("🔧 Please run 'python model_trainer.py' first!")
-        return False
+        mark_component("model", "failed", "model file not found")
+        mark_component("explainer", "failed", "model not loaded")
+        return
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+        if readiness["model"]["status"] == "ready":
+            mark_component("explainer", "failed", str(e))
+        else:
+            mark_component("model", "failed", str(e))
+            mark_component("explainer", "failed", "model not loaded")
+        return
     
+    activate_model(bundle)
+    mark_component("model", "ready")
+    mark_component("explainer", "ready")
+    print(f"✅ Model {bundle.version} loaded from the {bundle.info()['source']} successfully!")
+
+async def reload_model(version: Optional[str] = None, make_current: bool = False) -> bool:
+    """
+    Load and warm up a model version in the background, then swap it in.
+    The active model keeps serving meanwhile, and on failure. With make_current
+    the registry's CURRENT is pointed at the version once it is serving.
+    """
     try:
-        with open(MODEL_PATH, 'rb') as f:
-            model = pickle.load(f)
-        
-        # Initialize SHAP TreeExplainer for RandomForest
-        explainer = shap.TreeExplainer(model)
-        print("✅ Model and SHAP explainer loaded successfully!")
-        return True
+        bundle = await asyncio.to_thread(build_model_bundle, version)
     except Exception as e:
-        print(f"❌ Error loading model: {e}")
+        model_reload_state.update(status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        serving = active_model.version if active_model is not None else "no model"
+        print(f"❌ Model reload failed, still serving {serving}: {e}")
         return False
+    
+    previous = active_model.version if active_model is not None else None
+    activate_model(bundle)
+    mark_component("model", "ready")
+    mark_component("explainer", "ready")
+    model_reload_state.update(status="ready", version=bundle.version, finished_at=datetime.utcnow().isoformat())
+    print(f"🔄 Model {previous} -> {bundle.version}")
+    if make_current and version is not None:
+        # Other worker processes follow through their registry watch
+        try:
+            await asyncio.to_thread(model_registry.activate, version)
+        except Exception as e:
+            print(f"⚠️ Could not make {version} the registry's current version: {e}")
+    return True
+
+def start_model_reload(version: Optional[str] = None, make_current: bool = False) -> asyncio.Task:
+    """Start a reload unless one (or the startup load) is already running."""
+    global model_reload_task
+    if model_reload_task is not None and not model_reload_task.done():
+        raise RuntimeError("A model load is already in progress")
+    model_reload_state.update(
+        status="loading", version=version, error=None,
+        started_at=datetime.utcnow().isoformat(), finished_at=None
+    )
+    model_reload_task = asyncio.create_task(reload_model(version, make_current))
+    return model_reload_task
+
+async def watch_model_registry():
+    """Reload when the registry's current version changes (e.g. after `model_registry.py activate`)."""
+    attempted = None
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            current = await asyncio.to_thread(model_registry.current)
+            if (current is None or current == attempted
+                    or (active_model is not None and current == active_model.version)):
+                continue
+            # Try each new version once; a broken one is not retried until CURRENT changes again
+            attempted = current
+            print(f"👀 Model registry points at {current}; reloading")
+            await start_model_reload(current)
+        except RuntimeError:
+            attempted = None  # a reload is already running; look again next time
+        except Exception as e:
+            print(f"⚠️ Model registry watch failed: {e}")
+
+def scoring_ready() -> bool:
+    """True once predictions (probability and SHAP values) can be served."""
+    return active_model is not None
 
 # ============================================================
 # Pydantic Models
@@ -251,10 +525,47 @@ class PredictionResponse(BaseModel):
     score: int
     risk: str
     risk_color: str
-    explanation_image: str
+    explanation_id: str
+    explanation_url: str
+    shap_values: dict
+    base_value: float
+    explanation_image: Optional[str] = None
     features: dict
+    model_version: str = ""
+    timestamp: str
+
+class BatchPredictionRow(PredictionInput):
+    """One SHG row in a batch scoring request."""
+    group_id: Optional[str] = Field(None, description="Caller's identifier for this row, echoed back")
+    include_image: bool = Field(default=False, description="Render the SHAP waterfall image for this row")
+
+class BatchPredictionInput(BaseModel):
+    """Input schema for batch credit score prediction."""
+    rows: List[BatchPredictionRow] = Field(..., min_length=1, max_length=BATCH_MAX_ROWS, description="SHG rows to score")
+
+class BatchPredictionItem(BaseModel):
+    """Per-row result of a batch prediction."""
+    group_id: Optional[str] = None
+    score: int
+    risk: str
+    risk_color: str
+    low_risk_probability: float
+    explanation_id: str
+    shap_values: dict
+    explanation_image: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for batch credit score prediction."""
+    results: List[BatchPredictionItem]
+    count: int
+    model_version: str = ""
     timestamp: str
 
+class ModelReloadRequest(BaseModel):
+    """Admin request to load another model version."""
+    version: Optional[str] = Field(None, description="Registry version; defaults to the registry's current version")
+    wait: bool = Field(default=False, description="Respond only after the new version is serving")
+
 class LoanApply(BaseModel):
     """Loan application submission schema (User Only)."""
     group_id: str = Field(..., description="SHG Group ID or Name")
@@ -268,18 +579,42 @@ class LoanApply(BaseModel):
     repayment: float = Field(..., ge=0, le=100, description="Loan repayment rate (%)")
     score: int = Field(..., description="Calculated credit score")
     risk: str = Field(..., description="Risk classification")
-    explanation_image: Optional[str] = Field(None, description="SHAP visualization")
+    explanation_image: Optional[str] = Field(None, description="SHAP visualization (legacy inline data URI)")
 
 class UpdateStatusRequest(BaseModel):
     """Update loan request status schema."""
     request_id: str = Field(..., description="MongoDB document ID")
     status: Literal['Approved', 'Rejected'] = Field(..., description="New status: Approved or Rejected")
     manager_notes: Optional[str] = Field(None, description="Manager's notes")
+    version: Optional[int] = Field(None, description="Version the client last saw; 409 if the request changed since")
 
 class ForwardToManagerRequest(BaseModel):
     """Admin forwards loan request to manager."""
     request_id: str = Field(..., description="MongoDB document ID")
     admin_notes: Optional[str] = Field(None, description="Admin's notes for manager")
+    version: Optional[int] = Field(None, description="Version the client last saw; 409 if the request changed since")
+
+class BulkAdminReviewItem(BaseModel):
+    """One request in an admin's bulk review."""
+    request_id: str = Field(..., description="MongoDB document ID")
+    action: Literal['forward', 'reject'] = Field(..., description="Forward to the manager or reject")
+    admin_notes: Optional[str] = Field(None, description="Admin's notes for this request")
+    version: Optional[int] = Field(None, description="Version the client last saw; conflict if the request changed since")
+
+class BulkAdminReviewRequest(BaseModel):
+    """Admin forwards or rejects many loan requests at once."""
+    items: List[BulkAdminReviewItem] = Field(..., min_length=1, max_length=BULK_REVIEW_MAX_ITEMS)
+
+class BulkStatusItem(BaseModel):
+    """One request in a manager's bulk decision."""
+    request_id: str = Field(..., description="MongoDB document ID")
+    status: Literal['Approved', 'Rejected'] = Field(..., description="New status: Approved or Rejected")
+    manager_notes: Optional[str] = Field(None, description="Manager's notes for this request")
+    version: Optional[int] = Field(None, description="Version the client last saw; conflict if the request changed since")
+
+class BulkStatusRequest(BaseModel):
+    """Manager approves or rejects many loan requests at once."""
+    items: List[BulkStatusItem] = Field(..., min_length=1, max_length=BULK_REVIEW_MAX_ITEMS)
 
 # Legacy models for backwards compatibility
 class UserRegister(BaseModel):
@@ -299,7 +634,7 @@ class LoanRequest(BaseModel):
     repayment: float = Field(..., ge=0, le=100, description="Loan repayment rate (%)")
     score: int = Field(..., description="Calculated credit score")
     risk: str = Field(..., description="Risk classification")
-    explanation_image: str = Field(..., description="SHAP visualization")
+    explanation_image: Optional[str] = Field(None, description="SHAP visualization (legacy inline data URI)")
     user_id: Optional[str] = Field(None, description="User ID who submitted")
 
 # ============================================================
@@ -321,127 +656,543 @@ def calculate_credit_score(savings: float, attendance: float, repayment: float)
     
     return int(np.clip(score, 0, 100))
 
-def generate_shap_waterfall(input_data: np.ndarray, feature_names: list) -> str:
+def get_risk_label(score: int) -> tuple:
+    """Map a credit score to its risk label and display color."""
+    if score >= 60:
+        return "Low Risk ✅", "#22c55e"
+    return "High Risk ⚠️", "#ef4444"
+
+def quantize_inputs(savings: float, attendance: float, repayment: float) -> tuple:
+    """Round inputs to the explanation cache precision so near-identical requests share an entry."""
+    return tuple(round(float(v), EXPLANATION_CACHE_PRECISION) for v in (savings, attendance, repayment))
+
+# Characters of the model hash in an explanation id
+EXPLANATION_ID_HASH_CHARS = 16
+
+def explanation_key(inputs: tuple, model_hash: str) -> str:
     """
-    Generate SHAP waterfall plot and return as Base64 encoded PNG.
+    Explanation id: model hash prefix plus the quantized inputs, e.g.
+    "3f9c0e1d2b4a5968_2500.0_85.0_75.0". It names its content, so any worker
+    serving that model can recompute an explanation it has not cached.
     """
-    if explainer is None:
-        raise HTTPException(status_code=500, detail="SHAP explainer not initialized")
-    
-    # Calculate SHAP values
-    shap_values = explainer.shap_values(input_data)
+    return "_".join([model_hash[:EXPLANATION_ID_HASH_CHARS], *(repr(v) for v in inputs)])
+
+def parse_explanation_key(key: str) -> Optional[tuple]:
+    """(model hash prefix, quantized inputs) of an explanation id, or None if it is not one explanation_key() makes."""
+    try:
+        model_hash, *values = key.split("_")
+        inputs = PredictionInput(**dict(zip(("savings", "attendance", "repayment"), map(float, values))))
+    except (ValueError, TypeError):
+        return None
+    quantized = quantize_inputs(inputs.savings, inputs.attendance, inputs.repayment)
+    if len(values) != 3 or explanation_key(quantized, model_hash) != key:
+        return None
+    return model_hash, quantized
+
+def explain_rows(rows: list, bundle: ModelBundle) -> list:
+    """
+    Model probability and SHAP values for (savings, attendance, repayment) rows.
     
-    # Debug: Print shape to understand structure
-    print(f"🔍 SHAP values type: {type(shap_values)}")
-    if isinstance(shap_values, list):
-        print(f"🔍 SHAP values list length: {len(shap_values)}")
-        for i, sv in enumerate(shap_values):
-            print(f"🔍 SHAP values[{i}] shape: {sv.shape if hasattr(sv, 'shape') else type(sv)}")
-    else:
-        print(f"🔍 SHAP values shape: {shap_values.shape}")
-    
-    # For binary classification, use the positive class (Low Risk)
-    if isinstance(shap_values, list) and len(shap_values) > 1:
-        # Binary classification: list of [class0_shap, class1_shap]
-        shap_vals = shap_values[1][0]  # Class 1 (Low Risk) values for first sample
-        expected_val = explainer.expected_value[1] if isinstance(explainer.expected_value, (list, np.ndarray)) else explainer.expected_value
-    elif isinstance(shap_values, list):
-        # Single output
-        shap_vals = shap_values[0][0]
-        expected_val = explainer.expected_value[0] if isinstance(explainer.expected_value, (list, np.ndarray)) else explainer.expected_value
-    else:
-        # Direct array output
-        shap_vals = shap_values[0]
-        expected_val = explainer.expected_value
-    
-    # Create SHAP Explanation object for waterfall plot
-    explanation = shap.Explanation(
-        values=shap_vals,
-        base_values=expected_val,
-        data=input_data[0],
-        feature_names=feature_names
-    )
+    Served from the explanation cache where possible; all misses are computed
+    in one vectorized predict_proba pass and one SHAP pass with the given bundle.
+    Returns a list of (key, entry) pairs in input order.
+    """
+    quantized = [quantize_inputs(*row) for row in rows]
+    keys = [explanation_key(inputs, bundle.model_hash) for inputs in quantized]
+    entries = [explanation_cache.get(key) for key in keys]
     
-    # Create figure with custom styling
-    fig, ax = plt.subplots(figsize=(10, 6))
-    plt.style.use('default')
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if missing:
+        matrix = np.array([quantized[i] for i in missing], dtype=float)
+        with stage_timer("predict_proba", rows=len(missing)):
+            risk_proba = bundle.predict_proba(matrix, FEATURE_NAMES)
+        positive_column = 1 if risk_proba.shape[1] > 1 else 0
+        with stage_timer("shap_values", rows=len(missing)):
+            shap_matrix, base_value = bundle.shap_values(matrix)
+        
+        for j, i in enumerate(missing):
+            entry = {
+                "inputs": quantized[i],
+                "low_risk_probability": float(risk_proba[j][positive_column]),
+                "shap_values": [float(v) for v in shap_matrix[j]],
+                "base_value": base_value
+            }
+            explanation_cache.set(keys[i], entry)
+            entries[i] = entry
     
-    # Generate waterfall plot
-    shap.plots.waterfall(explanation, max_display=10, show=False)
+    return list(zip(keys, entries))
+
+def resolve_explanation(key: str) -> dict:
+    """
+    Cached explanation for an id, recomputed from the id itself on a miss
+    (another worker made it, it expired, or the model was reloaded since).
+    """
+    entry = explanation_cache.get(key)
+    if entry is not None:
+        return entry
+    parsed = parse_explanation_key(key)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Explanation not found")
+    model_hash, inputs = parsed
+    bundle = active_model
+    if bundle is None or not bundle.model_hash.startswith(model_hash):
+        bundle = retired_models.get(model_hash)
+    if bundle is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Explanation was computed by a model that is no longer served. Please recalculate the score."
+        )
+    [(_, entry)] = explain_rows([inputs], bundle)
+    return entry
+
+async def get_explanation_png(key: str, entry: dict) -> Optional[bytes]:
+    """Return the cached waterfall PNG for an explanation, rendering it in the pool if needed."""
+    png = explanation_image_cache.get(key)
+    if png:
+        return png
     
-    # Customize the plot
-    plt.title("🔍 AI Explanation: What Influenced Your Score?", fontsize=14, fontweight='bold', pad=20)
-    plt.xlabel("Impact on Model Output (Low Risk Probability)", fontsize=10)
-    plt.tight_layout()
+    with stage_timer("png_render"):
+        png = await render_pool.render(
+            entry["shap_values"], entry["base_value"], entry["inputs"], FEATURE_NAMES
+        )
+    if png:
+        explanation_image_cache.set(key, png)
+    return png
+
+# Loan list responses never carry image blobs, only a reference to the blob store
+LOAN_LIST_PROJECTION = {"explanation_image": 0, "explanation": 0}
+
+def explanation_image_url(ref: str) -> Optional[str]:
+    """Public URL of a stored explanation PNG."""
+    return f"/explanation_images/{ref}.png" if ref else None
+
+def serialize_loan_request(doc: dict) -> dict:
+    """Prepare a loan_requests document for a JSON response."""
+    doc["_id"] = str(doc["_id"])
+    doc["explanation_image_url"] = explanation_image_url(doc.get("explanation_image_ref", ""))
+    return doc
+
+def decode_data_uri(data_uri: str) -> Optional[bytes]:
+    """Decode a Base64 image data URI (or bare Base64) into bytes."""
+    try:
+        return base64.b64decode(data_uri.split(",", 1)[-1], validate=True)
+    except Exception:
+        return None
+
+async def store_loan_explanation(savings: float, attendance: float, repayment: float,
+                                 explanation_image: Optional[str] = None) -> dict:
+    """
+    Explanation fields for a new loan_requests document: the explanation id,
+    a compact numeric SHAP snapshot and a reference into the blob store.
+    A legacy inline image from the client is moved to the blob store; otherwise
+    the waterfall is rendered from the loan's own inputs.
+    """
+    fields = {"explanation_id": "", "explanation": None, "explanation_image_ref": ""}
+    png = decode_data_uri(explanation_image) if explanation_image else None
     
-    # Save to BytesIO buffer
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight', 
-                facecolor='white', edgecolor='none')
-    plt.close(fig)
+    bundle = active_model
+    if bundle is not None:
+        try:
+            [(key, entry)] = explain_rows([(savings, attendance, repayment)], bundle)
+            fields["explanation_id"] = key
+            fields["explanation"] = {
+                "inputs": list(entry["inputs"]),
+                "shap_values": entry["shap_values"],
+                "base_value": entry["base_value"],
+                "model_version": bundle.version
+            }
+            if png is None:
+                png = await get_explanation_png(key, entry)
+        except Exception as e:
+            print(f"⚠️ Loan explanation error: {e}")
     
-    # Encode to Base64
-    buffer.seek(0)
-    img_base64 = base64.b64encode(buffer.read()).decode('utf-8')
+    if png and blob_store is not None:
+        try:
+            fields["explanation_image_ref"] = await blob_store.put(png)
+        except Exception as e:
+            print(f"⚠️ Explanation image store failed: {e}")
     
-    return f"data:image/png;base64,{img_base64}"
+    return fields
 
-def log_to_database(input_data: dict, score: int, risk: str) -> bool:
-    """Log prediction request to MongoDB."""
-    if collection is None:
-        return False
+async def resolve_loan_explanation_png(doc: dict) -> Optional[bytes]:
+    """
+    PNG for one loan request, whatever format it was stored in. Legacy inline
+    images and image-less snapshots are moved into the blob store on first access.
+    """
+    ref = doc.get("explanation_image_ref")
+    if ref and blob_store is not None:
+        png = await blob_store.get(ref)
+        if png:
+            return png
     
-    try:
-        log_entry = {
+    png = None
+    if doc.get("explanation_image"):
+        png = decode_data_uri(doc["explanation_image"])
+    elif doc.get("explanation"):
+        snapshot = doc["explanation"]
+        png = await render_pool.render(
+            snapshot["shap_values"], snapshot["base_value"], snapshot["inputs"], FEATURE_NAMES
+        )
+    
+    if png and blob_store is not None and repos is not None:
+        await repos.loan_requests.set_explanation_ref(doc["_id"], await blob_store.put(png))
+    return png
+
+async def log_to_database(input_data: dict, score: int, risk: str, model_version: Optional[str] = None):
+    """Queue a prediction audit record; the audit logger writes it to MongoDB in a batch."""
+    with stage_timer("audit_enqueue"):
+        await audit_log.log({
             "timestamp": datetime.utcnow(),
             "input": input_data,
             "score": score,
-            "risk": risk
+            "risk": risk,
+            "model_version": model_version
+        })
+
+async def log_batch_to_database(entries: list, model_version: Optional[str] = None):
+    """Queue the audit records of a batch prediction."""
+    now = datetime.utcnow()
+    await audit_log.log_many([
+        {
+            "timestamp": now,
+            "input": entry["input"],
+            "score": entry["score"],
+            "risk": entry["risk"],
+            "model_version": model_version,
+            "batch": True
         }
-        collection.insert_one(log_entry)
-        return True
-    except Exception as e:
-        print(f"⚠️ Database logging failed: {e}")
-        return False
+        for entry in entries
+    ])
+
+# ============================================================
+# Pagination Helpers
+# ============================================================
+
+def encode_cursor(sort_value, doc_id) -> str:
+    """Opaque keyset cursor pointing just past (sort_value, _id)."""
+    raw = json.dumps([sort_value, str(doc_id)], default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor; rejects malformed cursors with a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_keyset(query: dict, cursor: Optional[str], sort_field: str) -> dict:
+    """
+    Restrict a query to documents after the cursor in (sort_field desc, _id desc) order.
+    With sort_field="_id" the cursor is on _id alone.
+    """
+    if not cursor:
+        return query
+    
+    sort_value, doc_id = decode_cursor(cursor)
+    if sort_field == "_id":
+        after = {"_id": {"$lt": doc_id}}
+    else:
+        after = {"$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "_id": {"$lt": doc_id}}
+        ]}
+    return {"$and": [query, after]} if query else after
+
+def loan_list_params(
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[str] = Query(None, description="Status, or several separated by commas"),
+    branch_id: Optional[str] = Query(None, description="Branch ID"),
+    shg_name: Optional[str] = Query(None, description="SHG name"),
+    score_min: Optional[int] = Query(None, ge=0, le=100, description="Minimum credit score"),
+    score_max: Optional[int] = Query(None, ge=0, le=100, description="Maximum credit score"),
+    submitted_from: Optional[datetime] = Query(None, description="Submitted on or after (ISO 8601)"),
+    submitted_to: Optional[datetime] = Query(None, description="Submitted before (ISO 8601)")
+) -> dict:
+    """Shared pagination and filter query parameters for loan listing endpoints."""
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "status": status,
+        "branch_id": branch_id,
+        "shg_name": shg_name,
+        "score_min": score_min,
+        "score_max": score_max,
+        "submitted_from": submitted_from,
+        "submitted_to": submitted_to
+    }
+
+def stored_timestamp(value: datetime) -> str:
+    """
+    A client-supplied datetime in the form timestamps are stored in (naive UTC,
+    ISO 8601), so string comparisons against them are chronological.
+    Values with a UTC offset are converted; naive ones are taken as UTC.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+def build_loan_query(params: dict, fixed: Optional[dict] = None) -> dict:
+    """
+    MongoDB filter for a loan listing from the shared query parameters.
+    Keys in `fixed` (e.g. the caller's own user_id or SHG) always win.
+    """
+    query = {}
+    if params["status"]:
+        statuses = [s.strip() for s in params["status"].split(",") if s.strip()]
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if params["branch_id"]:
+        query["branch_id"] = params["branch_id"]
+    if params["shg_name"]:
+        query["shg_name"] = params["shg_name"]
+    
+    score_range = {}
+    if params["score_min"] is not None:
+        score_range["$gte"] = params["score_min"]
+    if params["score_max"] is not None:
+        score_range["$lte"] = params["score_max"]
+    if score_range:
+        query["score"] = score_range
+    
+    # submitted_at is stored as an ISO string, which sorts chronologically
+    date_range = {}
+    if params["submitted_from"]:
+        date_range["$gte"] = stored_timestamp(params["submitted_from"])
+    if params["submitted_to"]:
+        date_range["$lt"] = stored_timestamp(params["submitted_to"])
+    if date_range:
+        query["submitted_at"] = date_range
+    
+    query.update(fixed or {})
+    return query
+
+def stream_page(repository, query: dict, projection: Optional[dict], params: dict,
+                items_key: str, serialize, sort_field: str = "submitted_at") -> StreamingResponse:
+    """
+    Run one keyset page of a listing and stream it as JSON:
+    {"<items_key>": [...], "count": n, "next_cursor": "..." | null}
+    Documents are encoded one at a time as the async cursor yields them.
+    """
+    limit = params["limit"]
+    sort = [(sort_field, -1)] if sort_field == "_id" else [(sort_field, -1), ("_id", -1)]
+    mongo_cursor = repository.find_page(
+        apply_keyset(query, params["cursor"], sort_field), projection, sort, limit + 1
+    )
+    
+    async def generate():
+        yield '{"%s":[' % items_key
+        count = 0
+        last = None
+        has_more = False
+        async for doc in mongo_cursor:
+            if count == limit:
+                has_more = True
+                break
+            last = (doc.get(sort_field), doc["_id"])
+            yield ("," if count else "") + json.dumps(serialize(doc), default=str)
+            count += 1
+        next_cursor = encode_cursor(*last) if has_more and last else None
+        yield '],"count":%d,"next_cursor":%s}' % (count, json.dumps(next_cursor))
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+def serialize_user(doc: dict) -> dict:
+    """Prepare a users document (already stripped of the password) for a JSON response."""
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+# ============================================================
+# Password Hashing & Login Rate Limiting
+# ============================================================
+
+# scrypt cost; without PASSWORD_SCRYPT_N, n is calibrated at startup so one hash
+# takes at most PASSWORD_HASH_BUDGET_MS and PASSWORD_SCRYPT_MAX_MB on this machine
+# (python passwords.py shows the numbers). The first worker calibrates and saves
+# the result to PASSWORD_CALIBRATION_PATH; the others reuse it.
+PASSWORD_SCRYPT_N = os.getenv("PASSWORD_SCRYPT_N", "")
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_BUDGET_MS = float(os.getenv("PASSWORD_HASH_BUDGET_MS", "100"))
+PASSWORD_SCRYPT_MAX_MB = int(os.getenv("PASSWORD_SCRYPT_MAX_MB", "64"))
+PASSWORD_CALIBRATION_PATH = os.getenv(
+    "PASSWORD_CALIBRATION_PATH", os.path.join(os.path.dirname(__file__), ".password_calibration.json")
+)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Login attempts per minute and burst size, per username and per client IP
+LOGIN_USER_RATE = float(os.getenv("LOGIN_USER_RATE", "10"))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "60"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+
+password_hasher = PasswordHasher(
+    ScryptParams(int(PASSWORD_SCRYPT_N or 2 ** 15), PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P),
+    max_workers=PASSWORD_HASH_WORKERS
+)
+login_limiters = {
+    "user": TokenBucketLimiter(LOGIN_USER_RATE / 60, LOGIN_USER_BURST),
+    "ip": TokenBucketLimiter(LOGIN_IP_RATE / 60, LOGIN_IP_BURST)
+}
+password_calibration = {"status": "fixed" if PASSWORD_SCRYPT_N else "pending", "timings_ms": {}}
+
+async def calibrate_password_hashing():
+    """Pick scrypt's n for PASSWORD_HASH_BUDGET_MS; new hashes and rehashes use it from then on."""
+    params, timings, measured = await asyncio.to_thread(
+        calibrate_shared, PASSWORD_CALIBRATION_PATH, PASSWORD_HASH_BUDGET_MS,
+        PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P, PASSWORD_SCRYPT_MAX_MB * 1024 * 1024
+    )
+    password_hasher.params = params
+    password_calibration.update(status="calibrated" if measured else "shared", timings_ms=timings)
+    print(f"🔐 Password hashing: scrypt n=2^{params.n.bit_length() - 1} "
+          f"({timings[params.n]} ms, budget {PASSWORD_HASH_BUDGET_MS:g} ms"
+          f"{'' if measured else ', calibrated by another worker'})")
+
+def check_rate_limit(**keys):
+    """Spend one attempt from each limiter (e.g. ip=..., user=...); 429 with Retry-After when any is empty."""
+    wait = acquire_all([(login_limiters[scope], key) for scope, key in keys.items()])
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(max(1, int(wait + 0.999)))}
+        )
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+async def hash_password(password: str) -> str:
+    with stage_timer("password_hash"):
+        return await password_hasher.hash(password)
 
 # ============================================================
 # Token Authentication Helpers
 # ============================================================
 
-def generate_token(user_id: str) -> str:
+TOKEN_TTL = timedelta(hours=24)
+
+# "opaque": random tokens stored in auth_tokens (default)
+# "signed": HMAC-signed self-contained tokens, verified without a DB lookup
+TOKEN_MODE = os.getenv("TOKEN_MODE", "opaque")
+TOKEN_SECRET = os.getenv("TOKEN_SECRET", "")
+if TOKEN_MODE == "signed" and not TOKEN_SECRET:
+    print("⚠️ TOKEN_SECRET not set; signed tokens will not survive a restart or work across workers")
+    TOKEN_SECRET = secrets.token_urlsafe(32)
+
+# User fields carried in signed tokens and session cache entries
+SESSION_USER_FIELDS = ("username", "role", "branch_id", "kyc_verified", "full_name", "shg_name", "contact", "language")
+
+# token -> user; entries also expire with the token itself
+session_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+# Signed tokens cannot be deleted: logouts (by token id) and user changes (by user id)
+# refuse the tokens issued before them until those have expired
+TOKEN_REVOCATION_SIZE = int(os.getenv("TOKEN_REVOCATION_SIZE", "100000"))
+revoked_tokens = RevocationList(ttl=TOKEN_TTL.total_seconds(), maxsize=TOKEN_REVOCATION_SIZE)
+revoked_users = RevocationList(ttl=TOKEN_TTL.total_seconds(), maxsize=TOKEN_REVOCATION_SIZE)
+
+def session_user(user: dict) -> dict:
+    """The subset of a users document that identifies a session."""
+    session = {field: user.get(field) for field in SESSION_USER_FIELDS if user.get(field) is not None}
+    session["_id"] = str(user["_id"])
+    return session
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def sign_token(user: dict, expires_at: datetime) -> str:
+    """Self-contained token: base64url(payload).base64url(HMAC-SHA256(payload))."""
+    payload = {
+        "user": session_user(user),
+        "iat": round(time.time(), 6),
+        "exp": int(expires_at.timestamp()),
+        "jti": secrets.token_urlsafe(8)
+    }
+    body = _b64url(json.dumps(payload, separators=(",", ":")).encode())
+    signature = hmac.new(TOKEN_SECRET.encode(), body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64url(signature)}"
+
+def verify_signed_token(token: str) -> Optional[dict]:
+    """Check a signed token's signature, expiry and revocation without touching MongoDB."""
+    try:
+        body, signature = token.split(".", 1)
+        expected = hmac.new(TOKEN_SECRET.encode(), body.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        payload = json.loads(_b64url_decode(body))
+    except Exception:
+        return None
+    
+    if payload["exp"] <= datetime.utcnow().timestamp():
+        return None
+    # Tokens from before iat was added count as issued at 0, i.e. before any revocation
+    issued_at = payload.get("iat", 0)
+    if revoked_tokens.is_revoked(payload["jti"], issued_at) or revoked_users.is_revoked(payload["user"]["_id"], issued_at):
+        return None
+    return dict(payload["user"])
+
+async def generate_token(user: dict) -> str:
     """Generate a secure authentication token."""
+    expires_at = datetime.utcnow() + TOKEN_TTL
+    if TOKEN_MODE == "signed":
+        return sign_token(user, expires_at)
+    
     token = secrets.token_urlsafe(32)
-    if tokens_collection is not None:
-        tokens_collection.insert_one({
-            "token": token,
-            "user_id": user_id,
-            "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(hours=24)
-        })
+    if repos is not None:
+        await repos.tokens.insert(token, str(user["_id"]), expires_at)
+        # The first authenticated request after login needs no DB lookup
+        session_cache.set(token, session_user(user))
     return token
 
-def verify_token(token: str) -> Optional[dict]:
+async def verify_token(token: str) -> Optional[dict]:
     """Verify token and return user data."""
-    if tokens_collection is None or users_collection is None:
+    if TOKEN_MODE == "signed":
+        return verify_signed_token(token)
+    
+    cached = session_cache.get(token)
+    if cached is not None:
+        return dict(cached)
+    
+    if repos is None:
         return None
     
     try:
-        token_doc = tokens_collection.find_one({
-            "token": token,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        if not token_doc:
+        with stage_timer("token_lookup"):
+            token_doc = await repos.tokens.find_valid(token)
+            user = await repos.users.find_by_id(token_doc["user_id"]) if token_doc else None
+        if not user:
             return None
         
-        user = users_collection.find_one({"_id": ObjectId(token_doc["user_id"])})
-        if user:
-            user["_id"] = str(user["_id"])
-        return user
+        session = session_user(user)
+        remaining = (token_doc["expires_at"] - datetime.utcnow()).total_seconds()
+        session_cache.set(token, session, ttl=min(SESSION_CACHE_TTL, remaining))
+        return dict(session)
     except Exception:
         return None
 
-def get_current_user(authorization: str = Header(None)) -> dict:
+def invalidate_token(token: str):
+    """Forget one token (logout)."""
+    session_cache.pop(token)
+    if TOKEN_MODE == "signed":
+        try:
+            body = token.split(".", 1)[0]
+            revoked_tokens.revoke(json.loads(_b64url_decode(body))["jti"])
+        except Exception:
+            pass
+
+def invalidate_user_sessions(user_id: str):
+    """
+    Drop every cached session of a user after deletion or a role/profile change.
+    Signed tokens issued before now stop working; logging in again works at once.
+    """
+    session_cache.pop_where(lambda token, user: user.get("_id") == user_id)
+    if TOKEN_MODE == "signed":
+        revoked_users.revoke(user_id)
+
+async def get_current_user(authorization: str = Header(None)) -> dict:
     """Dependency to get current authenticated user from token."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
@@ -449,7 +1200,7 @@ def get_current_user(authorization: str = Header(None)) -> dict:
     # Extract token from "Bearer <token>" format
     token = authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization
     
-    user = verify_token(token)
+    user = await verify_token(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
@@ -457,8 +1208,8 @@ def get_current_user(authorization: str = Header(None)) -> dict:
 
 def require_role(allowed_roles: list):
     """Dependency factory to require specific roles."""
-    def role_checker(authorization: str = Header(None)) -> dict:
-        user = get_current_user(authorization)
+    async def role_checker(authorization: str = Header(None)) -> dict:
+        user = await get_current_user(authorization)
         if user.get("role") not in allowed_roles:
             raise HTTPException(
                 status_code=403, 
@@ -467,6 +1218,40 @@ def require_role(allowed_roles: list):
         return user
     return role_checker
 
+# ============================================================
+# Metrics
+# ============================================================
+
+# Read at scrape time; request, stage and MongoDB timings are recorded in metrics.py
+CACHES = {
+    "explanation": explanation_cache,
+    "explanation_image": explanation_image_cache,
+    "session": session_cache,
+    "portfolio": portfolio_cache
+}
+
+def cache_metric(attribute: str):
+    return lambda: [({"cache": name}, getattr(cache, attribute)) for name, cache in CACHES.items()]
+
+REGISTRY.callback("sakhi_cache_hits_total", "Cache lookups that found an entry", cache_metric("hits"), "counter")
+REGISTRY.callback("sakhi_cache_misses_total", "Cache lookups that found nothing", cache_metric("misses"), "counter")
+REGISTRY.callback("sakhi_cache_evictions_total", "Entries dropped to stay within maxsize", cache_metric("evictions"), "counter")
+REGISTRY.callback("sakhi_cache_entries", "Entries currently cached", lambda: [
+    ({"cache": name}, len(cache)) for name, cache in CACHES.items()
+])
+REGISTRY.callback("sakhi_render_pool_queue_depth", "PNG renders running or queued", lambda: render_pool.queue_depth)
+REGISTRY.callback("sakhi_audit_queue_depth", "Audit records waiting to be written", lambda: audit_log.queue_depth)
+REGISTRY.callback("sakhi_loan_event_subscribers", "Open /loan/events streams", lambda: loan_events.subscriber_count)
+REGISTRY.callback("sakhi_login_rate_limited_total", "Login and registration attempts refused with 429", lambda: [
+    ({"scope": scope}, limiter.rejected) for scope, limiter in login_limiters.items()
+], "counter")
+REGISTRY.callback("sakhi_revoked_sessions", "Signed-token revocations remembered until expiry", lambda: [
+    ({"kind": "token"}, len(revoked_tokens)), ({"kind": "user"}, len(revoked_users))
+])
+REGISTRY.callback("sakhi_model_info", "Model version being served", lambda: [
+    ({"version": active_model.version}, 1)
+] if active_model is not None else [])
+
 # ============================================================
 # API Endpoints
 # ============================================================
@@ -474,14 +1259,33 @@ def require_role(allowed_roles: list):
 @app.on_event("startup")
 async def startup_event():
     """Initialize connections on app startup."""
+    global blob_store, model_reload_task
     print("\n" + "=" * 50)
     print("🚀 SAKHICIRCLE API STARTING...")
     print("=" * 50)
     
-    connect_to_mongodb()
-    load_model()
+    if EXPLANATION_STORE == "local":
+        blob_store = LocalBlobStore(EXPLANATION_STORE_DIR)
+    # Records logged before the database is up are spilled and replayed later
+    audit_log.start()
+    # Workers import matplotlib/shap in their own processes
+    render_pool.start()
+    
+    # Database and model warm-up run concurrently
+    model_reload_task = asyncio.create_task(warm_up_model())
+    startup_tasks[:] = [asyncio.create_task(connect_to_mongodb()), model_reload_task]
+    if not PASSWORD_SCRYPT_N:
+        startup_tasks.append(asyncio.create_task(calibrate_password_hashing()))
+    if not BACKGROUND_STARTUP:
+        await asyncio.gather(*startup_tasks)
+    if MODEL_WATCH_INTERVAL > 0:
+        startup_tasks.append(asyncio.create_task(watch_model_registry()))
+    if EVENT_LOOP_LAG_INTERVAL > 0:
+        startup_tasks.append(asyncio.create_task(monitor_event_loop_lag(EVENT_LOOP_LAG_INTERVAL)))
     
     print("=" * 50)
+    if BACKGROUND_STARTUP:
+        print("⏳ Database and model loading in the background (see /health)")
     print("✅ API Ready at http://localhost:8000")
     print("📚 Docs at http://localhost:8000/docs")
     print("=" * 50 + "\n")
@@ -489,8 +1293,16 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on app shutdown."""
-    if mongo_client:
-        mongo_client.close()
+    # Ends open /loan/events streams
+    loan_events.close()
+    for task in startup_tasks:
+        task.cancel()
+    render_pool.shutdown()
+    password_hasher.shutdown()
+    # Write out queued audit records while the database is still connected
+    await audit_log.stop()
+    if mongo_client is not None:
+        await mongo_client.close()
         print("👋 MongoDB connection closed")
 
 @app.get("/")
@@ -505,41 +1317,62 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check."""
+    """Detailed health check; status is "starting" until every component has finished loading."""
+    # Snapshot: the model loader updates readiness from its thread
+    components = {name: dict(state) for name, state in readiness.items()}
+    states = [component["status"] for component in components.values()]
+    if all(state == "ready" for state in states):
+        status = "healthy"
+    elif any(state in ("pending", "starting") for state in states):
+        status = "starting"
+    else:
+        status = "degraded"
     return {
-        "status": "healthy",
-        "model_loaded": model is not None,
-        "shap_ready": explainer is not None,
-        "database_connected": collection is not None
+        "status": status,
+        "components": components,
+        "model_loaded": active_model is not None,
+        "model": active_model.info() if active_model is not None else None,
+        "model_reload": model_reload_state,
+        "database_connected": repos is not None,
+        "render_pool": render_pool.stats(),
+        "audit_log": audit_log.stats(),
+        "explanation_cache": explanation_cache.stats(),
+        "explanation_image_cache": explanation_image_cache.stats(),
+        "token_mode": TOKEN_MODE,
+        "token_revocations": {"tokens": revoked_tokens.stats(), "users": revoked_users.stats()},
+        "session_cache": session_cache.stats(),
+        "loan_events": {"source": loan_events_source, **loan_events.stats()},
+        "password_hashing": {"scrypt": password_hasher.params._asdict(), **password_calibration},
+        "login_rate_limits": {scope: limiter.stats() for scope, limiter in login_limiters.items()}
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint: request, stage and MongoDB latencies, caches, pools and event-loop lag."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_credit_score(input_data: PredictionInput):
+async def predict_credit_score(input_data: PredictionInput, include_image: bool = False):
     """
     Predict credit score for a Self-Help Group.
     
     Returns:
     - score: Credit score (0-100)
     - risk: Risk classification (High Risk / Low Risk)
-    - explanation_image: SHAP waterfall plot as Base64 PNG
+    - shap_values / base_value: numeric SHAP contributions
+    - explanation_id / explanation_url: waterfall PNG rendered on demand
+    - explanation_image: Base64 PNG, only when include_image=true
+      (empty when the render pool is saturated or times out)
     """
-    if model is None:
-        raise HTTPException(
-            status_code=503, 
-            detail="Model not loaded. Please run model_trainer.py first."
-        )
-    
-    # Prepare input for model
-    feature_names = ['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']
-    import pandas as pd
-    input_df = pd.DataFrame(
-        [[input_data.savings, input_data.attendance, input_data.repayment]],
-        columns=feature_names
-    )
+    require_component("model", "Model not loaded. Please run model_trainer.py first.")
+    require_component("explainer", "SHAP explainer failed to load.")
+    bundle = active_model  # this request stays on this version even if a reload swaps it
     
-    # Get model prediction (risk classification)
-    risk_prediction = model.predict(input_df)[0]
-    risk_proba = model.predict_proba(input_df)[0]
+    # Model probability and SHAP values (cached per quantized input + model)
+    try:
+        [(key, entry)] = explain_rows([(input_data.savings, input_data.attendance, input_data.repayment)], bundle)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
     
     # Calculate credit score
     credit_score = calculate_credit_score(
@@ -549,45 +1382,159 @@ async def predict_credit_score(input_data: PredictionInput):
     )
     
     # Determine risk status
-    risk_status = "Low Risk ✅" if credit_score >= 60 else "High Risk ⚠️"
-    risk_color = "#22c55e" if credit_score >= 60 else "#ef4444"
+    risk_status, risk_color = get_risk_label(credit_score)
     
-    # Generate SHAP explanation image
-    try:
-        explanation_image = generate_shap_waterfall(input_df.values, feature_names)
-    except Exception as e:
-        print(f"⚠️ SHAP visualization error: {e}")
-        explanation_image = ""
+    # Inline image only on request; otherwise clients fetch explanation_url
+    explanation_image = None
+    if include_image:
+        try:
+            png = await get_explanation_png(key, entry)
+            with stage_timer("base64_encode"):
+                explanation_image = to_data_uri(png) if png else ""
+        except Exception as e:
+            print(f"⚠️ SHAP visualization error: {e}")
+            explanation_image = ""
     
     # Log to database
-    log_to_database(
+    await log_to_database(
         input_data=input_data.dict(),
         score=credit_score,
-        risk=risk_status
+        risk=risk_status,
+        model_version=bundle.version
     )
     
     return PredictionResponse(
         score=credit_score,
         risk=risk_status,
         risk_color=risk_color,
+        explanation_id=key,
+        explanation_url=f"/explanations/{key}.png",
+        shap_values=dict(zip(FEATURE_NAMES, entry["shap_values"])),
+        base_value=entry["base_value"],
         explanation_image=explanation_image,
         features={
             "savings_per_member": input_data.savings,
             "attendance_rate": input_data.attendance,
             "loan_repayment_rate": input_data.repayment,
-            "low_risk_probability": float(risk_proba[1]) if len(risk_proba) > 1 else float(risk_proba[0])
+            "low_risk_probability": entry["low_risk_probability"]
         },
+        model_version=bundle.version,
+        timestamp=datetime.utcnow().isoformat()
+    )
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_credit_score_batch(batch: BatchPredictionInput):
+    """
+    Score many Self-Help Groups in one call (e.g. month-end rescoring).
+    
+    Runs a single vectorized predict_proba pass and a single SHAP pass over
+    all rows not already in the explanation cache. Waterfall images are only
+    rendered for rows with include_image=true.
+    """
+    require_component("model", "Model not loaded. Please run model_trainer.py first.")
+    require_component("explainer", "SHAP explainer failed to load.")
+    bundle = active_model
+    
+    rows = batch.rows
+    
+    # Cache hits are reused; misses get one model pass and one SHAP pass
+    try:
+        explained = explain_rows([(row.savings, row.attendance, row.repayment) for row in rows], bundle)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+    
+    # Render requested images concurrently in the worker pool
+    image_rows = [i for i, row in enumerate(rows) if row.include_image]
+    rendered = await asyncio.gather(
+        *(get_explanation_png(*explained[i]) for i in image_rows),
+        return_exceptions=True
+    )
+    with stage_timer("base64_encode", images=len(image_rows)):
+        images = {
+            i: (to_data_uri(png) if isinstance(png, bytes) else "")
+            for i, png in zip(image_rows, rendered)
+        }
+    
+    results = []
+    log_entries = []
+    for i, row in enumerate(rows):
+        credit_score = calculate_credit_score(row.savings, row.attendance, row.repayment)
+        risk_status, risk_color = get_risk_label(credit_score)
+        
+        results.append(BatchPredictionItem(
+            group_id=row.group_id,
+            score=credit_score,
+            risk=risk_status,
+            risk_color=risk_color,
+            low_risk_probability=explained[i][1]["low_risk_probability"],
+            explanation_id=explained[i][0],
+            shap_values=dict(zip(FEATURE_NAMES, explained[i][1]["shap_values"])),
+            explanation_image=images.get(i)
+        ))
+        log_entries.append({
+            "input": row.dict(include={"savings", "attendance", "repayment", "group_id"}),
+            "score": credit_score,
+            "risk": risk_status
+        })
+    
+    # Log the whole batch in one write
+    await log_batch_to_database(log_entries, bundle.version)
+    
+    return BatchPredictionResponse(
+        results=results,
+        count=len(results),
+        model_version=bundle.version,
         timestamp=datetime.utcnow().isoformat()
     )
 
+@app.get("/explanations/{explanation_id}.png")
+async def get_explanation_image(explanation_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    SHAP waterfall PNG for a prediction, rendered on first request.
+    Explanation ids are content addresses, so the image is immutable and cacheable.
+    """
+    etag = f'"{explanation_id}"'
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={EXPLANATION_IMAGE_MAX_AGE}, immutable"
+    }
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cache_headers)
+    
+    entry = resolve_explanation(explanation_id)
+    png = await get_explanation_png(explanation_id, entry)
+    if not png:
+        raise HTTPException(
+            status_code=503,
+            detail="Explanation renderer is busy. Please retry.",
+            headers={"Retry-After": "1"}
+        )
+    
+    return Response(content=png, media_type="image/png", headers=cache_headers)
+
+@app.get("/explanations/{explanation_id}")
+async def get_explanation(explanation_id: str):
+    """Structured SHAP explanation (base value and per-feature contributions) for a prediction."""
+    entry = resolve_explanation(explanation_id)
+    return {
+        "explanation_id": explanation_id,
+        "base_value": entry["base_value"],
+        "contributions": [
+            {"feature": name, "value": value, "shap_value": shap_value}
+            for name, value, shap_value in zip(FEATURE_NAMES, entry["inputs"], entry["shap_values"])
+        ],
+        "low_risk_probability": entry["low_risk_probability"],
+        "image_url": f"/explanations/{explanation_id}.png"
+    }
+
 @app.get("/logs")
 async def get_prediction_logs(limit: int = 10):
     """Retrieve recent prediction logs from database."""
-    if collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        logs = list(collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit))
+        logs = await repos.prediction_logs.recent(limit)
         return {"logs": logs, "count": len(logs)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -599,10 +1546,14 @@ async def submit_loan_request(request: LoanRequest):
     Saves the request with status 'Pending' to MongoDB.
     LEGACY: Use /loan/apply with authentication instead.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
+        explanation_fields = await store_loan_explanation(
+            request.savings, request.attendance, request.repayment, request.explanation_image
+        )
+        
         request_data = {
             "request_id": str(ObjectId()),
             "group_id": request.shg_name,
@@ -613,7 +1564,7 @@ async def submit_loan_request(request: LoanRequest):
             "repayment": request.repayment,
             "score": request.score,
             "risk": request.risk,
-            "explanation_image": request.explanation_image,
+            **explanation_fields,
             "status": "Pending",
             "user_id": request.user_id or "",
             "submitted_at": datetime.utcnow().isoformat(),
@@ -621,41 +1572,33 @@ async def submit_loan_request(request: LoanRequest):
             "manager_notes": ""
         }
         
-        result = requests_collection.insert_one(request_data)
+        inserted_id = await repos.loan_requests.insert(request_data)
+        publish_loan_event("created", request_data)
         
         return {
             "success": True,
             "message": "Loan request submitted successfully",
-            "request_id": str(result.inserted_id)
+            "request_id": inserted_id
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to submit request: {str(e)}")
 
 @app.get("/get_requests")
-async def get_loan_requests(status: Optional[str] = None):
+async def get_loan_requests(params: dict = Depends(loan_list_params)):
     """
     Get loan requests for Bank Manager.
     Optionally filter by status (Pending, Approved, Rejected).
+    Paginated with limit/cursor; see loan_list_params for filters.
     LEGACY: Use /loan/all with authentication instead.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        query = {}
-        if status:
-            query["status"] = status
-        
-        requests = list(requests_collection.find(query).sort("submitted_at", -1))
-        
-        # Convert ObjectId to string for JSON serialization
-        for req in requests:
-            req["_id"] = str(req["_id"])
-        
-        return {
-            "requests": requests,
-            "count": len(requests)
-        }
+        query = build_loan_query(params)
+        return stream_page(repos.loan_requests, query, LOAN_LIST_PROJECTION, params, "requests", serialize_loan_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch requests: {str(e)}")
 
@@ -666,30 +1609,22 @@ async def update_request_status(update: UpdateStatusRequest):
     Used by Bank Manager.
     LEGACY: Use /loan/update_status with authentication instead.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        update_data = {
-            "status": update.status,
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-        if update.manager_notes:
-            update_data["manager_notes"] = update.manager_notes
-        
-        result = requests_collection.update_one(
-            {"_id": ObjectId(update.request_id)},
-            {"$set": update_data}
+        request = await apply_transition(
+            repos.loan_requests, "approve" if update.status == "Approved" else "reject", update.request_id,
+            actor="", notes=update.manager_notes, expected_version=update.version, projection=EVENT_PROJECTION
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Request not found")
+        publish_loan_event("status_changed", request)
         
         return {
             "success": True,
             "message": f"Request {update.status.lower()} successfully"
         }
+    except TransitionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update status: {str(e)}")
 
@@ -698,29 +1633,37 @@ async def update_request_status(update: UpdateStatusRequest):
 # ============================================================
 
 @app.post("/login")
-async def login_user(credentials: UserLogin):
+async def login_user(credentials: UserLogin, request: Request):
     """
     Login endpoint - Returns token, role, and username.
     Checks credentials against MongoDB users collection.
+    Attempts are rate limited per client IP and per username (429 with Retry-After).
     """
-    if users_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
+    check_rate_limit(ip=client_ip(request), user=credentials.username.lower())
+    
     try:
-        # Hash the provided password
-        hashed_password = hashlib.sha256(credentials.password.encode()).hexdigest()
+        user = await repos.users.find_by_username(credentials.username)
         
-        # Find user with matching username and password
-        user = users_collection.find_one({
-            "username": credentials.username,
-            "password": hashed_password
-        })
-        
-        if not user:
+        # Unknown users still cost one hash, so they cannot be told apart by timing
+        with stage_timer("password_verify"):
+            matches, needs_rehash = await password_hasher.verify(
+                credentials.password, user.get("password") if user else None
+            )
+        if not matches:
             raise HTTPException(status_code=401, detail="Invalid username or password")
         
+        # Legacy SHA-256 hashes and weaker scrypt parameters are upgraded on the way in
+        if needs_rehash:
+            try:
+                await repos.users.set_password(user["_id"], await hash_password(credentials.password))
+            except Exception as e:
+                print(f"⚠️ Failed to rehash password for {user['username']}: {e}")
+        
         # Generate token
-        token = generate_token(str(user["_id"]))
+        token = await generate_token(user)
         
         return {
             "success": True,
@@ -756,23 +1699,26 @@ class PublicRegister(BaseModel):
     language: str = Field(default="en", description="Preferred language: en, hi, ta, mr")
 
 @app.post("/register")
-async def register_user(data: PublicRegister):
+async def register_user(data: PublicRegister, request: Request):
     """
     Public registration endpoint.
     - Admin (SHG Representative): Can calculate credit score for their SHG group
     - User (SHG Member): Can apply for loans using group's credit score
+    Shares the per-IP login rate limit, since each registration costs a password hash.
     """
-    if users_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
+    check_rate_limit(ip=client_ip(request))
+    
     try:
         # Check if username already exists
-        existing_user = users_collection.find_one({"username": data.username})
+        existing_user = await repos.users.find_by_username(data.username)
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already exists")
         
         # Hash password
-        hashed_password = hashlib.sha256(data.password.encode()).hexdigest()
+        hashed_password = await hash_password(data.password)
         
         # Create user document
         new_user = {
@@ -789,7 +1735,7 @@ async def register_user(data: PublicRegister):
             "created_by": "self_registration"
         }
         
-        result = users_collection.insert_one(new_user)
+        await repos.users.insert(new_user)
         
         role_description = "SHG Representative (can calculate group credit score)" if data.role == "admin" else "SHG Member (can apply for loans)"
         
@@ -814,17 +1760,17 @@ async def admin_create_user(
     Admin Only: Create a new user with specific role.
     Only admins can create new users (no public signup).
     """
-    if users_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
         # Check if username already exists
-        existing_user = users_collection.find_one({"username": user_data.username})
+        existing_user = await repos.users.find_by_username(user_data.username)
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already exists")
         
         # Hash password
-        hashed_password = hashlib.sha256(user_data.password.encode()).hexdigest()
+        hashed_password = await hash_password(user_data.password)
         
         new_user = {
             "username": user_data.username,
@@ -840,12 +1786,12 @@ async def admin_create_user(
             "created_by": current_user["username"]
         }
         
-        result = users_collection.insert_one(new_user)
+        inserted_id = await repos.users.insert(new_user)
         
         return {
             "success": True,
             "message": f"User '{user_data.username}' created successfully with role '{user_data.role}'",
-            "user_id": str(result.inserted_id)
+            "user_id": inserted_id
         }
     except HTTPException:
         raise
@@ -854,28 +1800,116 @@ async def admin_create_user(
 
 @app.get("/admin/users")
 async def get_all_users(
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    role: Optional[str] = Query(None, description="Filter by role"),
+    shg_name: Optional[str] = Query(None, description="Filter by SHG name"),
+    branch_id: Optional[str] = Query(None, description="Filter by branch ID"),
     current_user: dict = Depends(require_role(["admin"]))
 ):
-    """Admin Only: Get all users in the system."""
-    if users_collection is None:
+    """Admin Only: Get all users in the system (newest first, paginated)."""
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        users = list(users_collection.find({}, {"password": 0}))
-        for user in users:
-            user["_id"] = str(user["_id"])
-        
-        return {"users": users, "count": len(users)}
+        query = {}
+        if role:
+            query["role"] = role
+        if shg_name:
+            query["shg_name"] = shg_name
+        if branch_id:
+            query["branch_id"] = branch_id
+        
+        params = {"limit": limit, "cursor": cursor}
+        return stream_page(repos.users, query, {"password": 0}, params, "users", serialize_user, sort_field="_id")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
+@app.get("/admin/indexes")
+async def get_index_report(
+    check_plans: bool = False,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """
+    Admin Only: Index usage stats for every registered collection.
+    With check_plans=true, also explains each endpoint's query shape and
+    reports whether it uses the index the registry expects.
+    """
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        report = {"indexes": await index_usage(db)}
+        if check_plans:
+            plans = await check_query_plans(db)
+            report["query_plans"] = plans
+            report["all_plans_ok"] = all(p["ok"] for p in plans)
+        return report
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch index stats: {str(e)}")
+
+@app.get("/admin/model")
+async def get_model_status(current_user: dict = Depends(require_role(["admin"]))):
+    """Admin Only: The model version being served, the last reload and the registry's versions."""
+    try:
+        versions = await asyncio.to_thread(model_registry.versions)
+        current = await asyncio.to_thread(model_registry.current)
+        return {
+            "active": active_model.info() if active_model is not None else None,
+            "reload": model_reload_state,
+            "registry": {
+                "path": MODEL_REGISTRY_DIR,
+                "current": current,
+                "versions": versions,
+                "watch_interval_seconds": MODEL_WATCH_INTERVAL
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch model status: {str(e)}")
+
+@app.post("/admin/model/reload")
+async def reload_model_endpoint(
+    request: ModelReloadRequest,
+    response: Response,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """
+    Admin Only: Load and warm up a model version in the background, then swap
+    it in. The current version keeps serving until the swap, and requests
+    already running finish on it.
+    
+    A version named here becomes the registry's current version once it is
+    serving, so the other API worker processes pick it up through their
+    registry watch. Returns 202 while loading, or the result when wait=true.
+    """
+    if request.version is not None:
+        try:
+            model_registry.paths(request.version)
+        except (KeyError, ValueError) as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+    
+    try:
+        task = start_model_reload(request.version, make_current=True)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if not request.wait:
+        response.status_code = 202
+        return {"success": True, "message": "Model reload started", "reload": model_reload_state}
+    
+    if not await task:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {model_reload_state['error']}")
+    return {"success": True, "message": f"Now serving model {active_model.version}", "model": active_model.info()}
+
 @app.delete("/admin/delete_user/{user_id}")
 async def delete_user(
     user_id: str,
     current_user: dict = Depends(require_role(["admin"]))
 ):
     """Admin Only: Delete a user."""
-    if users_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
@@ -883,11 +1917,13 @@ async def delete_user(
         if user_id == current_user["_id"]:
             raise HTTPException(status_code=400, detail="Cannot delete yourself")
         
-        result = users_collection.delete_one({"_id": ObjectId(user_id)})
-        
-        if result.deleted_count == 0:
+        if not await repos.users.delete(user_id):
             raise HTTPException(status_code=404, detail="User not found")
         
+        # Log the deleted user out everywhere
+        await repos.tokens.delete_for_user(user_id)
+        invalidate_user_sessions(user_id)
+        
         return {"success": True, "message": "User deleted successfully"}
     except HTTPException:
         raise
@@ -908,21 +1944,13 @@ async def apply_for_loan(
     Saves the request to loan_requests collection with status 'Pending Admin Review'.
     The SHG Admin must review and forward to the Manager.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        # Check if user already has a pending application (any pending status)
-        existing_request = requests_collection.find_one({
-            "user_id": current_user["_id"],
-            "status": {"$in": ["Pending Admin Review", "Pending Manager Review"]}
-        })
-        
-        if existing_request:
-            raise HTTPException(
-                status_code=400, 
-                detail="You already have a pending loan application. Please wait for it to be processed."
-            )
+        explanation_fields = await store_loan_explanation(
+            loan_data.savings, loan_data.attendance, loan_data.repayment, loan_data.explanation_image
+        )
         
         request_data = {
             "request_id": str(ObjectId()),
@@ -937,8 +1965,11 @@ async def apply_for_loan(
             "repayment": loan_data.repayment,
             "score": loan_data.score,
             "risk": loan_data.risk,
-            "explanation_image": loan_data.explanation_image or "",
-            "status": "Pending Admin Review",
+            **explanation_fields,
+            "status": PENDING_ADMIN_REVIEW,
+            # One open application per member, enforced by a partial unique index
+            "open_application": True,
+            "version": 0,
             "user_id": current_user["_id"],
             "username": current_user["username"],
             "branch_id": current_user.get("branch_id", ""),
@@ -948,12 +1979,19 @@ async def apply_for_loan(
             "manager_notes": ""
         }
         
-        result = requests_collection.insert_one(request_data)
+        try:
+            inserted_id = await repos.loan_requests.insert(request_data)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=400, 
+                detail="You already have a pending loan application. Please wait for it to be processed."
+            )
+        publish_loan_event("created", request_data)
         
         return {
             "success": True,
             "message": "Loan application submitted successfully",
-            "request_id": str(result.inserted_id)
+            "request_id": inserted_id
         }
     except HTTPException:
         raise
@@ -962,71 +2000,56 @@ async def apply_for_loan(
 
 @app.get("/loan/my_requests")
 async def get_my_loan_requests(
+    params: dict = Depends(loan_list_params),
     current_user: dict = Depends(require_role(["user"]))
 ):
     """User Only: Get own loan request history."""
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        requests = list(requests_collection.find(
-            {"user_id": current_user["_id"]}
-        ).sort("submitted_at", -1))
-        
-        for req in requests:
-            req["_id"] = str(req["_id"])
-        
-        return {"requests": requests, "count": len(requests)}
+        query = build_loan_query(params, fixed={"user_id": current_user["_id"]})
+        return stream_page(repos.loan_requests, query, LOAN_LIST_PROJECTION, params, "requests", serialize_loan_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch requests: {str(e)}")
 
 @app.get("/loan/all")
 async def get_all_pending_loans(
+    params: dict = Depends(loan_list_params),
     current_user: dict = Depends(require_role(["manager"]))
 ):
     """
     Manager Only: Get all loan requests with status='Pending Manager Review'.
     These are requests that have been forwarded by the SHG Admin.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        query = {"status": "Pending Manager Review"}
-        
-        # Optionally filter by branch
-        # if current_user.get("branch_id"):
-        #     query["branch_id"] = current_user["branch_id"]
-        
-        requests = list(requests_collection.find(query).sort("submitted_at", -1))
-        
-        for req in requests:
-            req["_id"] = str(req["_id"])
-        
-        return {"requests": requests, "count": len(requests)}
+        # Branch, SHG, score and date filters come from the query string
+        query = build_loan_query(params, fixed={"status": "Pending Manager Review"})
+        return stream_page(repos.loan_requests, query, LOAN_LIST_PROJECTION, params, "requests", serialize_loan_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch requests: {str(e)}")
 
 @app.get("/loan/history")
 async def get_loan_history(
-    status: Optional[str] = None,
+    params: dict = Depends(loan_list_params),
     current_user: dict = Depends(require_role(["manager", "admin"]))
 ):
-    """Manager/Admin: Get loan request history with optional status filter."""
-    if requests_collection is None:
+    """Manager/Admin: Get loan request history with optional status, branch, SHG, score and date filters."""
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        query = {}
-        if status:
-            query["status"] = status
-        
-        requests = list(requests_collection.find(query).sort("submitted_at", -1))
-        
-        for req in requests:
-            req["_id"] = str(req["_id"])
-        
-        return {"requests": requests, "count": len(requests)}
+        query = build_loan_query(params)
+        return stream_page(repos.loan_requests, query, LOAN_LIST_PROJECTION, params, "requests", serialize_loan_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch requests: {str(e)}")
 
@@ -1036,28 +2059,25 @@ async def get_loan_history(
 
 @app.get("/loan/pending_admin_review")
 async def get_pending_admin_review(
+    params: dict = Depends(loan_list_params),
     current_user: dict = Depends(require_role(["admin"]))
 ):
     """
     Admin Only: Get all loan requests from members of their SHG group
     that are pending admin review.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
         # Filter by SHG name to get only requests from this admin's group
-        query = {
+        query = build_loan_query(params, fixed={
             "status": "Pending Admin Review",
             "shg_name": current_user.get("shg_name", "")
-        }
-        
-        requests = list(requests_collection.find(query).sort("submitted_at", -1))
-        
-        for req in requests:
-            req["_id"] = str(req["_id"])
-        
-        return {"requests": requests, "count": len(requests)}
+        })
+        return stream_page(repos.loan_requests, query, LOAN_LIST_PROJECTION, params, "requests", serialize_loan_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch requests: {str(e)}")
 
@@ -1070,47 +2090,25 @@ async def forward_loan_to_manager(
     Admin Only: Forward a loan request to the manager for final approval.
     Changes status from 'Pending Admin Review' to 'Pending Manager Review'.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        # Verify the request exists and belongs to this admin's SHG
-        existing = requests_collection.find_one({
-            "_id": ObjectId(forward_data.request_id),
-            "shg_name": current_user.get("shg_name", ""),
-            "status": "Pending Admin Review"
-        })
-        
-        if not existing:
-            raise HTTPException(
-                status_code=404, 
-                detail="Loan request not found or already processed"
-            )
-        
-        update_data = {
-            "status": "Pending Manager Review",
-            "updated_at": datetime.utcnow().isoformat(),
-            "forwarded_by": current_user["username"],
-            "forwarded_at": datetime.utcnow().isoformat()
-        }
-        
-        if forward_data.admin_notes:
-            update_data["admin_notes"] = forward_data.admin_notes
-        
-        result = requests_collection.update_one(
-            {"_id": ObjectId(forward_data.request_id)},
-            {"$set": update_data}
+        # Only matches a request of this admin's SHG still awaiting admin review
+        request = await apply_transition(
+            repos.loan_requests, "forward", forward_data.request_id, current_user["username"],
+            notes=forward_data.admin_notes, shg_name=current_user.get("shg_name", ""),
+            expected_version=forward_data.version, projection=LOAN_LIST_PROJECTION
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Loan request not found")
+        publish_loan_event("status_changed", request)
         
         return {
             "success": True,
-            "message": "Loan request forwarded to manager successfully"
+            "message": "Loan request forwarded to manager successfully",
+            "request": serialize_loan_request(request)
         }
-    except HTTPException:
-        raise
+    except TransitionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to forward request: {str(e)}")
 
@@ -1122,47 +2120,24 @@ async def reject_loan_by_admin(
     """
     Admin Only: Reject a loan request without forwarding to manager.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        # Verify the request exists and belongs to this admin's SHG
-        existing = requests_collection.find_one({
-            "_id": ObjectId(forward_data.request_id),
-            "shg_name": current_user.get("shg_name", ""),
-            "status": "Pending Admin Review"
-        })
-        
-        if not existing:
-            raise HTTPException(
-                status_code=404, 
-                detail="Loan request not found or already processed"
-            )
-        
-        update_data = {
-            "status": "Rejected by Admin",
-            "updated_at": datetime.utcnow().isoformat(),
-            "rejected_by": current_user["username"],
-            "rejected_at": datetime.utcnow().isoformat()
-        }
-        
-        if forward_data.admin_notes:
-            update_data["admin_notes"] = forward_data.admin_notes
-        
-        result = requests_collection.update_one(
-            {"_id": ObjectId(forward_data.request_id)},
-            {"$set": update_data}
+        request = await apply_transition(
+            repos.loan_requests, "reject_by_admin", forward_data.request_id, current_user["username"],
+            notes=forward_data.admin_notes, shg_name=current_user.get("shg_name", ""),
+            expected_version=forward_data.version, projection=LOAN_LIST_PROJECTION
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Loan request not found")
+        publish_loan_event("status_changed", request)
         
         return {
             "success": True,
-            "message": "Loan request rejected"
+            "message": "Loan request rejected",
+            "request": serialize_loan_request(request)
         }
-    except HTTPException:
-        raise
+    except TransitionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to reject request: {str(e)}")
 
@@ -1174,45 +2149,125 @@ async def update_loan_status(
     """
     Manager Only: Update loan request status to Approved or Rejected.
     """
-    if requests_collection is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        update_data = {
-            "status": update.status,
-            "updated_at": datetime.utcnow().isoformat(),
-            "reviewed_by": current_user["username"],
-            "reviewed_at": datetime.utcnow().isoformat()
-        }
-        
-        if update.manager_notes:
-            update_data["manager_notes"] = update.manager_notes
-        
-        result = requests_collection.update_one(
-            {"_id": ObjectId(update.request_id)},
-            {"$set": update_data}
+        request = await apply_transition(
+            repos.loan_requests, "approve" if update.status == "Approved" else "reject", update.request_id,
+            current_user["username"], notes=update.manager_notes, expected_version=update.version,
+            projection=LOAN_LIST_PROJECTION
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Loan request not found")
+        publish_loan_event("status_changed", request)
         
         return {
             "success": True,
-            "message": f"Loan request {update.status.lower()} successfully"
+            "message": f"Loan request {update.status.lower()} successfully",
+            "request": serialize_loan_request(request)
         }
-    except HTTPException:
-        raise
+    except TransitionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update status: {str(e)}")
 
+def bulk_review_report(results: list) -> dict:
+    """Response of the bulk review endpoints: counts per outcome and the per-item results in input order."""
+    summary = {}
+    for result in results:
+        summary[result["result"]] = summary.get(result["result"], 0) + 1
+    return {
+        "success": True,
+        "processed": len(results),
+        "succeeded": summary.get("ok", 0),
+        "summary": summary,
+        "results": results
+    }
+
+@app.post("/loan/bulk/admin_review")
+async def bulk_admin_review(
+    review: BulkAdminReviewRequest,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """
+    Admin Only: forward or reject many requests of your SHG in one call.
+    Items are applied independently; each gets ok, conflict (already
+    processed or version changed), not_found or duplicate.
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        actions = [
+            ("forward" if item.action == "forward" else "reject_by_admin", item.request_id, item.admin_notes, item.version)
+            for item in review.items
+        ]
+        with stage_timer("bulk_review", items=len(actions)):
+            results = await apply_transitions(
+                repos.loan_requests, actions, current_user["username"], shg_name=current_user.get("shg_name", ""),
+                projection=EVENT_PROJECTION, on_applied=lambda doc: publish_loan_event("status_changed", doc)
+            )
+        return bulk_review_report(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to review requests: {str(e)}")
+
+@app.post("/loan/bulk/update_status")
+async def bulk_update_loan_status(
+    update: BulkStatusRequest,
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """
+    Manager Only: approve or reject many requests in one call, with a
+    per-item result like /loan/bulk/admin_review.
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        actions = [
+            ("approve" if item.status == "Approved" else "reject", item.request_id, item.manager_notes, item.version)
+            for item in update.items
+        ]
+        with stage_timer("bulk_review", items=len(actions)):
+            results = await apply_transitions(
+                repos.loan_requests, actions, current_user["username"],
+                projection=EVENT_PROJECTION, on_applied=lambda doc: publish_loan_event("status_changed", doc)
+            )
+        return bulk_review_report(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update requests: {str(e)}")
+
+@app.get("/loan/events")
+async def stream_loan_events(
+    token: Optional[str] = Query(None, description="Session token, for EventSource clients that cannot send headers"),
+    authorization: str = Header(None),
+    last_event_id: Optional[str] = Header(None, description="Resume after this event (sent by EventSource on reconnect)")
+):
+    """
+    Server-Sent Events of loan requests being created or changing status,
+    limited to what the caller's dashboard shows. Event types: ready, loan
+    (the request as in the list endpoints), resync (refetch the list).
+    """
+    user = await get_current_user(authorization or (f"Bearer {token}" if token else None))
+    resume_after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        loan_events.stream(lambda event: visible_to(event, user), resume_after, LOAN_EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/logout")
 async def logout_user(authorization: str = Header(None)):
     """Logout and invalidate token."""
-    if not authorization or tokens_collection is None:
+    if authorization and TOKEN_MODE == "signed":
+        invalidate_token(authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization)
+        return {"success": True, "message": "Logged out successfully"}
+    
+    if not authorization or repos is None:
         return {"success": True, "message": "Logged out"}
     
     token = authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization
-    tokens_collection.delete_one({"token": token})
+    await repos.tokens.delete(token)
+    invalidate_token(token)
     
     return {"success": True, "message": "Logged out successfully"}
 
@@ -1220,25 +2275,39 @@ async def logout_user(authorization: str = Header(None)):
 # SHG Group Data Endpoints (New Flow)
 # ============================================================
 
-SHG_GROUPS_COLLECTION = "shg_groups"
-SCORE_LOGS_COLLECTION_NAME = "score_logs"
-
-def get_shg_groups_collection():
-    """Get or create SHG groups collection."""
-    if db is None:
-        return None
-    return db[SHG_GROUPS_COLLECTION]
-
-def get_score_logs_collection():
-    """Get or create score logs collection for historical tracking."""
-    if db is None:
-        return None
-    return db[SCORE_LOGS_COLLECTION_NAME]
-
 def get_month_label(dt: datetime) -> str:
     """Convert datetime to month label like 'January 2026'."""
     return dt.strftime("%B %Y")
 
+def get_month_key(dt: datetime) -> str:
+    """Month of a score_rollups document, e.g. '2026-01' (sorts chronologically)."""
+    return dt.strftime("%Y-%m")
+
+def first_month_key(now: datetime, months: int) -> str:
+    """Key of the oldest month in a window of `months` months ending with now's month."""
+    index = now.year * 12 + now.month - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def rollup_point(count: int, score_sum: float, score_min: float, score_max: float, month: str) -> dict:
+    return {
+        "month": month,
+        "month_label": get_month_label(datetime.strptime(month, "%Y-%m")),
+        "count": count,
+        "min": score_min,
+        "max": score_max,
+        "mean": round(score_sum / count, 2) if count else None
+    }
+
+def serialize_rollup(doc: dict) -> dict:
+    """One month of one SHG from score_rollups."""
+    last = doc.get("last") or {}
+    return {
+        **rollup_point(doc["count"], doc["score_sum"], doc["score_min"], doc["score_max"], doc["month"]),
+        "last": last.get("score"),
+        "last_risk": last.get("risk"),
+        "last_timestamp": last.get("timestamp")
+    }
+
 @app.post("/score/log")
 async def log_score_history(
     data: dict,
@@ -1248,8 +2317,7 @@ async def log_score_history(
     Admin (SHG Rep): Log a new score calculation to history.
     Appends to history instead of overwriting.
     """
-    score_logs = get_score_logs_collection()
-    if score_logs is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
@@ -1271,10 +2339,22 @@ async def log_score_history(
             },
             "calculated_score": data.get("score", 0),
             "risk_status": data.get("risk", "Unknown"),
-            "logged_by": current_user["username"]
+            "logged_by": current_user["username"],
+            "branch_id": current_user.get("branch_id", "")
         }
         
-        score_logs.insert_one(score_log)
+        await repos.score_logs.insert(score_log)
+        
+        # The log is the source of truth: a failed rollup update is repaired by /score/rollups/rebuild
+        score = score_log["calculated_score"]
+        if isinstance(score, (int, float)) and not isinstance(score, bool):
+            try:
+                await repos.score_rollups.record(
+                    shg_name, score_log["branch_id"], get_month_key(now),
+                    score_log["timestamp"], score, score_log["risk_status"]
+                )
+            except Exception as e:
+                print(f"⚠️ Score rollup update failed: {e}")
         
         return {
             "success": True,
@@ -1296,19 +2376,14 @@ async def get_score_history(
     Get historical score data for an SHG group.
     Returns last N entries (default 6 for 6-month view).
     """
-    score_logs = get_score_logs_collection()
-    if score_logs is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        print(f"DEBUG: Fetching score history for SHG: {shg_name}, limit: {limit}")
-        
         # Get last N score logs for this group, sorted by timestamp descending
-        logs = list(score_logs.find(
-            {"shg_name": shg_name}
-        ).sort("timestamp", -1).limit(limit))
-        
-        print(f"DEBUG: Found {len(logs)} score log entries")
+        with stage_timer("score_history_query", shg_name=shg_name, limit=limit) as timing:
+            logs = await repos.score_logs.history(shg_name, limit)
+            timing["entries"] = len(logs)
         
         # Convert ObjectId to string and format for response
         history = []
@@ -1322,7 +2397,6 @@ async def get_score_history(
                 "score": log.get("calculated_score", 0),
                 "risk": log.get("risk_status", "Unknown")
             }
-            print(f"DEBUG: Entry - {entry}")
             history.append(entry)
         
         # Reverse to show oldest first (chronological order)
@@ -1336,6 +2410,94 @@ async def get_score_history(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch history: {str(e)}")
 
+@app.get("/score/trends")
+async def get_branch_score_trends(
+    branch_id: Optional[str] = Query(None, description="Branch ID (default: your own branch)"),
+    months: int = Query(12, ge=1, le=120),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """
+    Manager: monthly score trends of every SHG in a branch, plus the branch
+    as a whole, read from score_rollups (one document per SHG and month).
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    branch_id = branch_id or current_user.get("branch_id")
+    if not branch_id:
+        raise HTTPException(status_code=400, detail="branch_id is required")
+    
+    try:
+        since = first_month_key(datetime.utcnow(), months)
+        with stage_timer("score_trends_query", branch_id=branch_id, months=months) as timing:
+            rollups = await repos.score_rollups.for_branch(branch_id, since)
+            timing["documents"] = len(rollups)
+        
+        shgs = {}
+        branch = {}
+        for doc in rollups:
+            shgs.setdefault(doc["shg_name"], []).append(serialize_rollup(doc))
+            total = branch.setdefault(doc["month"], {"count": 0, "score_sum": 0, "score_min": None, "score_max": None})
+            total["count"] += doc["count"]
+            total["score_sum"] += doc["score_sum"]
+            total["score_min"] = doc["score_min"] if total["score_min"] is None else min(total["score_min"], doc["score_min"])
+            total["score_max"] = doc["score_max"] if total["score_max"] is None else max(total["score_max"], doc["score_max"])
+        
+        return {
+            "branch_id": branch_id,
+            "since": since,
+            "shgs": [{"shg_name": name, "series": series} for name, series in shgs.items()],
+            "branch": [rollup_point(month=month, **total) for month, total in sorted(branch.items())]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch trends: {str(e)}")
+
+@app.get("/score/trends/{shg_name}")
+async def get_score_trends(
+    shg_name: str,
+    months: int = Query(6, ge=1, le=120),
+    current_user: dict = Depends(require_role(["admin", "manager"]))
+):
+    """Monthly min/max/mean/last score of an SHG over the last N months, oldest first."""
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        since = first_month_key(datetime.utcnow(), months)
+        rollups = await repos.score_rollups.for_shg(shg_name, since)
+        return {
+            "shg_name": shg_name,
+            "since": since,
+            "series": [serialize_rollup(doc) for doc in rollups]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch trends: {str(e)}")
+
+@app.post("/score/rollups/rebuild")
+async def rebuild_score_rollups(
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """
+    Manager: recompute score_rollups from score_logs, e.g. to backfill logs
+    written before rollups existed. Logs without a branch_id take the branch
+    of their SHG's admin account.
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        started = time.perf_counter()
+        rollups = await repos.score_logs.monthly_rollups()
+        branches = await repos.users.branches_by_shg()
+        for rollup in rollups:
+            if not rollup.get("branch_id"):
+                rollup["branch_id"] = branches.get(rollup["shg_name"], "")
+        written = await repos.score_rollups.replace_all(rollups)
+        print(f"✅ Rebuilt {written} score rollups in {time.perf_counter() - started:.2f}s")
+        return {"success": True, "rollups": written}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild rollups: {str(e)}")
+
 @app.get("/shg/group_data")
 async def get_group_data(
     current_user: dict = Depends(require_role(["admin"]))
@@ -1343,8 +2505,7 @@ async def get_group_data(
     """
     Admin (SHG Representative): Get their SHG group's financial data.
     """
-    shg_groups = get_shg_groups_collection()
-    if shg_groups is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
@@ -1352,29 +2513,18 @@ async def get_group_data(
         if not shg_name:
             return {"group_data": None, "members": [], "loan_requests": []}
         
-        # Get group data
-        group_data = shg_groups.find_one({"shg_name": shg_name})
+        # Group data, members and recent loan requests are independent queries
+        group_data, members, loan_requests = await asyncio.gather(
+            repos.shg_groups.find(shg_name),
+            repos.users.members(shg_name),
+            repos.loan_requests.recent_for_shg(shg_name, LOAN_LIST_PROJECTION, 10)
+        )
         if group_data:
             group_data["_id"] = str(group_data["_id"])
-        
-        # Get members of this SHG
-        members = []
-        if users_collection:
-            member_list = list(users_collection.find(
-                {"shg_name": shg_name, "role": "user"}, 
-                {"password": 0}
-            ))
-            for m in member_list:
-                m["_id"] = str(m["_id"])
-            members = member_list
-        
-        # Get loan requests from this SHG
-        loan_requests = []
-        if requests_collection:
-            req_list = list(requests_collection.find({"shg_name": shg_name}).sort("submitted_at", -1).limit(10))
-            for r in req_list:
-                r["_id"] = str(r["_id"])
-            loan_requests = req_list
+        for m in members:
+            m["_id"] = str(m["_id"])
+        for r in loan_requests:
+            serialize_loan_request(r)
         
         return {
             "group_data": group_data,
@@ -1392,21 +2542,16 @@ async def update_group_data(
     """
     Admin (SHG Representative): Update their SHG group's financial data and score.
     """
-    shg_groups = get_shg_groups_collection()
-    if shg_groups is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
         shg_name = current_user.get("shg_name")
-        print(f"DEBUG: Current user data: {current_user}")
-        print(f"DEBUG: SHG Name from user: {shg_name}")
         if not shg_name:
             # Try to fix by updating the user in database
-            if users_collection and current_user.get("username") == "shakti_shg":
-                users_collection.update_one(
-                    {"username": "shakti_shg"},
-                    {"$set": {"shg_name": "Shakti Mahila SHG"}}
-                )
+            if current_user.get("username") == "shakti_shg":
+                await repos.users.set_shg_name("shakti_shg", "Shakti Mahila SHG")
+                invalidate_user_sessions(current_user["_id"])
                 shg_name = "Shakti Mahila SHG"
                 print("✅ Fixed shakti_shg user - added SHG name")
             else:
@@ -1424,11 +2569,8 @@ async def update_group_data(
         }
         
         # Upsert - update if exists, insert if not
-        shg_groups.update_one(
-            {"shg_name": shg_name},
-            {"$set": group_data},
-            upsert=True
-        )
+        with stage_timer("group_data_update", shg_name=shg_name):
+            await repos.shg_groups.upsert(shg_name, group_data)
         
         return {
             "success": True,
@@ -1446,8 +2588,7 @@ async def get_my_group_data(
     """
     User (SHG Member): Get their SHG group's credit score data.
     """
-    shg_groups = get_shg_groups_collection()
-    if shg_groups is None:
+    if repos is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
@@ -1455,7 +2596,7 @@ async def get_my_group_data(
         if not shg_name:
             return {"score": None, "message": "You are not assigned to any SHG group"}
         
-        group_data = shg_groups.find_one({"shg_name": shg_name})
+        group_data = await repos.shg_groups.find(shg_name)
         
         if not group_data:
             return {
@@ -1476,6 +2617,256 @@ async def get_my_group_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch group data: {str(e)}")
 
+# ============================================================
+# Portfolio Analytics Endpoints
+# ============================================================
+
+SCORE_BIN_WIDTH = 10  # score histograms have bins [0, 10), [10, 20), ... [90, 100]
+TIMING_FIELDS = ("decision_hours", "admin_review_hours", "manager_review_hours")
+
+def _portfolio_group() -> dict:
+    return {
+        "by_status": {},
+        "amount_sum": 0,
+        "amount_count": 0,
+        "loan_score_histogram": [0] * (100 // SCORE_BIN_WIDTH),
+        "logged_score_histogram": [0] * (100 // SCORE_BIN_WIDTH),
+        "group_score_histogram": [0] * (100 // SCORE_BIN_WIDTH),
+        "logged_count": 0,
+        "logged_sum": 0
+    }
+
+def _finish_portfolio_group(group: dict, timings: Optional[dict]) -> dict:
+    """Counts and sums accumulated by build_portfolio -> response fields."""
+    by_status = group.pop("by_status")
+    amount_sum, amount_count = group.pop("amount_sum"), group.pop("amount_count")
+    logged_count, logged_sum = group.pop("logged_count"), group.pop("logged_sum")
+    decided = sum(by_status.get(status, 0) for status in DECIDED_STATUSES)
+    return {
+        "requests": sum(by_status.values()),
+        "by_status": by_status,
+        "loan_amount_total": amount_sum,
+        "loan_amount_avg": round(amount_sum / amount_count, 2) if amount_count else None,
+        "approval_rate": round(by_status.get(APPROVED, 0) / decided, 4) if decided else None,
+        **{
+            f"median_{field}": round(timings[field], 2) if timings and timings.get(field) is not None else None
+            for field in TIMING_FIELDS
+        },
+        "logged_scores": logged_count,
+        "logged_score_mean": round(logged_sum / logged_count, 2) if logged_count else None,
+        **group
+    }
+
+def build_portfolio(facets: dict, logged: list, current_scores: list, branches: dict,
+                    branch_id: Optional[str]) -> dict:
+    """
+    Overall, per-branch and per-SHG figures from the grouped rows of
+    LoanRequestRepository.portfolio(), ScoreLogRepository.score_bins() and
+    ShgGroupRepository.current_scores(). SHGs without a branch_id on their
+    rows take the branch of their admin account (branches).
+    """
+    overall = _portfolio_group()
+    by_branch = {}
+    by_shg = {}
+
+    def groups_of(branch: str, shg_name: str) -> list:
+        if branch not in by_branch:
+            by_branch[branch] = _portfolio_group()
+        if (branch, shg_name) not in by_shg:
+            by_shg[(branch, shg_name)] = _portfolio_group()
+        return [overall, by_branch[branch], by_shg[(branch, shg_name)]]
+
+    for row in facets.get("shgs", []):
+        key = row["_id"]
+        for group in groups_of(key["branch_id"], key["shg_name"]):
+            group["by_status"][key["status"]] = group["by_status"].get(key["status"], 0) + row["count"]
+            group["amount_sum"] += row["amount_sum"]
+            group["amount_count"] += row["amount_count"]
+    for row in facets.get("score_bins", []):
+        key = row["_id"]
+        for group in groups_of(key["branch_id"], key["shg_name"]):
+            group["loan_score_histogram"][int(key["bin"]) // SCORE_BIN_WIDTH] += row["count"]
+    for row in logged:
+        if row["bin"] is None:
+            continue
+        branch = row.get("branch_id") or branches.get(row["shg_name"], "")
+        if branch_id and branch != branch_id:
+            continue
+        for group in groups_of(branch, row["shg_name"]):
+            group["logged_score_histogram"][int(row["bin"]) // SCORE_BIN_WIDTH] += row["count"]
+            group["logged_count"] += row["count"]
+            group["logged_sum"] += row["score_sum"]
+    current = {}
+    for doc in current_scores:
+        branch = branches.get(doc["shg_name"], "")
+        if branch_id and branch != branch_id:
+            continue
+        groups_of(branch, doc["shg_name"])
+        current[(branch, doc["shg_name"])] = doc
+        if isinstance(doc.get("score"), (int, float)):
+            score_bin = min(max(int(doc["score"]) // SCORE_BIN_WIDTH, 0), 100 // SCORE_BIN_WIDTH - 1)
+            overall["group_score_histogram"][score_bin] += 1
+            by_branch[branch]["group_score_histogram"][score_bin] += 1
+
+    timings_by_shg = {(row["_id"]["branch_id"], row["_id"]["shg_name"]): row for row in facets.get("timings_by_shg", [])}
+    timings_by_branch = {row["_id"]: row for row in facets.get("timings_by_branch", [])}
+    timings_overall = (facets.get("timings_overall") or [None])[0]
+
+    shgs = []
+    for (branch, shg_name), group in sorted(by_shg.items()):
+        # One group has one current score, not a histogram
+        del group["group_score_histogram"]
+        doc = current.get((branch, shg_name), {})
+        shgs.append({
+            "shg_name": shg_name,
+            "branch_id": branch,
+            "current_score": doc.get("score"),
+            "current_risk": doc.get("risk"),
+            **_finish_portfolio_group(group, timings_by_shg.get((branch, shg_name)))
+        })
+    return {
+        "score_bins": list(range(0, 100, SCORE_BIN_WIDTH)),
+        "overall": _finish_portfolio_group(overall, timings_overall),
+        "branches": [
+            {"branch_id": branch, **_finish_portfolio_group(group, timings_by_branch.get(branch))}
+            for branch, group in sorted(by_branch.items())
+        ],
+        "shgs": shgs
+    }
+
+@app.get("/analytics/portfolio")
+async def get_portfolio_analytics(
+    branch_id: Optional[str] = Query(None, description="Only this branch (default: every branch)"),
+    submitted_from: Optional[datetime] = Query(None, description="Requests submitted (and scores logged) on or after (ISO 8601)"),
+    submitted_to: Optional[datetime] = Query(None, description="Requests submitted (and scores logged) before (ISO 8601)"),
+    refresh: bool = Query(False, description="Recompute instead of serving a cached result"),
+    current_user: dict = Depends(require_role(["manager"]))
+):
+    """
+    Manager: loan portfolio per branch and per SHG - requests by status, loan
+    amounts, approval rate, median review times and score histograms of loan
+    requests, current group scores and logged scores. Computed by MongoDB
+    aggregations and cached for ANALYTICS_CACHE_TTL seconds.
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    # ISO strings, like submitted_at and score_logs timestamps
+    since = stored_timestamp(submitted_from) if submitted_from else None
+    until = stored_timestamp(submitted_to) if submitted_to else None
+    cache_key = (branch_id, since, until)
+    if not refresh:
+        cached = portfolio_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    try:
+        query = {"branch_id": branch_id} if branch_id else {}
+        window = {key: value for key, value in (("$gte", since), ("$lt", until)) if value}
+        if window:
+            query["submitted_at"] = window
+        with stage_timer("portfolio_aggregation", branch_id=branch_id):
+            facets, logged, current_scores, branches = await asyncio.gather(
+                repos.loan_requests.portfolio(query, SCORE_BIN_WIDTH),
+                repos.score_logs.score_bins(SCORE_BIN_WIDTH, since, until),
+                repos.shg_groups.current_scores(),
+                repos.users.branches_by_shg()
+            )
+        result = {
+            "generated_at": datetime.utcnow().isoformat(),
+            "filters": {"branch_id": branch_id, "submitted_from": since, "submitted_to": until},
+            **build_portfolio(facets, logged, current_scores, branches, branch_id)
+        }
+        portfolio_cache.set(cache_key, result)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute portfolio: {str(e)}")
+
+# ============================================================
+# Explanation Image Endpoints
+# ============================================================
+
+@app.get("/explanation_images/{digest}.png")
+async def get_stored_explanation_image(digest: str, if_none_match: Optional[str] = Header(None)):
+    """Stored SHAP waterfall PNG by content digest (immutable, cacheable)."""
+    etag = f'"{digest}"'
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={EXPLANATION_IMAGE_MAX_AGE}, immutable"
+    }
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cache_headers)
+    
+    if blob_store is None:
+        raise HTTPException(status_code=503, detail="Explanation image store not available")
+    
+    png = await blob_store.get(digest)
+    if png is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    return Response(content=png, media_type="image/png", headers=cache_headers)
+
+@app.get("/loan/{request_id}/explanation_image")
+async def get_loan_explanation_image(
+    request_id: str,
+    current_user: dict = Depends(require_role(["user", "admin", "manager"]))
+):
+    """
+    SHAP waterfall PNG for a single loan request.
+    Users see their own requests, admins their SHG's, managers all.
+    """
+    if repos is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        query = {"_id": ObjectId(request_id)}
+        if current_user["role"] == "user":
+            query["user_id"] = current_user["_id"]
+        elif current_user["role"] == "admin":
+            query["shg_name"] = current_user.get("shg_name", "")
+        
+        doc = await repos.loan_requests.find_one(
+            query,
+            {"explanation_image_ref": 1, "explanation_image": 1, "explanation": 1}
+        )
+        if not doc:
+            raise HTTPException(status_code=404, detail="Loan request not found")
+        
+        png = await resolve_loan_explanation_png(doc)
+        if not png:
+            raise HTTPException(status_code=404, detail="No explanation image for this request")
+        
+        return Response(content=png, media_type="image/png", headers={"Cache-Control": "private, max-age=3600"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch explanation image: {str(e)}")
+
+@app.post("/admin/migrate_explanation_images")
+async def migrate_explanation_images(
+    limit: int = 500,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """
+    Admin Only: Move inline Base64 images from loan_requests documents into the
+    blob store, replacing them with a reference. Safe to run repeatedly.
+    """
+    if repos is None or blob_store is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        migrated = 0
+        for doc in await repos.loan_requests.with_inline_images(limit):
+            png = decode_data_uri(doc["explanation_image"])
+            ref = await blob_store.put(png) if png else None
+            await repos.loan_requests.set_explanation_ref(doc["_id"], ref)
+            migrated += 1
+        
+        remaining = await repos.loan_requests.count_inline_images()
+        return {"success": True, "migrated": migrated, "remaining": remaining}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration failed: {str(e)}")
+
 # ============================================================
 # Legacy Endpoints (Backwards Compatibility)
 # ============================================================
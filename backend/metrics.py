@@ -0,0 +1,356 @@
+"""
+SakhiCircle: Metrics
+In-process counters, gauges and latency histograms rendered in the Prometheus
+text format for GET /metrics, plus the instrumentation main.py uses:
+
+    with stage_timer("shap_values", rows=len(matrix)) as timing:
+        ...
+        timing["cache_misses"] = n
+
+records the block's duration in sakhi_stage_seconds{stage="shap_values"} and,
+for a sampled fraction of calls (configure_timing_log), prints the timing
+with its fields as one JSON line. Also here: an ASGI middleware timing every
+request by route, pymongo listeners for per-collection command latency and
+connection-pool waits, and an event-loop lag probe.
+
+Values are per process; with several uvicorn workers each is scraped (or
+summed) separately.
+"""
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from pymongo import monitoring
+
+# Seconds; covers a cached /predict (~1 ms) up to a slow PNG render or Atlas round trip
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list:
+        """[(suffix, labels, value)] for rendering."""
+        with self._lock:
+            return [("", dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> list:
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        samples = []
+        for key, counts, total, count in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append(("_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+class _Callback(_Metric):
+    """Values read from fn() at scrape time: a number, or [(labels, value)]."""
+
+    def __init__(self, name: str, help_text: str, metric_type: str, fn: Callable):
+        super().__init__(name, help_text)
+        self.type = metric_type
+        self.fn = fn
+
+    def samples(self) -> list:
+        result = self.fn()
+        if isinstance(result, (int, float)):
+            return [("", {}, result)]
+        return [("", labels, value) for labels, value in result]
+
+
+class MetricsRegistry:
+    """All metrics of the process, in registration order."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, fn: Callable, metric_type: str = "gauge"):
+        """A metric computed on every scrape (pool depths, cache counters, ...)."""
+        return self._register(_Callback(name, help_text, metric_type, fn))
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "sakhi_stage_seconds", "Duration of instrumented pipeline stages", ["stage"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "sakhi_http_request_seconds", "HTTP request duration until the last body byte, by route", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("sakhi_http_requests_in_flight", "HTTP requests being handled")
+MONGO_COMMAND_SECONDS = REGISTRY.histogram(
+    "sakhi_mongo_command_seconds", "MongoDB command round-trip time", ["collection", "command"]
+)
+MONGO_COMMAND_FAILURES = REGISTRY.counter(
+    "sakhi_mongo_command_failures_total", "MongoDB commands that failed", ["collection", "command"]
+)
+MONGO_CHECKOUT_SECONDS = REGISTRY.histogram(
+    "sakhi_mongo_pool_checkout_seconds", "Time waiting for a pooled MongoDB connection"
+)
+MONGO_POOL = REGISTRY.gauge(
+    "sakhi_mongo_pool_connections", "MongoDB pool connections by state (waiting = checkouts queued)", ["state"]
+)
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "sakhi_event_loop_lag_seconds", "How late the event loop woke a sleeping probe task"
+)
+
+_timing_log_sample_rate = 0.0
+
+
+def configure_timing_log(sample_rate: float):
+    """Print this fraction (0..1) of stage timings as JSON lines."""
+    global _timing_log_sample_rate
+    _timing_log_sample_rate = max(0.0, min(1.0, sample_rate))
+
+
+@contextmanager
+def stage_timer(stage: str, **fields):
+    """
+    Time a block as one pipeline stage. The yielded dict starts with `fields`;
+    anything added to it is included in the sampled log line.
+    """
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if _timing_log_sample_rate and random.random() < _timing_log_sample_rate:
+            print(json.dumps({"event": "timing", "stage": stage, "ms": round(seconds * 1000, 3), **fields},
+                             default=str))
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware feeding sakhi_http_request_seconds; streamed bodies count until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.inc(-1)
+            # Route templates keep the label set small; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"],
+                route=getattr(route, "path", "unmatched"), status=status["code"]
+            )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per collection and command latency of every MongoDB command the client sends."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+        return target if isinstance(target, str) else ""
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = self._collection(event)
+
+    def _finish(self, event) -> tuple:
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        return collection, event.command_name
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        collection, command = self._finish(event)
+        MONGO_COMMAND_FAILURES.inc(collection=collection, command=command)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Connections checked out, and checkouts waiting for a free connection."""
+
+    def __init__(self):
+        self._waiting = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    def _update(self, waiting: int = 0, in_use: int = 0):
+        with self._lock:
+            self._waiting += waiting
+            self._in_use += in_use
+            MONGO_POOL.set(self._waiting, state="waiting")
+            MONGO_POOL.set(self._in_use, state="in_use")
+
+    def connection_check_out_started(self, event):
+        self._update(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(waiting=-1)
+
+    def connection_checked_out(self, event):
+        self._update(waiting=-1, in_use=1)
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            MONGO_CHECKOUT_SECONDS.observe(duration)
+
+    def connection_checked_in(self, event):
+        self._update(in_use=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sleep `interval` in a loop and record how much later than asked each wake-up came."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - started - interval, 0.0))
@@ -0,0 +1,217 @@
+"""
+SakhiCircle: Memory-Mapped Model Artifact
+The compiled forest and TreeShap arrays (see inference.py) in one flat file
+that API workers map read-only instead of unpickling shg_model.pkl. Every
+uvicorn worker on a node then shares the same physical pages, loading takes
+milliseconds and neither sklearn nor shap has to be imported to serve
+predictions.
+
+Layout (little-endian):
+
+    8 bytes   magic b"SAKHIMDL"
+    uint32    format version
+    uint32    header length
+    header    UTF-8 JSON: array table (dtype, shape, offset), scalars, the
+              sha256 of the source pickle and of the data section
+    padding   to a 64-byte boundary
+    data      the arrays, each starting on a 64-byte boundary
+
+Export from an existing pickle with `python model_artifact.py [shg_model.pkl]`;
+model_trainer.save_model writes one next to every pickle it saves.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from inference import CompiledForest, TreeShap, compile_model, compile_tree_shap
+
+MAGIC = b"SAKHIMDL"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")  # magic, format version, header length
+
+# Artifact section -> class rebuilt from it
+_SECTIONS = {"forest": CompiledForest, "tree_shap": TreeShap}
+
+
+class ArtifactError(ValueError):
+    """The file is not a usable model artifact (wrong magic or version, corrupt data)."""
+
+
+def artifact_path(model_path: str) -> str:
+    """Where the artifact for a pickled model lives: shg_model.pkl -> shg_model.bin."""
+    return os.path.splitext(model_path)[0] + ".bin"
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def export_model(model, path: str, source_sha256: str = "", feature_names=None,
+                 compiled: CompiledForest = None, tree_shap: TreeShap = None) -> dict:
+    """
+    Write the artifact for a fitted forest and return its header.
+
+    compiled / tree_shap are built (and validated against sklearn and shap)
+    when not given. The file is written next to path and renamed into place,
+    so workers that still map the previous version keep a consistent view.
+    """
+    compiled = compiled if compiled is not None else compile_model(model)
+    tree_shap = tree_shap if tree_shap is not None else compile_tree_shap(model)
+    if feature_names is None and hasattr(model, "feature_names_in_"):
+        feature_names = [str(name) for name in model.feature_names_in_]
+
+    table, blobs, scalars, offset = {}, [], {}, 0
+    for section, obj in (("forest", compiled), ("tree_shap", tree_shap)):
+        arrays, section_scalars = obj.arrays()
+        scalars[section] = {
+            name: value.item() if isinstance(value, np.generic) else value
+            for name, value in section_scalars.items()
+        }
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            offset = _align(offset)
+            table[f"{section}.{name}"] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+                "nbytes": array.nbytes
+            }
+            blobs.append((offset, array.tobytes()))
+            offset += array.nbytes
+
+    data = bytearray(_align(offset))
+    for start, blob in blobs:
+        data[start:start + len(blob)] = blob
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "source_sha256": source_sha256,
+        "feature_names": list(feature_names or []),
+        "scalars": scalars,
+        "arrays": table,
+        "data_nbytes": len(data),
+        "data_sha256": hashlib.sha256(data).hexdigest()
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes))
+    padding = _align(len(preamble) + len(header_bytes)) - len(preamble) - len(header_bytes)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(preamble)
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return header
+
+
+class ModelArtifact:
+    """
+    A model artifact mapped read-only.
+
+    compiled_forest and tree_shap are backed directly by the mapping, so the
+    operating system shares their pages between every process that maps the
+    same file. The mapping stays open for the life of the object.
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load(verify)
+        except ArtifactError:
+            self._mmap.close()
+            raise
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            self._mmap.close()
+            raise ArtifactError(f"{path}: malformed artifact ({e})") from e
+
+    def _load(self, verify: bool):
+        buffer = self._mmap
+        if len(buffer) < _PREAMBLE.size:
+            raise ArtifactError(f"{self.path}: too short to be a model artifact")
+        magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ArtifactError(f"{self.path}: not a model artifact")
+        if version != FORMAT_VERSION:
+            raise ArtifactError(f"{self.path}: format version {version}, expected {FORMAT_VERSION}")
+
+        header_end = _PREAMBLE.size + header_length
+        self.header = json.loads(buffer[_PREAMBLE.size:header_end])
+        data_start = _align(header_end)
+        if len(buffer) - data_start != self.header["data_nbytes"]:
+            raise ArtifactError(f"{self.path}: truncated data section")
+        if verify:
+            with memoryview(buffer) as view:
+                digest = hashlib.sha256(view[data_start:]).hexdigest()
+            if digest != self.header["data_sha256"]:
+                raise ArtifactError(f"{self.path}: checksum mismatch")
+
+        sections = {section: {} for section in _SECTIONS}
+        for key, spec in self.header["arrays"].items():
+            section, name = key.split(".", 1)
+            shape = tuple(spec["shape"])
+            sections[section][name] = np.frombuffer(
+                buffer, dtype=np.dtype(spec["dtype"]), count=int(np.prod(shape, dtype=np.int64)),
+                offset=data_start + spec["offset"]
+            ).reshape(shape)
+
+        scalars = self.header["scalars"]
+        self.compiled_forest = CompiledForest.from_arrays(sections["forest"], scalars["forest"])
+        self.tree_shap = TreeShap.from_arrays(sections["tree_shap"], scalars["tree_shap"])
+        self.source_sha256 = self.header["source_sha256"]
+        self.feature_names = self.header["feature_names"]
+        self.nbytes = len(buffer)
+
+    def info(self) -> dict:
+        """Summary for /health."""
+        return {
+            "path": self.path,
+            "format_version": FORMAT_VERSION,
+            "created_at": self.header["created_at"],
+            "bytes": self.nbytes,
+            "trees": self.compiled_forest.n_trees,
+            "nodes": len(self.compiled_forest.threshold),
+            "leaves": self.tree_shap.n_leaves
+        }
+
+
+if __name__ == "__main__":
+    import pickle
+    import time
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "shg_model.pkl")
+    out_path = sys.argv[2] if len(sys.argv) > 2 else artifact_path(model_path)
+
+    with open(model_path, "rb") as f:
+        model_bytes = f.read()
+    model = pickle.loads(model_bytes)
+    header = export_model(model, out_path, source_sha256=hashlib.sha256(model_bytes).hexdigest())
+    print(f"✅ Exported {model_path} -> {out_path} ({os.path.getsize(out_path) / 1e6:.2f} MB, "
+          f"format v{header['format_version']})")
+
+    started = time.perf_counter()
+    artifact = ModelArtifact(out_path)
+    print(f"⏱️ Mapped and verified in {(time.perf_counter() - started) * 1000:.1f} ms")
+    from inference import sample_inputs
+    X = sample_inputs(2000, seed=11)
+    print(f"🌲 Probability error vs sklearn: {artifact.compiled_forest.max_abs_error(model, X):.3g}")
+    reference = compile_tree_shap(model)
+    print(f"🔍 SHAP error vs TreeShap: {np.max(np.abs(artifact.tree_shap.shap_values(X) - reference.shap_values(X))):.3g}")
@@ -0,0 +1,305 @@
+"""
+SakhiCircle: Model Registry
+Versioned models in a directory, and the bundle (model + explainer) the API
+serves from. A bundle is loaded and warmed up completely before it replaces
+the active one, and request handlers keep the bundle they started with, so a
+reload never changes the model under an in-flight request.
+
+    models/
+        CURRENT                       name of the active version
+        20261017-204000-ab12cd34/
+            shg_model.pkl
+            shg_model.bin             memory-mapped export (model_artifact.py)
+            metadata.json
+
+    python model_registry.py publish shg_model.pkl [--version NAME] [--activate]
+    python model_registry.py activate NAME
+    python model_registry.py list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+
+from inference import compile_model, compile_tree_shap, sample_inputs
+from model_artifact import ArtifactError, ModelArtifact, artifact_path, export_model, file_sha256
+
+MODEL_FILE = "shg_model.pkl"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"
+_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+class ModelBundle:
+    """
+    One model version with everything needed to score and explain with it.
+
+    model and explainer are the sklearn / shap objects and stay None when the
+    bundle was mapped from an artifact; compiled_forest and tree_shap are used
+    whenever they are available.
+    """
+
+    def __init__(self, version: str, model_hash: str, model=None, compiled_forest=None,
+                 explainer=None, tree_shap=None, artifact: Optional[ModelArtifact] = None,
+                 compiled_max_rows: int = 500):
+        self.version = version
+        self.model_hash = model_hash
+        self.model = model
+        self.compiled_forest = compiled_forest
+        self.explainer = explainer
+        self.tree_shap = tree_shap
+        self.artifact = artifact
+        self.compiled_max_rows = compiled_max_rows
+        self.loaded_at = datetime.utcnow()
+
+    def predict_proba(self, X: np.ndarray, feature_names: Optional[list] = None) -> np.ndarray:
+        """Class probabilities; sklearn takes large batches when it is loaded (its tree walk is faster there)."""
+        if self.compiled_forest is not None and (self.model is None or len(X) <= self.compiled_max_rows):
+            return self.compiled_forest.predict_proba(X)
+        if self.model is None:
+            raise RuntimeError("Model not loaded")
+        if feature_names:
+            import pandas as pd
+            X = pd.DataFrame(X, columns=feature_names)
+        return self.model.predict_proba(X)
+
+    def shap_values(self, X: np.ndarray) -> tuple:
+        """
+        (values, expected_value) for the positive class (Low Risk), where
+        values has shape (n_rows, n_features).
+        """
+        if self.tree_shap is not None:
+            return self.tree_shap.shap_values(X), self.tree_shap.expected_value
+        if self.explainer is None:
+            raise RuntimeError("SHAP explainer not initialized")
+
+        shap_values = self.explainer.shap_values(X)
+        expected_value = self.explainer.expected_value
+        if isinstance(shap_values, list):
+            # One array per class: [class0_shap, class1_shap]
+            class_index = 1 if len(shap_values) > 1 else 0
+            values = np.asarray(shap_values[class_index])
+        else:
+            values = np.asarray(shap_values)
+            class_index = 1 if values.ndim == 3 and values.shape[2] > 1 else 0
+            if values.ndim == 3:
+                # Newer SHAP returns (n_rows, n_features, n_classes)
+                values = values[:, :, class_index]
+        if isinstance(expected_value, (list, np.ndarray)):
+            expected_value = np.asarray(expected_value).ravel()[class_index]
+        return values, float(expected_value)
+
+    def info(self) -> dict:
+        """Summary for /health and the admin endpoints."""
+        return {
+            "version": self.version,
+            "model_hash": self.model_hash,
+            "source": "artifact" if self.artifact is not None else "pickle",
+            "loaded_at": self.loaded_at.isoformat(),
+            "compiled_forest": self.compiled_forest is not None,
+            "fast_tree_shap": self.tree_shap is not None,
+            "artifact": self.artifact.info() if self.artifact is not None else None
+        }
+
+
+def load_bundle(model_path: str, artifact_file: Optional[str] = None, version: Optional[str] = None,
+                verify_artifact: bool = True, compiled_max_rows: int = 500,
+                on_stage: Optional[Callable[[str], None]] = None) -> ModelBundle:
+    """
+    Load and warm up one model version.
+
+    The artifact is mapped when it exists and was exported from model_path;
+    otherwise the pickle is loaded, compiled and given a SHAP explainer.
+    on_stage("model") is called once the model itself is usable. Raises on
+    failure; nothing global is touched.
+    """
+    artifact_file = artifact_file or artifact_path(model_path)
+    model_hash = file_sha256(model_path) if os.path.exists(model_path) else None
+    bundle = None
+
+    if os.path.exists(artifact_file):
+        try:
+            artifact = ModelArtifact(artifact_file, verify=verify_artifact)
+        except (OSError, ArtifactError) as e:
+            print(f"⚠️ Model artifact unusable, loading the pickle instead: {e}")
+        else:
+            # A retrained pickle must win over an artifact exported from the old one
+            if model_hash is None or artifact.source_sha256 == model_hash:
+                bundle = ModelBundle(
+                    version or artifact.source_sha256[:12], artifact.source_sha256,
+                    compiled_forest=artifact.compiled_forest,
+                    tree_shap=artifact.tree_shap,  # validated against shap.TreeExplainer at export time
+                    artifact=artifact, compiled_max_rows=compiled_max_rows
+                )
+                if on_stage:
+                    on_stage("model")
+            else:
+                print(f"⚠️ {artifact_file} is stale (exported from another {model_path}); loading the pickle")
+
+    if bundle is None:
+        if model_hash is None:
+            raise FileNotFoundError(f"Model not found at {model_path}")
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+
+        # Flatten the forest for fast scoring; verified against sklearn before use
+        try:
+            compiled_forest = compile_model(model)
+        except Exception as e:
+            compiled_forest = None
+            print(f"⚠️ Compiled forest unavailable, scoring with sklearn: {e}")
+        if on_stage:
+            on_stage("model")
+
+        import shap
+        explainer = shap.TreeExplainer(model)
+        # Leaf path arrays for fast exact SHAP; checked against the explainer before use
+        try:
+            tree_shap = compile_tree_shap(model, explainer)
+        except Exception as e:
+            tree_shap = None
+            print(f"⚠️ Fast TreeSHAP unavailable, using shap.TreeExplainer: {e}")
+        bundle = ModelBundle(
+            version or model_hash[:12], model_hash, model=model, compiled_forest=compiled_forest,
+            explainer=explainer, tree_shap=tree_shap, compiled_max_rows=compiled_max_rows
+        )
+
+    # Touch every code path (and mapped page) once before the bundle takes traffic
+    X = sample_inputs(64, seed=7)
+    bundle.predict_proba(X[:1])
+    bundle.predict_proba(X)
+    bundle.shap_values(X)
+    return bundle
+
+
+class ModelRegistry:
+    """A directory of model versions plus a CURRENT pointer."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, version: str) -> str:
+        if not _VERSION_PATTERN.match(version or ""):
+            raise ValueError(f"Invalid model version name: {version!r}")
+        return os.path.join(self.root, version)
+
+    def versions(self) -> list:
+        """Published versions, oldest first (names sort by publish time by default)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if _VERSION_PATTERN.match(name) and os.path.exists(os.path.join(self.root, name, MODEL_FILE))
+        )
+
+    def current(self) -> Optional[str]:
+        """Version named in CURRENT, else the newest one; None for an empty registry."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+            if version in self.versions():
+                return version
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def paths(self, version: str) -> tuple:
+        """(pickle, artifact) paths of a published version."""
+        directory = self._dir(version)
+        if not os.path.exists(os.path.join(directory, MODEL_FILE)):
+            raise KeyError(f"Unknown model version: {version}")
+        return os.path.join(directory, MODEL_FILE), artifact_path(os.path.join(directory, MODEL_FILE))
+
+    def metadata(self, version: str) -> dict:
+        try:
+            with open(os.path.join(self._dir(version), METADATA_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def activate(self, version: str):
+        """Point CURRENT at a version (atomic rename, so readers never see a partial name)."""
+        self.paths(version)
+        tmp_path = os.path.join(self.root, f".{CURRENT_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def publish(self, model_path: str, version: Optional[str] = None, activate: bool = False) -> str:
+        """
+        Copy a trained pickle into the registry with its artifact and metadata.
+        The version directory appears atomically, complete or not at all.
+        """
+        with open(model_path, "rb") as f:
+            model_bytes = f.read()
+        model_hash = hashlib.sha256(model_bytes).hexdigest()
+        version = version or f"{datetime.utcnow():%Y%m%d-%H%M%S}-{model_hash[:8]}"
+        directory = self._dir(version)
+        if os.path.exists(directory):
+            raise ValueError(f"Model version {version} already exists")
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = os.path.join(self.root, f".staging-{version}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            staged_model = os.path.join(staging, MODEL_FILE)
+            with open(staged_model, "wb") as f:
+                f.write(model_bytes)
+            model = pickle.loads(model_bytes)
+            header = export_model(model, artifact_path(staged_model), source_sha256=model_hash)
+            with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                json.dump({
+                    "version": version,
+                    "model_sha256": model_hash,
+                    "published_at": datetime.utcnow().isoformat(),
+                    "source": os.path.abspath(model_path),
+                    "artifact_format_version": header["format_version"],
+                    "n_trees": len(model.estimators_)
+                }, f, indent=2)
+            os.replace(staging, directory)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the SakhiCircle model registry")
+    parser.add_argument("--registry", default=os.getenv(
+        "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")))
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Add a trained pickle as a new version")
+    publish.add_argument("model_path")
+    publish.add_argument("--version")
+    publish.add_argument("--activate", action="store_true", help="Also make it the current version")
+    activate = commands.add_parser("activate", help="Make a published version current")
+    activate.add_argument("version")
+    commands.add_parser("list", help="List published versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "publish":
+        version = registry.publish(args.model_path, args.version, activate=args.activate)
+        print(f"✅ Published {args.model_path} as {version}{' (current)' if args.activate else ''}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ Current model version: {args.version}")
+    else:
+        current = registry.current()
+        for version in registry.versions():
+            meta = registry.metadata(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {meta.get('published_at', '')}  {meta.get('model_sha256', '')[:12]}")
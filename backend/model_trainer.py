@@ -1,36 +1,60 @@
 """
 SakhiCircle: Model Trainer
 Generates synthetic SHG data and trains a RandomForest model for credit scoring.
+
+Small datasets are trained in memory exactly as before. Larger ones (or a CSV /
+Parquet file via --input) are streamed in chunks: every chunk fits its share
+of the trees as a sub-forest, on a process pool with --workers > 1, and the
+sub-forests are merged into one RandomForestClassifier. Only a few chunks and
+a capped holdout sample are in memory at any time.
+
+--search runs a cross-validated random or successive-halving search over
+MODEL_PARAMS that weighs accuracy against the per-row predict and SHAP
+latency the API would see, and prints the Pareto front. Fold results are
+cached on disk, so an interrupted search resumes where it stopped.
+
+    python model_trainer.py                                   # 1,000 synthetic rows
+    python model_trainer.py --samples 10000000 --workers 8    # streamed
+    python model_trainer.py --input shg_rows.csv --format artifact --report-json run.json
+    python model_trainer.py --search halving --samples 100000 --trials 30
+    python model_trainer.py --params '{"max_depth": 8}'
 """
 
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import hashlib
+import json
+import math
 import pickle
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 
-def generate_synthetic_data(n_samples=1000, random_state=42):
-    """
-    Generate synthetic data for Self-Help Groups (SHGs).
-    
-    Features:
-    - Savings_Per_Member: Monthly savings per member (100-5000 INR)
-    - Attendance_Rate: Meeting attendance percentage (50-100%)
-    - Internal_Loan_Repayment: Loan repayment rate (0-100%)
-    
-    Target:
-    - Credit_Score: 0-100 score
-    - Risk_Status: 0 = High Risk, 1 = Low Risk
-    """
-    np.random.seed(random_state)
-    
-    # Generate features with realistic distributions
-    savings = np.random.uniform(100, 5000, n_samples)
-    attendance = np.random.uniform(50, 100, n_samples)
-    repayment = np.random.uniform(0, 100, n_samples)
-    
+from inference import CompiledForest, TreeShap, sample_inputs
+from model_artifact import artifact_path, export_model
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+FEATURE_NAMES = ['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']
+TARGET = 'Risk_Status'
+# Forest hyperparameters (besides random_state / n_jobs)
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+DEFAULT_CHUNK_SIZE = 100_000
+
+def _synthetic_frame(savings, attendance, repayment, noise):
+    """Credit score and risk label for generated feature columns."""
     # Calculate credit score based on weighted formula
     # Weights: Savings (30%), Attendance (30%), Repayment (40%)
     normalized_savings = (savings - 100) / (5000 - 100) * 100
@@ -42,30 +66,124 @@ def generate_synthetic_data(n_samples=1000, random_state=42):
     )
     
     # Add some noise to make it realistic
-    noise = np.random.normal(0, 5, n_samples)
     credit_score = np.clip(credit_score + noise, 0, 100)
     
     # Determine risk status: Low Risk (1) if score >= 60, else High Risk (0)
     risk_status = (credit_score >= 60).astype(int)
     
     # Create DataFrame
-    df = pd.DataFrame({
+    return pd.DataFrame({
         'Savings_Per_Member': savings,
         'Attendance_Rate': attendance,
         'Internal_Loan_Repayment': repayment,
         'Credit_Score': credit_score,
         'Risk_Status': risk_status
     })
+
+def generate_synthetic_data(n_samples=1000, random_state=42):
+    """
+    Generate synthetic data for Self-Help Groups (SHGs).
     
-    return df
+    Features:
+    - Savings_Per_Member: Monthly savings per member (100-5000 INR)
+    - Attendance_Rate: Meeting attendance percentage (50-100%)
+    - Internal_Loan_Repayment: Loan repayment rate (0-100%)
+    
+    Target:
+    - Credit_Score: 0-100 score
+    - Risk_Status: 0 = High Risk, 1 = Low Risk
+    """
+    np.random.seed(random_state)
+    
+    # Generate features with realistic distributions
+    savings = np.random.uniform(100, 5000, n_samples)
+    attendance = np.random.uniform(50, 100, n_samples)
+    repayment = np.random.uniform(0, 100, n_samples)
+    noise = np.random.normal(0, 5, n_samples)
+    
+    return _synthetic_frame(savings, attendance, repayment, noise)
+
+def generate_synthetic_chunks(n_samples, chunk_size=DEFAULT_CHUNK_SIZE, random_state=42):
+    """
+    Yield synthetic SHG data (same distribution as generate_synthetic_data) in
+    DataFrames of at most chunk_size rows. Each chunk has its own seeded
+    generator, so the data does not depend on how it is consumed.
+    """
+    for index, start in enumerate(range(0, n_samples, chunk_size)):
+        rng = np.random.default_rng([random_state, index])
+        n = min(chunk_size, n_samples - start)
+        yield _synthetic_frame(
+            rng.uniform(100, 5000, n),
+            rng.uniform(50, 100, n),
+            rng.uniform(0, 100, n),
+            rng.normal(0, 5, n)
+        )
 
-def train_model(df):
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+def _parquet_file(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Reading Parquet needs pyarrow (pip install pyarrow)")
+    return pq.ParquetFile(path)
+
+def count_rows(path):
+    """Data rows in a CSV (header excluded) or Parquet file, without parsing it."""
+    if _is_parquet(path):
+        return _parquet_file(path).metadata.num_rows
+    newlines, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 24):
+            newlines += block.count(b'\n')
+            last = block[-1:]
+    lines = newlines + (last != b'\n')
+    return max(lines - 1, 0)
+
+def read_data_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of the feature columns and Risk_Status from a CSV or
+    Parquet file, chunk_size rows at a time. Files with Credit_Score but no
+    Risk_Status get the label derived as in generate_synthetic_data.
+    """
+    if _is_parquet(path):
+        parquet = _parquet_file(path)
+        available = parquet.schema_arrow.names
+    else:
+        available = list(pd.read_csv(path, nrows=0).columns)
+    
+    missing = [name for name in FEATURE_NAMES if name not in available]
+    if TARGET in available:
+        label = TARGET
+    elif 'Credit_Score' in available:
+        label = 'Credit_Score'
+    else:
+        missing.append(TARGET)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    
+    columns = FEATURE_NAMES + [label]
+    if _is_parquet(path):
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns))
+    else:
+        chunks = pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    for chunk in chunks:
+        if label != TARGET:
+            chunk[TARGET] = (chunk[label] >= 60).astype(int)
+        yield chunk[FEATURE_NAMES + [TARGET]]
+
+def train_model(df, n_jobs=-1, params=None):
     """
     Train a RandomForestClassifier on the SHG data.
     """
+    return _train_in_memory(df, n_jobs, params)[0]
+
+def _train_in_memory(df, n_jobs=-1, params=None):
+    """train_model, also returning the test accuracy."""
     # Features and target
-    X = df[['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']]
-    y = df['Risk_Status']
+    X = df[FEATURE_NAMES]
+    y = df[TARGET]
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -74,18 +192,22 @@ def train_model(df):
     
     # Train Random Forest
     model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
+        **(params or MODEL_PARAMS),
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     
     model.fit(X_train, y_train)
+    # Parallelism only pays off for fitting; for one-row predictions joblib
+    # thread start-up costs more than walking the trees
+    model.set_params(n_jobs=None)
     
     # Evaluate
     y_pred = model.predict(X_test)
+    return model, report_model(model, y_test, y_pred)
+
+def report_model(model, y_test, y_pred):
+    """Print accuracy, the classification report and feature importances."""
     accuracy = accuracy_score(y_test, y_pred)
     
     print("=" * 50)
@@ -96,54 +218,538 @@ def train_model(df):
     print(classification_report(y_test, y_pred, target_names=['High Risk', 'Low Risk']))
     
     # Feature importance
-    feature_names = ['Savings_Per_Member', 'Attendance_Rate', 'Internal_Loan_Repayment']
     importances = model.feature_importances_
     
     print("\n🔍 Feature Importance:")
-    for name, imp in sorted(zip(feature_names, importances), key=lambda x: x[1], reverse=True):
+    for name, imp in sorted(zip(FEATURE_NAMES, importances), key=lambda x: x[1], reverse=True):
         print(f"   {name}: {imp * 100:.1f}%")
-    
+    return accuracy
+
+# ============================================================
+# Streaming / Parallel Training
+# ============================================================
+
+def plan_chunks(n_rows, chunk_size=DEFAULT_CHUNK_SIZE, n_estimators=MODEL_PARAMS['n_estimators']):
+    """
+    Rows per chunk and trees per chunk. Chunks grow beyond chunk_size when
+    needed so that every chunk fits at least one tree.
+    """
+    rows_per_chunk = max(chunk_size, math.ceil(n_rows / n_estimators), 1)
+    n_chunks = max(math.ceil(n_rows / rows_per_chunk), 1)
+    trees = [n_estimators // n_chunks + (1 if i < n_estimators % n_chunks else 0) for i in range(n_chunks)]
+    return rows_per_chunk, trees
+
+def _fit_sub_forest(X, y, n_trees, params, seed):
+    """Fit n_trees of the forest on one chunk (runs in a worker process)."""
+    params = dict(params, n_estimators=n_trees)
+    return RandomForestClassifier(**params, random_state=seed, n_jobs=1).fit(X, y)
+
+def merge_forests(forests):
+    """One RandomForestClassifier holding the trees of all sub-forests, in order."""
+    model = forests[0]
+    for forest in forests[1:]:
+        if list(forest.classes_) != list(model.classes_):
+            raise ValueError("Sub-forests were fit on different classes")
+        model.estimators_ += forest.estimators_
+    model.n_estimators = len(model.estimators_)
+    # Parallelism only pays off for fitting (see train_model)
+    model.set_params(n_jobs=None)
     return model
 
-def save_model(model, filepath='shg_model.pkl'):
-    """Save the trained model to disk."""
-    with open(filepath, 'wb') as f:
-        pickle.dump(model, f)
-    print(f"\n✅ Model saved to: {filepath}")
+def train_streaming(chunks, trees_per_chunk, workers=1, params=None, test_size=0.2,
+                    holdout_max_rows=200_000, random_state=42):
+    """
+    Fit a forest on chunked data that need not fit in memory.
+    
+    chunks yields DataFrames; chunk i trains trees_per_chunk[i] trees on its
+    training rows, in a pool of `workers` processes (in this process for 1).
+    At most 2 * workers chunks are queued at once. test_size of every chunk is
+    held out, keeping up to holdout_max_rows rows for evaluation.
+    Returns (model, holdout DataFrame, seconds spent producing chunks).
+    """
+    params = {k: v for k, v in (params or MODEL_PARAMS).items() if k != 'n_estimators'}
+    holdout_per_chunk = math.ceil(holdout_max_rows / max(len(trees_per_chunk), 1))
+    holdout, results, pending = [], {}, {}
+    carry, carry_trees = None, 0
+    data_seconds = 0.0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    def collect(futures):
+        for future in futures:
+            results[pending.pop(future)] = future.result()
+    
+    try:
+        iterator = iter(chunks)
+        for index, n_trees in enumerate(trees_per_chunk):
+            started = time.perf_counter()
+            chunk = next(iterator, None)
+            data_seconds += time.perf_counter() - started
+            if chunk is None:
+                break
+    
+            rng = np.random.default_rng([random_state, index, 1])
+            is_holdout = rng.random(len(chunk)) < test_size
+            holdout.append(chunk[is_holdout].head(holdout_per_chunk))
+            train = chunk[~is_holdout]
+            if carry is not None:
+                train = pd.concat([carry, train], ignore_index=True)
+            n_trees += carry_trees
+            # A chunk with one class would grow trees with a different output shape
+            if train[TARGET].nunique() < 2:
+                carry, carry_trees = train, n_trees
+                continue
+            carry, carry_trees = None, 0
+    
+            X, y = train[FEATURE_NAMES], train[TARGET]
+            seed = random_state + index
+            if pool is None:
+                results[index] = _fit_sub_forest(X, y, n_trees, params, seed)
+                continue
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(_fit_sub_forest, X, y, n_trees, params, seed)] = index
+    
+        if carry is not None:
+            raise ValueError("Training data contains a single class")
+        collect(list(pending))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    
+    model = merge_forests([results[index] for index in sorted(results)])
+    return model, pd.concat(holdout, ignore_index=True), data_seconds
+
+# ============================================================
+# Hyperparameter Search
+# ============================================================
+
+# Values tried for each MODEL_PARAMS entry
+SEARCH_SPACE = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [4, 6, 8, 10, 12, 16],
+    'min_samples_split': [2, 5, 10, 20],
+    'min_samples_leaf': [1, 2, 4, 8]
+}
+LATENCY_ROWS = 200  # single-row calls timed per candidate
+LATENCY_REPEATS = 5  # timing passes per candidate; the median pass is reported
+
+_search_data = None  # (X, y) of the search, set once per worker process
+
+def _init_search_worker(X, y):
+    global _search_data
+    _search_data = (X, y)
+
+def load_search_data(input_path=None, n_samples=1000, max_rows=100_000, random_state=42):
+    """
+    Up to max_rows rows (the first ones of input_path, or synthetic) as
+    shuffled X / y arrays, so any prefix is a random subset.
+    """
+    if input_path is None and min(n_samples, max_rows) <= DEFAULT_CHUNK_SIZE:
+        df = generate_synthetic_data(n_samples=min(n_samples, max_rows), random_state=random_state)
+    else:
+        chunks = (read_data_chunks(input_path) if input_path
+                  else generate_synthetic_chunks(n_samples, random_state=random_state))
+        frames, n_rows = [], 0
+        for chunk in chunks:
+            frames.append(chunk.head(max_rows - n_rows))
+            n_rows += len(frames[-1])
+            if n_rows >= max_rows:
+                break
+        df = pd.concat(frames, ignore_index=True)
+    order = np.random.default_rng(random_state).permutation(len(df))
+    return df[FEATURE_NAMES].to_numpy(dtype=np.float64)[order], df[TARGET].to_numpy()[order]
+
+def sample_candidates(n, random_state=42):
+    """MODEL_PARAMS plus up to n - 1 distinct random combinations from SEARCH_SPACE."""
+    rng = np.random.default_rng(random_state)
+    candidates, seen = [dict(MODEL_PARAMS)], {tuple(sorted(MODEL_PARAMS.items()))}
+    space = math.prod(len(values) for values in SEARCH_SPACE.values())
+    while len(candidates) < min(n, space):
+        params = {name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+def per_row_latency_us(fn, rows):
+    """Median microseconds of fn called on one row at a time, as /predict does."""
+    fn(rows[:1])
+    times = []
+    for i in range(len(rows)):
+        started = time.perf_counter()
+        fn(rows[i:i + 1])
+        times.append(time.perf_counter() - started)
+    return float(np.median(times) * 1e6)
+
+def _evaluate_fold(params, fold, folds, n_rows, seed):
+    """
+    Score one cross-validation fold of a candidate on the first n_rows search
+    rows (runs in a worker process). Returns (result, inference): fold 0 also
+    returns the arrays of the compiled forest and TreeShap the API would serve
+    the candidate with, for measure_latency() to time in the parent.
+    """
+    X, y = _search_data
+    X, y = X[:n_rows], y[:n_rows]
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y)
+    train_index, test_index = next(split for i, split in enumerate(splits) if i == fold)
+    
+    started = time.perf_counter()
+    model = RandomForestClassifier(**params, random_state=seed, n_jobs=1).fit(X[train_index], y[train_index])
+    result = {
+        'accuracy': float(accuracy_score(y[test_index], model.predict(X[test_index]))),
+        'fit_seconds': time.perf_counter() - started
+    }
+    inference = None
+    if fold == 0:
+        compiled = CompiledForest(model)
+        result['nodes'] = int(len(compiled.threshold))
+        inference = (compiled.arrays(), TreeShap(model).arrays())
+    return result, inference
+
+def measure_latency(inference, repeats=LATENCY_REPEATS):
+    """
+    Per-row predict and SHAP microseconds of one candidate, the median of
+    `repeats` passes. Called in the parent once a round's fits are done, one
+    candidate at a time, so the timings are not skewed by busy workers.
+    """
+    compiled = CompiledForest.from_arrays(*inference[0])
+    tree_shap = TreeShap.from_arrays(*inference[1])
+    rows = sample_inputs(LATENCY_ROWS, seed=9)
+    return {
+        'predict_us': float(np.median([per_row_latency_us(compiled.predict_proba, rows) for _ in range(repeats)])),
+        'shap_us': float(np.median([per_row_latency_us(tree_shap.shap_values, rows) for _ in range(repeats)]))
+    }
+
+class SearchCache:
+    """
+    Fold results on disk, one JSON file per (data, candidate, fold, rows), so
+    an interrupted search picks up where it stopped. Latencies are cached
+    with the folds; clear the directory after changing machines.
+    """
+    
+    def __init__(self, directory, data_fingerprint):
+        self.directory = directory
+        self.data_fingerprint = data_fingerprint
+        os.makedirs(directory, exist_ok=True)
+    
+    def key(self, params, fold, folds, n_rows, seed):
+        payload = json.dumps({
+            'data': self.data_fingerprint, 'params': params, 'fold': fold,
+            'folds': folds, 'rows': n_rows, 'seed': seed, 'latency_repeats': LATENCY_REPEATS
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def get(self, key):
+        try:
+            with open(os.path.join(self.directory, f"{key}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, key, result):
+        path = os.path.join(self.directory, f"{key}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(result, f)
+        os.replace(f"{path}.tmp", path)
+
+def pareto_ranks(summaries):
+    """
+    Non-dominated sorting rank of each summary (0 = Pareto front), maximizing
+    accuracy and minimizing per-row predict and SHAP latency.
+    """
+    points = [(-s['accuracy'], s['predict_us'], s['shap_us']) for s in summaries]
+    
+    def dominates(a, b):
+        return a != b and all(x <= y for x, y in zip(a, b))
+    
+    ranks, remaining, rank = [0] * len(points), set(range(len(points))), 0
+    while remaining:
+        front = {i for i in remaining if not any(dominates(points[j], points[i]) for j in remaining)}
+        for i in front:
+            ranks[i] = rank
+        remaining -= front
+        rank += 1
+    return ranks
 
-def main():
+def run_search(X, y, strategy='halving', n_candidates=20, folds=3, workers=1,
+               cache_dir='.search_cache', eta=3, random_state=42):
+    """
+    Cross-validated search over SEARCH_SPACE on a pool of `workers` processes.
+    
+    'random' scores every candidate on all rows. 'halving' (successive
+    halving) scores all of them on a small random subset first and keeps the
+    best 1/eta for each eta times larger round, ending on all rows. "Best"
+    is Pareto rank on accuracy and latency, then accuracy, so fast candidates
+    survive next to accurate ones. Returns a summary per candidate and round.
+    """
+    cache = SearchCache(cache_dir, hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest())
+    alive = sample_candidates(n_candidates, random_state)
+    sizes = [len(alive)]
+    while strategy == 'halving' and math.ceil(sizes[-1] / eta) >= eta:
+        sizes.append(math.ceil(sizes[-1] / eta))
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker, initargs=(X, y))
+    else:
+        _init_search_worker(X, y)
+    
+    summaries = []
+    try:
+        for round_index, size in enumerate(sizes):
+            alive = alive[:size]
+            n_rows = max(len(X) // eta ** (len(sizes) - 1 - round_index), min(len(X), folds * 50))
+            tasks = {
+                (i, fold): cache.key(params, fold, folds, n_rows, random_state)
+                for i, params in enumerate(alive) for fold in range(folds)
+            }
+            results = {task: cache.get(key) for task, key in tasks.items()}
+            missing = [task for task, result in results.items() if result is None]
+            print(f"🔎 Round {round_index + 1}/{len(sizes)}: {len(alive)} candidates x {folds} folds "
+                  f"on {n_rows:,} rows ({len(tasks) - len(missing)} of {len(tasks)} folds cached)")
+            
+            inference = {}
+            if pool is None:
+                for task in missing:
+                    results[task], inference[task] = _evaluate_fold(alive[task[0]], task[1], folds, n_rows, random_state)
+                    if inference[task] is None:
+                        cache.put(tasks[task], results[task])
+            else:
+                futures = {
+                    pool.submit(_evaluate_fold, alive[i], fold, folds, n_rows, random_state): (i, fold)
+                    for i, fold in missing
+                }
+                for future in as_completed(futures):
+                    task = futures[future]
+                    results[task], inference[task] = future.result()
+                    if inference[task] is None:
+                        cache.put(tasks[task], results[task])
+            # Latency is timed serially once every fit of the round has finished
+            for task, arrays in inference.items():
+                if arrays is not None:
+                    results[task].update(measure_latency(arrays))
+                    cache.put(tasks[task], results[task])
+            
+            round_summaries = []
+            for i, params in enumerate(alive):
+                scores = [results[(i, fold)]['accuracy'] for fold in range(folds)]
+                first = results[(i, 0)]
+                round_summaries.append({
+                    'params': params,
+                    'round': round_index + 1,
+                    'rows': n_rows,
+                    'accuracy': float(np.mean(scores)),
+                    'accuracy_std': float(np.std(scores)),
+                    'fit_seconds': float(np.mean([results[(i, fold)]['fit_seconds'] for fold in range(folds)])),
+                    'predict_us': first['predict_us'],
+                    'shap_us': first['shap_us'],
+                    'nodes': first['nodes']
+                })
+            for summary, rank in zip(round_summaries, pareto_ranks(round_summaries)):
+                summary['pareto_rank'] = rank
+            round_summaries.sort(key=lambda s: (s['pareto_rank'], -s['accuracy']))
+            summaries.extend(round_summaries)
+            alive = [s['params'] for s in round_summaries]
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return summaries
+
+def best_candidate(summaries):
+    """The most accurate Pareto-optimal candidate of the search's final round."""
+    final = [s for s in summaries if s['round'] == summaries[-1]['round']]
+    return max((s for s in final if s['pareto_rank'] == 0), key=lambda s: s['accuracy'])
+
+def print_pareto_table(summaries):
+    """Candidates of the final round by accuracy; * marks the Pareto front."""
+    print("\n📈 Accuracy vs per-row latency (* = Pareto optimal)")
+    print(f"    {'trees':>5} {'depth':>5} {'split':>5} {'leaf':>4} {'accuracy':>15} "
+          f"{'predict us':>10} {'SHAP us':>9} {'nodes':>8}")
+    for s in sorted(summaries, key=lambda s: -s['accuracy']):
+        p = s['params']
+        print(f"  {'*' if s['pareto_rank'] == 0 else ' '} {p['n_estimators']:>5} {p['max_depth']:>5} "
+              f"{p['min_samples_split']:>5} {p['min_samples_leaf']:>4} "
+              f"{s['accuracy'] * 100:>8.2f}% ±{s['accuracy_std'] * 100:4.2f} "
+              f"{s['predict_us']:>10.1f} {s['shap_us']:>9.1f} {s['nodes']:>8,}")
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process and of its largest finished child
+    process (Linux reports KB), or None where the resource module is missing.
+    """
+    if resource is None:
+        return None
+    return {
+        'trainer': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'largest_worker': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    }
+
+def save_model(model, filepath='shg_model.pkl', formats=('pickle', 'artifact')):
+    """Save the trained model to disk, plus the memory-mapped artifact the API loads."""
+    model_bytes = pickle.dumps(model)
+    if 'pickle' in formats:
+        with open(filepath, 'wb') as f:
+            f.write(model_bytes)
+        print(f"\n✅ Model saved to: {filepath}")
+    
+    # Flat NumPy arrays (compiled forest + TreeSHAP), validated against sklearn and shap
+    if 'artifact' in formats:
+        artifact = artifact_path(filepath)
+        export_model(model, artifact, source_sha256=hashlib.sha256(model_bytes).hexdigest())
+        print(f"✅ Model artifact saved to: {artifact}")
+        # load_bundle prefers a pickle whose hash differs from the artifact's
+        # source, so an older pickle left here would be served instead
+        if 'pickle' not in formats and os.path.exists(filepath):
+            os.remove(filepath)
+            print(f"🗑️ Removed {filepath} (an older model than {artifact})")
+
+def search(args, started):
+    """--search: print the Pareto table and return the report instead of training."""
+    print(f"\n🔬 Searching SakhiCircle model hyperparameters ({args.search})...\n")
+    X, y = load_search_data(args.input, args.samples, args.search_rows, args.seed)
+    summaries = run_search(
+        X, y, strategy=args.search, n_candidates=args.trials, folds=args.folds,
+        workers=args.workers, cache_dir=args.search_cache, random_state=args.seed
+    )
+    final = [s for s in summaries if s['round'] == summaries[-1]['round']]
+    print_pareto_table(final)
+    best = best_candidate(summaries)
+    print(f"\n💡 Most accurate Pareto optimal candidate; train it with:\n"
+          f"   python model_trainer.py --params '{json.dumps(best['params'])}'")
+    
+    report = {
+        'strategy': args.search,
+        'rows': len(X),
+        'folds': args.folds,
+        'workers': args.workers,
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'candidates': summaries
+    }
+    print(f"\n⏱️ Search took {report['wall_seconds']:.1f} s")
+    if args.report_json:
+        with open(args.report_json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the SakhiCircle credit scoring model")
+    parser.add_argument('--samples', type=int, default=1000, help="Synthetic rows to generate")
+    parser.add_argument('--input', help="Train on a CSV or Parquet file instead of synthetic data")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processes fitting trees")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows per chunk; smaller synthetic datasets are trained in memory")
+    parser.add_argument('--format', choices=['both', 'pickle', 'artifact'], default='both',
+                        help="pickle (shg_model.pkl), artifact (shg_model.bin) or both")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shg_model.pkl'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report-json', help="Write timings, peak memory and accuracy to this file")
+    parser.add_argument('--params', help="JSON overrides of MODEL_PARAMS, e.g. '{\"max_depth\": 8}'")
+    parser.add_argument('--search', choices=['random', 'halving'],
+                        help="Search hyperparameters (accuracy vs inference latency) instead of training")
+    parser.add_argument('--trials', type=int, default=20, help="Candidates sampled from SEARCH_SPACE")
+    parser.add_argument('--folds', type=int, default=3, help="Cross-validation folds per candidate")
+    parser.add_argument('--search-rows', type=int, default=100_000, help="Rows used by the search")
+    parser.add_argument('--search-cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.search_cache'),
+                        help="Directory of cached fold results; a rerun resumes from it")
+    args = parser.parse_args(argv)
+    formats = ('pickle', 'artifact') if args.format == 'both' else (args.format,)
+    params = dict(MODEL_PARAMS)
+    if args.params:
+        try:
+            overrides = json.loads(args.params)
+        except ValueError as e:
+            parser.error(f"--params is not valid JSON: {e}")
+        unknown = set(overrides) - set(MODEL_PARAMS)
+        if unknown:
+            parser.error(f"--params: unknown parameters {', '.join(sorted(unknown))}")
+        params.update(overrides)
+    
+    started = time.perf_counter()
+    timings = {}
+    if args.search:
+        return search(args, started)
     print("\n🚀 Starting SakhiCircle Model Training...\n")
     
-    # Generate synthetic data
-    print("📦 Generating synthetic SHG data (1000 samples)...")
-    df = generate_synthetic_data(n_samples=1000)
+    if args.input is None and args.samples <= args.chunk_size:
+        # Generate synthetic data
+        print(f"📦 Generating synthetic SHG data ({args.samples} samples)...")
+        df = generate_synthetic_data(n_samples=args.samples, random_state=args.seed)
+    
+        # Display sample data
+        print("\n📄 Sample Data:")
+        print(df.head(10).to_string(index=False))
+    
+        # Data statistics
+        print("\n📈 Data Statistics:")
+        print(f"   Total Samples: {len(df)}")
+        print(f"   Low Risk SHGs: {(df['Risk_Status'] == 1).sum()} ({(df['Risk_Status'] == 1).mean()*100:.1f}%)")
+        print(f"   High Risk SHGs: {(df['Risk_Status'] == 0).sum()} ({(df['Risk_Status'] == 0).mean()*100:.1f}%)")
+        timings['data_seconds'] = time.perf_counter() - started
+    
+        # Train model
+        print("\n🔧 Training RandomForest model...")
+        fit_started = time.perf_counter()
+        model, accuracy = _train_in_memory(df, n_jobs=args.workers, params=params)
+        timings['fit_seconds'] = time.perf_counter() - fit_started
+        n_rows, n_chunks = len(df), 1
     
-    # Display sample data
-    print("\n📄 Sample Data:")
-    print(df.head(10).to_string(index=False))
+        # Save sample data for reference (next to the model)
+        data_path = os.path.join(os.path.dirname(os.path.abspath(args.output)), 'shg_data.csv')
+        df.to_csv(data_path, index=False)
+        print(f"📊 Sample data saved to: {data_path}")
+    else:
+        n_rows = count_rows(args.input) if args.input else args.samples
+        rows_per_chunk, trees = plan_chunks(n_rows, args.chunk_size, params['n_estimators'])
+        n_chunks = len(trees)
+        source = args.input or "synthetic data"
+        print(f"📦 Streaming {n_rows:,} rows from {source} in {n_chunks} chunks of {rows_per_chunk:,} "
+              f"({args.workers} worker{'s' if args.workers != 1 else ''})")
+        chunks = (read_data_chunks(args.input, rows_per_chunk) if args.input
+                  else generate_synthetic_chunks(n_rows, rows_per_chunk, random_state=args.seed))
     
-    # Data statistics
-    print("\n📈 Data Statistics:")
-    print(f"   Total Samples: {len(df)}")
-    print(f"   Low Risk SHGs: {(df['Risk_Status'] == 1).sum()} ({(df['Risk_Status'] == 1).mean()*100:.1f}%)")
-    print(f"   High Risk SHGs: {(df['Risk_Status'] == 0).sum()} ({(df['Risk_Status'] == 0).mean()*100:.1f}%)")
+        print("\n🔧 Training RandomForest sub-forests...")
+        fit_started = time.perf_counter()
+        model, holdout, data_seconds = train_streaming(
+            chunks, trees, workers=args.workers, params=params, random_state=args.seed
+        )
+        timings['data_seconds'] = data_seconds
+        timings['fit_seconds'] = time.perf_counter() - fit_started
     
-    # Train model
-    print("\n🔧 Training RandomForest model...")
-    model = train_model(df)
+        evaluate_started = time.perf_counter()
+        y_pred = model.predict(holdout[FEATURE_NAMES])
+        accuracy = report_model(model, holdout[TARGET], y_pred)
+        timings['evaluate_seconds'] = time.perf_counter() - evaluate_started
     
     # Save model
-    model_path = os.path.join(os.path.dirname(__file__), 'shg_model.pkl')
-    save_model(model, model_path)
+    save_started = time.perf_counter()
+    save_model(model, args.output, formats)
+    timings['save_seconds'] = time.perf_counter() - save_started
     
-    # Save sample data for reference
-    data_path = os.path.join(os.path.dirname(__file__), 'shg_data.csv')
-    df.to_csv(data_path, index=False)
-    print(f"📊 Sample data saved to: {data_path}")
+    report = {
+        'rows': n_rows,
+        'chunks': n_chunks,
+        'workers': args.workers,
+        'n_estimators': len(model.estimators_),
+        'params': params,
+        'format': args.format,
+        'accuracy': accuracy,
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'timings': {name: round(seconds, 3) for name, seconds in timings.items()},
+        'peak_rss_mb': peak_rss_mb()
+    }
+    memory = report['peak_rss_mb']
+    print(f"\n⏱️ Wall time {report['wall_seconds']:.1f} s (fit {report['timings']['fit_seconds']:.1f} s)"
+          + (f", peak RSS {memory['trainer']:.0f} MB trainer / {memory['largest_worker']:.0f} MB largest worker"
+             if memory else ""))
+    if args.report_json:
+        with open(args.report_json, 'w') as f:
+            json.dump(report, f, indent=2)
     
     print("\n" + "=" * 50)
     print("🎉 Training complete! Ready for predictions.")
     print("=" * 50 + "\n")
+    return report
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,187 @@
+"""
+SakhiCircle: Password Hashing
+scrypt (memory-hard, from hashlib) with a random per-user salt, stored as
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>        (salt and hash base64)
+
+Every hash carries its own cost parameters, so raising them only changes new
+hashes. verify_password() reports hashes weaker than the current parameters,
+and the unsalted SHA-256 hex digests stored before, as needing a rehash; login
+rehashes them with the password it has just checked.
+
+calibrate() picks the largest n whose hash fits a latency budget on this
+machine, without probing past a memory cap (128 * n * r bytes per hash):
+
+    python passwords.py --budget-ms 100 --max-mem-mb 64
+
+calibrate_shared() does this once per machine for all workers: the first to
+start calibrates under a file lock and saves the result, the others read it.
+
+PasswordHasher runs hashing on a small thread pool (hashlib.scrypt releases
+the GIL), so a login costs the event loop nothing and at most max_workers
+hashes, each holding ~128 * n * r bytes, run at once.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from file_lock import file_lock
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+MIN_N = 2 ** 14  # scrypt paper's interactive-login setting; calibrate() never goes lower
+MAX_N = 2 ** 20  # 1 GiB at r=8
+DEFAULT_MAX_MEM = 64 * 1024 * 1024  # calibration stops at n=2^16 for r=8
+
+
+class ScryptParams(NamedTuple):
+    n: int = 2 ** 15
+    r: int = 8
+    p: int = 1
+
+    @property
+    def maxmem(self) -> int:
+        # hashlib refuses anything above maxmem (default 32 MiB); leave headroom over 128 * n * r
+        return 129 * self.n * self.r * self.p + 1024 * 1024
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, params: ScryptParams) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=params.n, r=params.r, p=params.p,
+                          maxmem=params.maxmem, dklen=KEY_BYTES)
+
+
+def hash_password(password: str, params: ScryptParams) -> str:
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${params.n}${params.r}${params.p}${_b64(salt)}${_b64(_scrypt(password, salt, params))}"
+
+
+def _is_legacy(stored: str) -> bool:
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+def verify_password(password: str, stored: Optional[str], params: ScryptParams) -> tuple:
+    """
+    (matches, needs_rehash) for a stored hash. With stored None (unknown user)
+    a hash is still computed, so the response takes as long as a wrong password.
+    """
+    if not stored:
+        _scrypt(password, b"\0" * SALT_BYTES, params)
+        return False, False
+    if _is_legacy(stored):
+        digest = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(digest, stored), True
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        stored_params = ScryptParams(int(n), int(r), int(p))
+    except ValueError:
+        return False, False
+    if scheme != "scrypt":
+        return False, False
+    matches = hmac.compare_digest(_scrypt(password, _b64decode(salt), stored_params), _b64decode(expected))
+    # Only upgrade: workers calibrated a little differently must not rehash back and forth
+    weaker = stored_params.n < params.n or stored_params.r < params.r or stored_params.p < params.p
+    return matches, matches and weaker
+
+
+def calibrate(budget_ms: float, r: int = 8, p: int = 1, rounds: int = 3,
+              max_mem: int = DEFAULT_MAX_MEM) -> tuple:
+    """
+    The largest power-of-two n (at least MIN_N) whose median hash time stays
+    within budget_ms and whose hash needs at most max_mem bytes, and the
+    timings measured: (ScryptParams, {n: ms}).
+    """
+    timings = {}
+    chosen = ScryptParams(MIN_N, r, p)
+    n = MIN_N
+    while n <= MAX_N and (n == MIN_N or 128 * n * r <= max_mem):
+        params = ScryptParams(n, r, p)
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            _scrypt("calibration", os.urandom(SALT_BYTES), params)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[n] = round(statistics.median(samples), 2)
+        if timings[n] > budget_ms:
+            break
+        chosen = params
+        n *= 2
+    return chosen, timings
+
+
+def calibrate_shared(path: str, budget_ms: float, r: int = 8, p: int = 1,
+                     max_mem: int = DEFAULT_MAX_MEM) -> tuple:
+    """
+    calibrate(), run once and saved to path for the other workers on this
+    machine: (ScryptParams, {n: ms}, whether this call measured it).
+    """
+    settings = {"host": platform.node(), "cpus": os.cpu_count(), "budget_ms": budget_ms,
+                "r": r, "p": p, "max_mem": max_mem}
+    with file_lock(f"{path}.lock"):
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved["settings"] == settings:
+                return ScryptParams(saved["n"], r, p), {int(n): ms for n, ms in saved["timings_ms"].items()}, False
+        except (OSError, ValueError, KeyError):
+            pass
+        params, timings = calibrate(budget_ms, r, p, max_mem=max_mem)
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"settings": settings, "n": params.n, "timings_ms": timings}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"⚠️ Could not save password hashing calibration: {e}")
+        return params, timings, True
+
+
+class PasswordHasher:
+    """hash_password / verify_password on a bounded thread pool."""
+
+    def __init__(self, params: ScryptParams, max_workers: int = 2):
+        self.params = params
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="password-hash")
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, hash_password, password, self.params)
+
+    async def verify(self, password: str, stored: Optional[str]) -> tuple:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, verify_password, password, stored, self.params)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find scrypt cost parameters that fit a login latency budget")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Time one hash may take")
+    parser.add_argument("-r", type=int, default=8, help="scrypt block size")
+    parser.add_argument("-p", type=int, default=1, help="scrypt parallelism")
+    parser.add_argument("--max-mem-mb", type=int, default=DEFAULT_MAX_MEM // (1024 * 1024),
+                        help="Largest scrypt memory per hash to try")
+    args = parser.parse_args()
+
+    params, timings = calibrate(args.budget_ms, args.r, args.p, max_mem=args.max_mem_mb * 1024 * 1024)
+    for n, ms in timings.items():
+        print(f"   n=2^{n.bit_length() - 1:<3} {128 * n * args.r // (1024 * 1024):>5} MiB {ms:>9.1f} ms"
+              f"{'  ✅' if n == params.n else ''}")
+    print(f"PASSWORD_SCRYPT_N={params.n} PASSWORD_SCRYPT_R={params.r} PASSWORD_SCRYPT_P={params.p}")
@@ -0,0 +1,89 @@
+"""
+SakhiCircle: Rate Limiting
+Per-key token buckets: each key (a username, a client IP) may spend `burst`
+attempts at once and earns them back at `rate` per second. Used to keep
+credential-stuffing bursts from tying up the password hashing pool.
+
+State is per process and bounded: the least recently seen keys are dropped
+beyond maxsize (a dropped key simply starts again with a full bucket).
+
+acquire_all() spends from several buckets (say the IP's and the username's)
+only when every one of them has a token, so an attempt refused for one key
+does not use up the others.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: int, maxsize: int = 100_000):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Token bucket needs a positive rate and burst (got rate={rate}, burst={burst})")
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (float(self.burst), now))
+        return min(float(self.burst), tokens + (now - updated) * self.rate)
+
+    def wait_time(self, key: str) -> float:
+        """Seconds until key has a token (0 if it has one now), without taking it."""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def reject(self):
+        """Count an attempt refused without calling acquire()."""
+        with self._lock:
+            self.rejected += 1
+
+    def acquire(self, key: str) -> float:
+        """Take one token for key: 0 if granted, else the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "keys": len(self),
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+def acquire_all(limits: list) -> float:
+    """
+    Take one token for every (limiter, key) pair, or for none of them:
+    0 if all were granted, else the longest wait.
+    """
+    waits = [limiter.wait_time(key) for limiter, key in limits]
+    if any(waits):
+        for (limiter, _), wait in zip(limits, waits):
+            if wait:
+                limiter.reject()
+        return max(waits)
+    return max((limiter.acquire(key) for limiter, key in limits), default=0.0)
@@ -0,0 +1,434 @@
+"""
+SakhiCircle: MongoDB Repositories
+Every database read and write the API makes, built on PyMongo's async driver
+(AsyncMongoClient) so request handlers await MongoDB instead of blocking the
+event loop. One repository per collection; endpoints never touch collections
+directly.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
+
+from loan_states import DECIDED_STATUSES, OPEN_STATUSES
+
+PREDICTION_LOGS_COLLECTION = "shg_logs"
+LOAN_REQUESTS_COLLECTION = "loan_requests"
+USERS_COLLECTION = "users"
+TOKENS_COLLECTION = "auth_tokens"
+SCORE_LOGS_COLLECTION = "score_logs"
+SCORE_ROLLUPS_COLLECTION = "score_rollups"
+SHG_GROUPS_COLLECTION = "shg_groups"
+
+
+async def connect(uri: str, max_pool_size: int = 200, min_pool_size: int = 10,
+                  max_connecting: int = 8, server_selection_timeout_ms: int = 5000,
+                  event_listeners: Optional[list] = None) -> AsyncMongoClient:
+    """
+    Open a client and ping the server.
+
+    The pool is sized for many concurrent requests waiting on a remote cluster:
+    max_pool_size caps open connections per worker process, min_pool_size keeps
+    warm connections after idle periods and max_connecting limits how many new
+    connections are opened at once during a burst. event_listeners are
+    pymongo.monitoring listeners (see metrics.py).
+    """
+    client = AsyncMongoClient(
+        uri,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min_pool_size,
+        maxConnecting=max_connecting,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+        event_listeners=event_listeners or []
+    )
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        await client.close()
+        raise
+    return client
+
+
+def _score_bin(field: str, width: int) -> dict:
+    """Lower bound of the histogram bin of a 0-100 score (100 joins the top bin); null if not a number."""
+    return {"$cond": [
+        {"$isNumber": field},
+        {"$max": [0, {"$min": [{"$multiply": [{"$floor": {"$divide": [field, width]}}, width]}, 100 - width]}]},
+        None
+    ]}
+
+
+def _hours_between(start: str, end) -> dict:
+    """Hours between two ISO timestamp strings; null if either is missing."""
+    def as_date(value):
+        # isoformat() writes microseconds; $dateFromString takes milliseconds
+        return {"$dateFromString": {"dateString": {"$substrBytes": [value, 0, 23]}, "onError": None, "onNull": None}}
+    return {"$divide": [{"$subtract": [as_date(end), as_date(start)]}, 3_600_000]}
+
+
+def _sorted_median(group_key, field: str) -> list:
+    """Facet stages for the exact (lower) median of field per group, for servers without $median."""
+    middle = {"$floor": {"$divide": [{"$subtract": [{"$size": "$values"}, 1]}, 2]}}
+    return [
+        {"$match": {field: {"$ne": None}}},
+        {"$sort": {field: 1}},
+        {"$group": {"_id": group_key, "values": {"$push": f"${field}"}}},
+        {"$project": {field: {"$arrayElemAt": ["$values", middle]}}}
+    ]
+
+
+class _Repository:
+    """Base class: wraps one async collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find_page(self, query: dict, projection: Optional[dict], sort: list, limit: int):
+        """Async cursor over one sorted page (used by the streaming list endpoints)."""
+        return self.collection.find(query, projection).sort(sort).limit(limit)
+
+
+class PredictionLogRepository(_Repository):
+    """shg_logs: one document per scored prediction."""
+
+    async def insert_many(self, entries: list):
+        await self.collection.insert_many(entries, ordered=False)
+
+    async def recent(self, limit: int) -> list:
+        return await self.collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list()
+
+
+class UserRepository(_Repository):
+    """users: accounts and their roles."""
+
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        return await self.collection.find_one({"username": username})
+
+    async def set_password(self, user_id, password_hash: str):
+        await self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": {"password": password_hash}})
+
+    async def find_by_id(self, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": ObjectId(user_id)})
+
+    async def insert(self, user: dict) -> str:
+        result = await self.collection.insert_one(user)
+        return str(result.inserted_id)
+
+    async def delete(self, user_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": ObjectId(user_id)})
+        return result.deleted_count > 0
+
+    async def set_shg_name(self, username: str, shg_name: str):
+        await self.collection.update_one({"username": username}, {"$set": {"shg_name": shg_name}})
+
+    async def branches_by_shg(self) -> dict:
+        """shg_name -> branch_id of the SHG's admin (representative) account."""
+        admins = await self.collection.find(
+            {"role": "admin", "shg_name": {"$nin": [None, ""]}}, {"shg_name": 1, "branch_id": 1}
+        ).to_list()
+        return {admin["shg_name"]: admin.get("branch_id", "") for admin in admins}
+
+    async def members(self, shg_name: str) -> list:
+        """SHG members (role user), without password hashes."""
+        return await self.collection.find({"shg_name": shg_name, "role": "user"}, {"password": 0}).to_list()
+
+
+class TokenRepository(_Repository):
+    """auth_tokens: opaque session tokens (expired ones are removed by a TTL index)."""
+
+    async def insert(self, token: str, user_id: str, expires_at: datetime):
+        await self.collection.insert_one({
+            "token": token,
+            "user_id": user_id,
+            "created_at": datetime.utcnow(),
+            "expires_at": expires_at
+        })
+
+    async def find_valid(self, token: str) -> Optional[dict]:
+        return await self.collection.find_one({"token": token, "expires_at": {"$gt": datetime.utcnow()}})
+
+    async def delete(self, token: str):
+        await self.collection.delete_one({"token": token})
+
+    async def delete_for_user(self, user_id: str):
+        await self.collection.delete_many({"user_id": user_id})
+
+
+class LoanRequestRepository(_Repository):
+    """loan_requests: loan applications and their review state."""
+
+    TIMING_FIELDS = ("decision_hours", "admin_review_hours", "manager_review_hours")
+    # Set to False once the server rejects $median (MongoDB before 7.0)
+    server_has_median = True
+
+    async def insert(self, request: dict) -> str:
+        result = await self.collection.insert_one(request)
+        return str(result.inserted_id)
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one(query, projection)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        """Apply update to the first match in one round trip; the updated document, or None."""
+        return await self.collection.find_one_and_update(
+            query, update, projection=projection, return_document=ReturnDocument.AFTER
+        )
+
+    async def find_many(self, query: dict, projection: Optional[dict] = None) -> list:
+        return await self.collection.find(query, projection).to_list()
+
+    async def bulk_update(self, updates: list):
+        """(query, update) pairs applied as update_one's in a single unordered bulk_write."""
+        await self.collection.bulk_write([UpdateOne(query, update) for query, update in updates], ordered=False)
+
+    async def watch_status_changes(self, exclude_fields: tuple, resume_after: Optional[dict] = None):
+        """Change stream of inserts and status updates with the full document, minus exclude_fields."""
+        pipeline = [
+            {"$match": {"$or": [
+                {"operationType": "insert"},
+                {"operationType": "update", "updateDescription.updatedFields.status": {"$exists": True}}
+            ]}},
+            {"$project": {f"fullDocument.{field}": 0 for field in exclude_fields}}
+        ]
+        return await self.collection.watch(pipeline, full_document="updateLookup", resume_after=resume_after)
+
+    async def flag_open_applications(self) -> int:
+        """Mark requests under review from before open_application existed; run before the unique index is built."""
+        result = await self.collection.update_many(
+            {"status": {"$in": OPEN_STATUSES}, "open_application": {"$exists": False}},
+            {"$set": {"open_application": True}}
+        )
+        return result.modified_count
+
+    async def portfolio(self, query: dict, score_bin_width: int) -> dict:
+        """
+        Portfolio figures for the requests matching query, in one aggregation
+        whose $facet branches return only grouped rows:
+
+            shgs        count and loan_amount sum per (branch, SHG, status)
+            score_bins  request count per (branch, SHG, score bin)
+            timings_*   median hours to decision, admin review and manager
+                        review, per SHG, per branch and overall
+
+        Medians cannot be combined from parts, hence the three timing facets.
+        They use $median (MongoDB 7.0+); older servers get the same rows from
+        a $sort / $push facet per field.
+        """
+        if self.server_has_median:
+            try:
+                return await self._portfolio(query, score_bin_width, median=True)
+            except OperationFailure as e:
+                if "$median" not in str(e):
+                    raise
+                print("⚠️ MongoDB has no $median (needs 7.0); portfolio medians use $sort / $push instead")
+                self.server_has_median = False
+        return await self._portfolio(query, score_bin_width, median=False)
+
+    async def _portfolio(self, query: dict, score_bin_width: int, median: bool) -> dict:
+        decided_at = {"$ifNull": ["$reviewed_at", "$rejected_at", "$updated_at"]}
+        shg_key = {"branch_id": "$branch_id", "shg_name": "$shg_name"}
+        timing_keys = {"timings_by_shg": shg_key, "timings_by_branch": "$branch_id", "timings_overall": None}
+        if median:
+            medians = {
+                field: {"$median": {"input": f"${field}", "method": "approximate"}}
+                for field in self.TIMING_FIELDS
+            }
+            timing_facets = {name: [{"$group": {"_id": key, **medians}}] for name, key in timing_keys.items()}
+        else:
+            timing_facets = {
+                f"{name}_{field}": _sorted_median(key, field)
+                for name, key in timing_keys.items() for field in self.TIMING_FIELDS
+            }
+        pipeline = [
+            {"$match": query},
+            {"$project": {
+                "_id": 0,
+                "branch_id": {"$ifNull": ["$branch_id", ""]},
+                "shg_name": {"$ifNull": ["$shg_name", ""]},
+                "status": 1,
+                "loan_amount": {"$cond": [{"$isNumber": "$loan_amount"}, "$loan_amount", None]},
+                "score_bin": _score_bin("$score", score_bin_width),
+                "decision_hours": {"$cond": [
+                    {"$in": ["$status", DECIDED_STATUSES]}, _hours_between("$submitted_at", decided_at), None
+                ]},
+                "admin_review_hours": _hours_between("$submitted_at", {"$ifNull": ["$forwarded_at", "$rejected_at"]}),
+                "manager_review_hours": _hours_between("$forwarded_at", "$reviewed_at")
+            }},
+            {"$facet": {
+                "shgs": [{"$group": {
+                    "_id": {**shg_key, "status": "$status"},
+                    "count": {"$sum": 1},
+                    "amount_sum": {"$sum": "$loan_amount"},
+                    "amount_count": {"$sum": {"$cond": [{"$isNumber": "$loan_amount"}, 1, 0]}}
+                }}],
+                "score_bins": [
+                    {"$match": {"score_bin": {"$ne": None}}},
+                    {"$group": {"_id": {**shg_key, "bin": "$score_bin"}, "count": {"$sum": 1}}}
+                ],
+                **timing_facets
+            }}
+        ]
+        result = {}
+        async for result in await self.collection.aggregate(pipeline, allowDiskUse=True):
+            break
+        if not median:
+            # One facet per (level, field) -> one row per group with every field, as $group gives
+            for name in timing_keys:
+                rows = {}
+                for field in self.TIMING_FIELDS:
+                    for row in result.pop(f"{name}_{field}", []):
+                        key = tuple(row["_id"].values()) if isinstance(row["_id"], dict) else row["_id"]
+                        rows.setdefault(key, {"_id": row["_id"]})[field] = row.get(field)
+                result[name] = list(rows.values())
+        return result
+
+    async def recent_for_shg(self, shg_name: str, projection: dict, limit: int) -> list:
+        return await self.collection.find({"shg_name": shg_name}, projection).sort("submitted_at", -1).limit(limit).to_list()
+
+    async def set_explanation_ref(self, doc_id, ref: Optional[str]):
+        """Point a request at its stored image and drop any inline copy."""
+        update = {"$unset": {"explanation_image": ""}}
+        if ref:
+            update["$set"] = {"explanation_image_ref": ref}
+        await self.collection.update_one({"_id": doc_id}, update)
+
+    async def with_inline_images(self, limit: int) -> list:
+        return await self.collection.find(
+            {"explanation_image": {"$type": "string", "$ne": ""}},
+            {"explanation_image": 1}
+        ).limit(limit).to_list()
+
+    async def count_inline_images(self) -> int:
+        return await self.collection.count_documents({"explanation_image": {"$type": "string", "$ne": ""}})
+
+
+class ScoreLogRepository(_Repository):
+    """score_logs: every score an SHG representative recorded, for trend views."""
+
+    async def insert(self, entry: dict):
+        await self.collection.insert_one(entry)
+
+    async def history(self, shg_name: str, limit: int) -> list:
+        """Newest first."""
+        return await self.collection.find({"shg_name": shg_name}).sort("timestamp", -1).limit(limit).to_list()
+
+    async def monthly_rollups(self) -> list:
+        """score_rollups documents recomputed from every log (timestamps are ISO strings, so YYYY-MM is a prefix)."""
+        pipeline = [
+            {"$match": {"calculated_score": {"$type": "number"}}},
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": {"shg_name": "$shg_name", "month": {"$substrBytes": ["$timestamp", 0, 7]}},
+                "branch_id": {"$last": "$branch_id"},
+                "count": {"$sum": 1},
+                "score_sum": {"$sum": "$calculated_score"},
+                "score_min": {"$min": "$calculated_score"},
+                "score_max": {"$max": "$calculated_score"},
+                "last": {"$last": {"timestamp": "$timestamp", "score": "$calculated_score", "risk": "$risk_status"}}
+            }}
+        ]
+        rollups = []
+        async for row in await self.collection.aggregate(pipeline, allowDiskUse=True):
+            key = row.pop("_id")
+            rollups.append({**key, **row})
+        return rollups
+
+    async def score_bins(self, score_bin_width: int, since: Optional[str] = None, until: Optional[str] = None) -> list:
+        """Logged score count and sum per SHG and score bin, for logs in [since, until) (ISO strings)."""
+        query = {"calculated_score": {"$type": "number"}}
+        window = {key: value for key, value in (("$gte", since), ("$lt", until)) if value}
+        if window:
+            query["timestamp"] = window
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": {"shg_name": "$shg_name", "bin": _score_bin("$calculated_score", score_bin_width)},
+                "branch_id": {"$max": "$branch_id"},
+                "count": {"$sum": 1},
+                "score_sum": {"$sum": "$calculated_score"}
+            }}
+        ]
+        rows = []
+        async for row in await self.collection.aggregate(pipeline, allowDiskUse=True):
+            rows.append({**row.pop("_id"), **row})
+        return rows
+
+
+class ScoreRollupRepository(_Repository):
+    """
+    score_rollups: one document per SHG and month (YYYY-MM) with the count,
+    sum, min and max of the scores logged and the latest one, maintained by
+    record() on every /score/log so trend views read one document per month.
+    """
+
+    async def record(self, shg_name: str, branch_id: str, month: str, timestamp: str, score: float,
+                     risk: str):
+        """Fold one logged score into its month in a single atomic upsert."""
+        update = {
+            "$inc": {"count": 1, "score_sum": score},
+            "$min": {"score_min": score},
+            # Embedded documents compare field by field, so the newest timestamp wins
+            "$max": {"score_max": score, "last": {"timestamp": timestamp, "score": score, "risk": risk}}
+        }
+        if branch_id:
+            update["$set"] = {"branch_id": branch_id}
+        await self.collection.update_one({"shg_name": shg_name, "month": month}, update, upsert=True)
+
+    async def for_shg(self, shg_name: str, since_month: str) -> list:
+        """Oldest month first."""
+        return await self.collection.find(
+            {"shg_name": shg_name, "month": {"$gte": since_month}}, {"_id": 0}
+        ).sort("month", 1).to_list()
+
+    async def for_branch(self, branch_id: str, since_month: str) -> list:
+        """Every SHG of a branch, by SHG and then month."""
+        return await self.collection.find(
+            {"branch_id": branch_id, "month": {"$gte": since_month}}, {"_id": 0}
+        ).sort([("shg_name", 1), ("month", 1)]).to_list()
+
+    async def replace_all(self, rollups: list) -> int:
+        """
+        Overwrite the (SHG, month) documents given, e.g. from
+        ScoreLogRepository.monthly_rollups(). A score logged while this runs
+        may be overwritten; the next rebuild counts it again.
+        """
+        requests = [
+            ReplaceOne({"shg_name": rollup["shg_name"], "month": rollup["month"]}, rollup, upsert=True)
+            for rollup in rollups
+        ]
+        for start in range(0, len(requests), 1000):
+            await self.collection.bulk_write(requests[start:start + 1000], ordered=False)
+        return len(requests)
+
+
+class ShgGroupRepository(_Repository):
+    """shg_groups: the current financial data and score of each SHG."""
+
+    async def find(self, shg_name: str) -> Optional[dict]:
+        return await self.collection.find_one({"shg_name": shg_name})
+
+    async def upsert(self, shg_name: str, fields: dict):
+        await self.collection.update_one({"shg_name": shg_name}, {"$set": fields}, upsert=True)
+
+    async def current_scores(self) -> list:
+        """shg_name, score and risk of every group (one small document per SHG)."""
+        return await self.collection.find(
+            {"shg_name": {"$nin": [None, ""]}}, {"_id": 0, "shg_name": 1, "score": 1, "risk": 1}
+        ).to_list()
+
+
+class Repositories:
+    """All repositories over one database."""
+
+    def __init__(self, database):
+        self.db = database
+        self.prediction_logs = PredictionLogRepository(database[PREDICTION_LOGS_COLLECTION])
+        self.loan_requests = LoanRequestRepository(database[LOAN_REQUESTS_COLLECTION])
+        self.users = UserRepository(database[USERS_COLLECTION])
+        self.tokens = TokenRepository(database[TOKENS_COLLECTION])
+        self.score_logs = ScoreLogRepository(database[SCORE_LOGS_COLLECTION])
+        self.score_rollups = ScoreRollupRepository(database[SCORE_ROLLUPS_COLLECTION])
+        self.shg_groups = ShgGroupRepository(database[SHG_GROUPS_COLLECTION])
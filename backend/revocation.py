@@ -0,0 +1,66 @@
+"""
+SakhiCircle: Signed Token Revocation
+Signed tokens cannot be deleted, so a logout or a user change is recorded as
+"revoked at" time and checked against each token's issue time (iat): a
+token is refused when it was issued at or before the revocation, while tokens
+issued later (the user logging in again) are accepted.
+
+An entry is kept for ttl seconds, after which every token it could refuse has
+expired, and is never evicted before that. When maxsize live entries are held,
+the list fails closed: it moves one watermark to now instead, which refuses
+every token issued so far, so everyone logs in again rather than a revoked
+token quietly working.
+
+State is per process, like the session cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class RevocationList:
+    def __init__(self, ttl: float, maxsize: int = 100_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key -> revoked_at, oldest revocation first
+        self._revoked: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.revoked_all_at = 0.0
+        self.overflows = 0
+
+    def _expire(self, now: float):
+        while self._revoked:
+            key, revoked_at = next(iter(self._revoked.items()))
+            if revoked_at + self.ttl > now:
+                break
+            del self._revoked[key]
+
+    def revoke(self, key: str, at: Optional[float] = None):
+        """Refuse tokens for key issued at or before `at` (default now)."""
+        at = time.time() if at is None else at
+        with self._lock:
+            self._expire(at)
+            if key not in self._revoked and len(self._revoked) >= self.maxsize:
+                self.revoked_all_at = max(self.revoked_all_at, at)
+                self.overflows += 1
+                return
+            self._revoked[key] = max(at, self._revoked.pop(key, at))
+
+    def is_revoked(self, key: str, issued_at: float) -> bool:
+        if issued_at <= self.revoked_all_at:
+            return True
+        revoked_at = self._revoked.get(key)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "overflows": self.overflows
+        }
@@ -0,0 +1,186 @@
+"""
+SakhiCircle: SHAP Waterfall Renderer
+Renders SHAP waterfall plots in a bounded process pool so matplotlib never
+runs on the API event loop (pyplot state is not thread-safe).
+matplotlib and shap are imported by the worker processes, not the API process.
+"""
+
+import asyncio
+import base64
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+
+
+def render_shap_waterfall(shap_vals, expected_val: float, row, feature_names: list) -> bytes:
+    """
+    Render a SHAP waterfall plot for a single row and return the PNG bytes.
+    """
+    # Heavy imports happen on first render in each worker (or inline)
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend for server
+    import matplotlib.pyplot as plt
+    import shap
+    
+    # Create SHAP Explanation object for waterfall plot
+    explanation = shap.Explanation(
+        values=np.asarray(shap_vals, dtype=float),
+        base_values=float(expected_val),
+        data=np.asarray(row, dtype=float),
+        feature_names=feature_names
+    )
+
+    # Create figure with custom styling
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plt.style.use('default')
+
+    # Generate waterfall plot
+    shap.plots.waterfall(explanation, max_display=10, show=False)
+
+    # Customize the plot
+    plt.title("🔍 AI Explanation: What Influenced Your Score?", fontsize=14, fontweight='bold', pad=20)
+    plt.xlabel("Impact on Model Output (Low Risk Probability)", fontsize=10)
+    plt.tight_layout()
+
+    # Save to BytesIO buffer
+    buffer = BytesIO()
+    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight',
+                facecolor='white', edgecolor='none')
+    plt.close('all')
+
+    return buffer.getvalue()
+
+
+def to_data_uri(png: bytes) -> str:
+    """Encode PNG bytes as a Base64 data URI for inline embedding."""
+    img_base64 = base64.b64encode(png).decode('utf-8')
+    return f"data:image/png;base64,{img_base64}"
+
+
+def _warm_up() -> bool:
+    """Render a throwaway plot so each worker pays its import and font-cache cost ahead of traffic."""
+    render_shap_waterfall([0.1, -0.1], 0.5, [1.0, 1.0], ["a", "b"])
+    return True
+
+
+class RenderPool:
+    """
+    Bounded process pool for waterfall rendering.
+
+    At most max_workers renders run at once and at most max_queue more wait
+    behind them. When the pool is saturated, or a render exceeds the timeout,
+    render() returns None so the caller can fall back to numeric SHAP values.
+    With max_workers=0 rendering happens inline (the old synchronous behavior).
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warmups: list = []
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def start(self):
+        """Create the worker processes and warm them up."""
+        if self.max_workers <= 0 or self._executor is not None:
+            return
+        # spawn, not fork: the parent already runs pymongo monitor threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._warmups = [self._executor.submit(_warm_up) for _ in range(self.max_workers)]
+
+    @property
+    def ready(self) -> bool:
+        """True once every worker has finished its warm-up render (always true inline)."""
+        return self.max_workers <= 0 or (
+            self._executor is not None and all(f.done() for f in self._warmups)
+        )
+
+    def shutdown(self):
+        """Stop the worker processes, cancelling queued renders."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Renders currently running or waiting for a worker."""
+        return self._in_flight
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def render(self, shap_vals, expected_val: float, row, feature_names: list) -> Optional[bytes]:
+        """Render a waterfall PNG, or return None if the pool is saturated or too slow."""
+        args = (
+            [float(v) for v in shap_vals],
+            float(expected_val),
+            [float(v) for v in row],
+            list(feature_names)
+        )
+
+        if self.max_workers <= 0:
+            return render_shap_waterfall(*args)
+
+        if self._executor is None:
+            self.start()
+
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                return None
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(render_shap_waterfall, *args)
+        except BrokenProcessPool:
+            self._release(None)
+            self.failures += 1
+            # A worker died; replace the pool for the next caller
+            self.shutdown()
+            return None
+
+        # Slot is freed when the worker finishes, even if we stopped waiting
+        future.add_done_callback(self._release)
+
+        try:
+            image = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            self.completed += 1
+            return image
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ SHAP render worker error: {e}")
+            if isinstance(e, BrokenProcessPool):
+                self.shutdown()
+            return None
+
+    def stats(self) -> dict:
+        """Pool counters for /health."""
+        return {
+            "ready": self.ready,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failures": self.failures
+        }
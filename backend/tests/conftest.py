@@ -0,0 +1,6 @@
+"""Tests import the backend's flat modules the same way main.py does."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+"""Spilled audit records are written back exactly once, even with several workers sharing the file."""
+
+import asyncio
+import threading
+import time
+
+from audit_log import AuditLogger
+from file_lock import file_lock
+
+
+def test_workers_sharing_a_spill_file_replay_each_record_once(tmp_path):
+    spill_path = str(tmp_path / "audit_spill.jsonl")
+    written = []
+
+    async def slow_insert(batch):
+        await asyncio.sleep(0.01)
+        written.extend(entry["n"] for entry in batch)
+
+    async def scenario():
+        workers = [AuditLogger(slow_insert, batch_size=10, spill_path=spill_path) for _ in range(3)]
+        # Not started, so every record goes straight to the shared spill file
+        for i, worker in enumerate(workers):
+            await worker.log_many([{"n": i * 100 + n} for n in range(25)])
+        await asyncio.gather(*(worker._replay() for worker in workers))
+        return workers
+
+    workers = asyncio.run(scenario())
+
+    assert sorted(written) == sorted(i * 100 + n for i in range(3) for n in range(25))
+    assert sum(worker.replayed for worker in workers) == 75
+    assert not any(worker._spill_pending() for worker in workers)
+
+
+def test_spill_waiting_for_another_workers_lock_does_not_block_the_event_loop(tmp_path):
+    spill_path = str(tmp_path / "audit_spill.jsonl")
+    logger = AuditLogger(None, spill_path=spill_path)
+    locked, release = threading.Event(), threading.Event()
+
+    def other_worker():
+        with file_lock(f"{spill_path}.lock"):
+            locked.set()
+            release.wait(5)
+    holder = threading.Thread(target=other_worker)
+    holder.start()
+    locked.wait(5)
+
+    async def scenario():
+        spill = asyncio.create_task(logger.log({"n": 1}))
+        ticks = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not spill.done()
+        release.set()
+        await spill
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    holder.join()
+    assert ticks >= 10
+    assert logger.spilled == 1 and logger.dropped == 0
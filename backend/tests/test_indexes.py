@@ -0,0 +1,41 @@
+"""
+Every registered query shape is served by its registered index. Needs a
+MongoDB server: set MONGO_URI (the check uses and then drops a scratch
+database, MONGO_TEST_DB_NAME, default sakhiscore_test).
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from indexes import QUERY_SHAPES, check_query_plans, ensure_indexes
+
+MONGO_URI = os.getenv("MONGO_URI")
+
+
+async def _check_plans(db_name: str):
+    from pymongo import AsyncMongoClient
+
+    client = AsyncMongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        await client.drop_database(db_name)
+        created = await ensure_indexes(client[db_name])
+        return created, await check_query_plans(client[db_name])
+    finally:
+        await client.drop_database(db_name)
+        await client.close()
+
+
+@pytest.mark.skipif(not MONGO_URI, reason="MONGO_URI not set")
+def test_query_plans_use_registered_indexes():
+    created, plans = asyncio.run(_check_plans(os.getenv("MONGO_TEST_DB_NAME", "sakhiscore_test")))
+
+    assert [entry for entry in created if not entry["ok"]] == []
+    assert len(plans) == len(QUERY_SHAPES)
+    failures = [
+        f"{plan['endpoint']}: expected {plan['expected_index']}, used {plan['used_indexes'] or 'none'}"
+        f"{' (COLLSCAN)' if plan['collscan'] else ''}{' (in-memory SORT)' if plan['blocking_sort'] else ''}"
+        for plan in plans if not plan["ok"]
+    ]
+    assert failures == []
@@ -0,0 +1,67 @@
+"""Compiled inference agrees with the sklearn and shap models it replaces."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import CompiledForest, TreeShap, sample_inputs
+from model_trainer import FEATURE_NAMES, generate_synthetic_data, train_model
+
+# Both average the same per-leaf fractions, so only summation order differs
+PROBA_TOLERANCE = 1e-12
+# Measured worst case is ~1e-14; anything near 1e-12 is a real divergence
+SHAP_TOLERANCE = 1e-12
+
+
+@pytest.fixture(scope="module")
+def forest():
+    params = {"n_estimators": 20, "max_depth": 8, "min_samples_split": 5, "min_samples_leaf": 2}
+    return train_model(generate_synthetic_data(1000, random_state=7), n_jobs=1, params=params)
+
+
+def _threshold_rows(forest):
+    """One row per split, with the split feature set exactly on and just either side of the threshold."""
+    rows = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        splits = tree.children_left >= 0
+        for feature, threshold in zip(tree.feature[splits], tree.threshold[splits]):
+            for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf)):
+                rows.append((feature, value))
+    X = sample_inputs(len(rows), seed=8)
+    for row, (feature, value) in zip(X, rows):
+        row[feature] = value
+    return X
+
+
+@pytest.mark.parametrize("rows", ["random", "thresholds"])
+def test_compiled_forest_matches_sklearn_predict_proba(forest, rows):
+    X = sample_inputs(2000, seed=3) if rows == "random" else _threshold_rows(forest)
+    compiled = CompiledForest(forest)
+    expected = forest.predict_proba(pd.DataFrame(X, columns=FEATURE_NAMES))
+
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=PROBA_TOLERANCE)
+    # Single rows take a separate code path
+    for i in range(0, len(X), max(1, len(X) // 50)):
+        np.testing.assert_allclose(compiled.predict_proba(X[i]), expected[i:i + 1], rtol=0, atol=PROBA_TOLERANCE)
+
+
+def _positive_class(values):
+    if isinstance(values, list):
+        return values[1]
+    values = np.asarray(values)
+    return values[:, :, 1] if values.ndim == 3 else values
+
+
+def test_tree_shap_matches_shap_tree_explainer(forest):
+    shap = pytest.importorskip("shap")
+    explainer = shap.TreeExplainer(forest)
+    tree_shap = TreeShap(forest)
+
+    for X in (sample_inputs(500, seed=5), sample_inputs(1, seed=6)):
+        np.testing.assert_allclose(
+            tree_shap.shap_values(X), _positive_class(explainer.shap_values(X)),
+            rtol=0, atol=SHAP_TOLERANCE
+        )
+    expected = np.asarray(explainer.expected_value).ravel()
+    assert abs(tree_shap.expected_value - expected[1 if expected.size > 1 else 0]) <= SHAP_TOLERANCE
@@ -0,0 +1,29 @@
+"""Password hashing calibration stays within its memory cap and runs once per machine."""
+
+import passwords
+from passwords import MIN_N, ScryptParams, calibrate, calibrate_shared, hash_password, verify_password
+
+
+def test_calibration_never_probes_past_the_memory_cap():
+    # A budget no hash could exceed: only the memory cap (2^15 at r=8) stops it
+    params, timings = calibrate(budget_ms=1e9, r=8, p=1, rounds=1, max_mem=32 * 1024 * 1024)
+    assert sorted(timings) == [MIN_N, 2 * MIN_N]
+    assert params == ScryptParams(2 * MIN_N, 8, 1)
+
+
+def test_calibration_is_measured_once_and_shared(tmp_path, monkeypatch):
+    path = str(tmp_path / "calibration.json")
+    first = calibrate_shared(path, budget_ms=1e9, max_mem=16 * 1024 * 1024)
+    assert first[0].n == MIN_N and first[2]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("calibrated again")
+    monkeypatch.setattr(passwords, "calibrate", fail)
+    assert calibrate_shared(path, budget_ms=1e9, max_mem=16 * 1024 * 1024) == (first[0], first[1], False)
+
+
+def test_hash_round_trip():
+    params = ScryptParams(MIN_N, 8, 1)
+    stored = hash_password("lakshmi123", params)
+    assert verify_password("lakshmi123", stored, params) == (True, False)
+    assert verify_password("wrong", stored, params) == (False, False)
@@ -0,0 +1,28 @@
+"""Login rate limiting refuses cleanly and never charges a bucket for a refused attempt."""
+
+import pytest
+
+from rate_limit import TokenBucketLimiter, acquire_all
+
+
+def test_attempt_refused_for_one_key_does_not_spend_the_others():
+    ip = TokenBucketLimiter(rate=1 / 60, burst=3)
+    user = TokenBucketLimiter(rate=1 / 60, burst=1)
+
+    assert acquire_all([(ip, "10.0.0.1"), (user, "lakshmi")]) == 0
+    for _ in range(5):
+        wait = acquire_all([(ip, "10.0.0.1"), (user, "lakshmi")])
+        assert 0 < wait <= 60
+
+    # The IP still has the two tokens the locked-out username did not use
+    assert acquire_all([(ip, "10.0.0.1"), (user, "radha")]) == 0
+    assert acquire_all([(ip, "10.0.0.1")]) == 0
+    assert acquire_all([(ip, "10.0.0.1")]) > 0
+    assert (user.allowed, user.rejected) == (2, 5)
+    assert (ip.allowed, ip.rejected) == (3, 1)
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 5), (-1, 5), (1, 0)])
+def test_limiter_rejects_settings_that_never_refill(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucketLimiter(rate=rate, burst=burst)
@@ -0,0 +1,33 @@
+"""Signed-token revocation refuses older tokens only, and never forgets one early."""
+
+from revocation import RevocationList
+
+
+def test_revocation_refuses_tokens_issued_before_it_only():
+    revoked = RevocationList(ttl=86400)
+    revoked.revoke("user-1", at=1000.0)
+
+    assert revoked.is_revoked("user-1", issued_at=900.0)
+    assert revoked.is_revoked("user-1", issued_at=1000.0)
+    # Logging in again after the revocation works at once
+    assert not revoked.is_revoked("user-1", issued_at=1000.5)
+    assert not revoked.is_revoked("user-2", issued_at=900.0)
+
+
+def test_revocations_expire_after_ttl_and_overflow_fails_closed():
+    revoked = RevocationList(ttl=100, maxsize=2)
+    revoked.revoke("a", at=1000.0)
+    revoked.revoke("b", at=1010.0)
+    revoked.revoke("c", at=1020.0)
+
+    # "c" did not fit: everything issued up to then is refused, "a" and "b" stay revoked
+    assert revoked.is_revoked("c", issued_at=1015.0)
+    assert revoked.is_revoked("unrelated", issued_at=1015.0)
+    assert not revoked.is_revoked("unrelated", issued_at=1021.0)
+    assert revoked.is_revoked("a", issued_at=1000.0) and revoked.is_revoked("b", issued_at=1010.0)
+    assert revoked.overflows == 1
+
+    # Once "a" has outlived every token it could refuse, its slot is reused
+    revoked.revoke("d", at=1105.0)
+    assert len(revoked) == 2 and revoked.overflows == 1
+    assert revoked.is_revoked("d", issued_at=1104.0)
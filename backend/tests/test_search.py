@@ -0,0 +1,67 @@
+"""Hyperparameter search: halving keeps the best candidates and picks one on the Pareto front."""
+
+import model_trainer
+from model_trainer import best_candidate, load_search_data, pareto_ranks, run_search
+
+
+def _dominates(a, b):
+    """a is at least as good as b on accuracy and both latencies, and better on one."""
+    at_least = a['accuracy'] >= b['accuracy'] and a['predict_us'] <= b['predict_us'] and a['shap_us'] <= b['shap_us']
+    return at_least and (a['accuracy'], a['predict_us'], a['shap_us']) != (b['accuracy'], b['predict_us'], b['shap_us'])
+
+
+def _key(params):
+    return tuple(sorted(params.items()))
+
+
+def test_pareto_ranks():
+    summaries = [
+        {'accuracy': 0.90, 'predict_us': 50, 'shap_us': 100},  # front: most accurate
+        {'accuracy': 0.85, 'predict_us': 20, 'shap_us': 40},   # front: fastest
+        {'accuracy': 0.85, 'predict_us': 30, 'shap_us': 40},   # behind the fastest only
+        {'accuracy': 0.80, 'predict_us': 60, 'shap_us': 120},  # behind everything
+    ]
+    assert pareto_ranks(summaries) == [0, 0, 1, 2]
+
+
+def test_halving_search_keeps_the_best_and_times_after_the_fits(tmp_path, monkeypatch):
+    events = []
+    evaluate_fold, measure_latency = model_trainer._evaluate_fold, model_trainer.measure_latency
+
+    def recording_fold(params, fold, folds, n_rows, seed):
+        events.append(('fit', n_rows))
+        return evaluate_fold(params, fold, folds, n_rows, seed)
+
+    def node_latency(inference):
+        # Deterministic stand-in for wall-clock timing: cost grows with the forest
+        events.append(('time', None))
+        arrays, _ = inference[0]
+        return {'predict_us': float(len(arrays['threshold'])), 'shap_us': float(inference[1][1]['n_leaves'])}
+
+    monkeypatch.setattr(model_trainer, '_evaluate_fold', recording_fold)
+    monkeypatch.setattr(model_trainer, 'measure_latency', node_latency)
+    X, y = load_search_data(n_samples=900, random_state=1)
+    summaries = run_search(X, y, strategy='halving', n_candidates=9, folds=2, cache_dir=str(tmp_path), random_state=1)
+
+    first = [s for s in summaries if s['round'] == 1]
+    second = [s for s in summaries if s['round'] == 2]
+    assert (len(first), len(second)) == (9, 3)
+    assert first[0]['rows'] < second[0]['rows'] == len(X)
+    # Survivors are the best third of round 1 by (Pareto rank, accuracy)
+    assert {_key(s['params']) for s in second} == {_key(s['params']) for s in first[:3]}
+    assert [(s['pareto_rank'], -s['accuracy']) for s in first] == sorted((s['pareto_rank'], -s['accuracy']) for s in first)
+
+    # Each round's candidates are timed only after all of its fits are done
+    for round_events in (events[:9 * 2 + 9], events[9 * 2 + 9:]):
+        kinds = [kind for kind, _ in round_events]
+        assert kinds == sorted(kinds) and kinds.count('time') * 2 == kinds.count('fit')
+
+    best = best_candidate(summaries)
+    assert best['round'] == 2 and best['pareto_rank'] == 0
+    assert not any(_dominates(other, best) for other in second)
+    assert best['accuracy'] == max(s['accuracy'] for s in second if s['pareto_rank'] == 0)
+
+    # A rerun is served from the cache: same result, nothing fitted or timed
+    events.clear()
+    rerun = run_search(X, y, strategy='halving', n_candidates=9, folds=2, cache_dir=str(tmp_path), random_state=1)
+    assert events == [] and rerun == summaries
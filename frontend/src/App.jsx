@@ -66,6 +66,44 @@ const getAuthHeaders = () => {
   return token ? { Authorization: `Bearer ${token}` } : {};
 };
 
+// ==================== PAGINATED LISTS ====================
+// Loan listings return one page (`limit`, default 100) plus `next_cursor`;
+// follow the cursor until it is null so dashboards see every request.
+const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      headers: getAuthHeaders(),
+      params: cursor ? { ...params, cursor } : params
+    });
+    items.push(...(response.data.requests || []));
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
+// ==================== LIVE LOAN UPDATES ====================
+// Subscribes to /loan/events (Server-Sent Events): onEvent gets each created or
+// changed loan request the server routes to this user; onResync means some were
+// missed and the list should be fetched again.
+const useLoanEvents = (onEvent, onResync) => {
+  useEffect(() => {
+    const token = localStorage.getItem('sakhiToken');
+    if (!token || typeof EventSource === 'undefined') return undefined;
+    const source = new EventSource(`${API_URL}/loan/events?token=${encodeURIComponent(token)}`);
+    source.addEventListener('loan', (e) => onEvent(JSON.parse(e.data)));
+    source.addEventListener('resync', () => onResync());
+    return () => source.close();
+  }, []);
+};
+
+// Put a changed request at the top of a queue while `keep` holds, otherwise drop it
+const applyLoanEvent = (list, event, keep) => {
+  const rest = list.filter(r => r._id !== event.request_id);
+  return keep ? [event.request, ...rest] : rest;
+};
+
 // ==================== LOGIN PAGE ====================
 function LoginPage({ onLoginSuccess, onShowRegister }) {
   const [loading, setLoading] = useState(false);
@@ -512,12 +550,14 @@ function AdminPanel({ user, onLogout }) {
     fetchPendingRequests();
   }, []);
 
+  useLoanEvents(
+    (event) => setPendingRequests(prev => applyLoanEvent(prev, event, event.status === 'Pending Admin Review')),
+    () => fetchPendingRequests()
+  );
+
   const fetchPendingRequests = async () => {
     try {
-      const response = await axios.get(`${API_URL}/loan/pending_admin_review`, {
-        headers: getAuthHeaders()
-      });
-      setPendingRequests(response.data.requests || []);
+      setPendingRequests(await fetchAllPages(`${API_URL}/loan/pending_admin_review`));
     } catch (err) {
       console.error('Failed to fetch pending requests:', err);
     }
@@ -845,12 +885,12 @@ function AdminPanel({ user, onLogout }) {
                   </div>
 
                   {/* SHAP Explanation */}
-                  {result.explanation_image && (
+                  {(result.explanation_url || result.explanation_image) && (
                     <div className="glass rounded-2xl p-6">
                       <h3 className="text-lg font-bold text-white mb-4">AI Explanation</h3>
                       <div className="bg-slate-800/50 rounded-xl p-4">
                         <img 
-                          src={result.explanation_image} 
+                          src={result.explanation_url ? `${API_URL}${result.explanation_url}` : result.explanation_image} 
                           alt="SHAP Explanation" 
                           className="w-full rounded-lg"
                         />
@@ -993,30 +1033,56 @@ function ManagerInbox({ user, onLogout }) {
   const [scoreHistory, setScoreHistory] = useState([]);  // New: Historical scores
   const [loadingHistory, setLoadingHistory] = useState(false);
   const [historyLoading, setHistoryLoading] = useState(false);
+  const [explanationImage, setExplanationImage] = useState(null); // SHAP image for selected request
 
   useEffect(() => {
     fetchRequests();
     fetchHistoryRequests();
   }, []);
 
+  useLoanEvents(
+    (event) => setRequests(prev => applyLoanEvent(
+      prev, event, event.status === 'Pending Manager Review' || event.status === 'Pending'
+    )),
+    () => fetchRequests()
+  );
+
   // Fetch score history when a request is selected
   useEffect(() => {
     if (selectedRequest?.shg_name) {
       fetchScoreHistory(selectedRequest.shg_name);
     }
+    setExplanationImage(null);
+    if (selectedRequest) {
+      fetchExplanationImage(selectedRequest);
+    }
   }, [selectedRequest]);
 
+  // Images are no longer embedded in list responses; load the selected one as a data URL
+  const fetchExplanationImage = async (req) => {
+    try {
+      const url = req.explanation_image_url
+        ? `${API_URL}${req.explanation_image_url}`
+        : `${API_URL}/loan/${req._id}/explanation_image`;
+      const response = await axios.get(url, {
+        headers: getAuthHeaders(),
+        responseType: 'blob'
+      });
+      const reader = new FileReader();
+      reader.onloadend = () => setExplanationImage(reader.result);
+      reader.readAsDataURL(response.data);
+    } catch (err) {
+      setExplanationImage(null);
+    }
+  };
+
   const fetchHistoryRequests = async () => {
     setHistoryLoading(true);
     try {
-      const response = await axios.get(`${API_URL}/loan/history`, {
-        headers: getAuthHeaders()
-      });
-      // Filter only approved/rejected (not pending statuses)
-      const processed = (response.data.requests || []).filter(r => 
-        r.status === 'Approved' || r.status === 'Rejected' || r.status === 'Rejected by Admin'
-      );
-      setHistoryRequests(processed);
+      // Only approved/rejected (not pending statuses), filtered server-side
+      setHistoryRequests(await fetchAllPages(`${API_URL}/loan/history`, {
+        status: 'Approved,Rejected,Rejected by Admin'
+      }));
     } catch (err) {
       console.error('Failed to fetch history:', err);
     } finally {
@@ -1046,16 +1112,12 @@ function ManagerInbox({ user, onLogout }) {
   const fetchRequests = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API_URL}/loan/all`, {
-        headers: getAuthHeaders()
-      });
-      setRequests(response.data.requests);
+      setRequests(await fetchAllPages(`${API_URL}/loan/all`));
     } catch (err) {
       console.error('Failed to fetch requests:', err);
       // Fallback to legacy endpoint
       try {
-        const fallback = await axios.get(`${API_URL}/get_requests?status=Pending`);
-        setRequests(fallback.data.requests);
+        setRequests(await fetchAllPages(`${API_URL}/get_requests`, { status: 'Pending' }));
       } catch (e) {
         console.error('Fallback also failed:', e);
       }
@@ -1206,7 +1268,7 @@ function ManagerInbox({ user, onLogout }) {
     yPos += 15;
 
     // SHAP Image (on new page if needed)
-    if (req.explanation_image) {
+    if (explanationImage) {
       if (yPos > 180) {
         doc.addPage();
         yPos = 20;
@@ -1216,7 +1278,7 @@ function ManagerInbox({ user, onLogout }) {
       doc.text('AI Explanation (SHAP Waterfall)', 20, yPos);
       yPos += 5;
       try {
-        doc.addImage(req.explanation_image, 'PNG', 20, yPos, 170, 100);
+        doc.addImage(explanationImage, 'PNG', 20, yPos, 170, 100);
       } catch (e) {
         doc.setFontSize(10);
         doc.setTextColor(150, 150, 150);
@@ -1435,11 +1497,11 @@ function ManagerInbox({ user, onLogout }) {
                 </div>
 
                 {/* SHAP Image */}
-                {selectedRequest.explanation_image && (
+                {explanationImage && (
                   <div className="bg-slate-800/50 rounded-xl p-4">
                     <p className="text-sm text-slate-400 mb-3">SHAP Waterfall Explanation</p>
                     <img 
-                      src={selectedRequest.explanation_image} 
+                      src={explanationImage} 
                       alt="SHAP Explanation" 
                       className="w-full rounded-lg"
                     />
@@ -1774,10 +1836,7 @@ function SHGDashboard({ user, onLogout }) {
       setGroupData(groupResponse.data);
 
       // Fetch my loan requests
-      const requestsResponse = await axios.get(`${API_URL}/loan/my_requests`, {
-        headers: getAuthHeaders()
-      });
-      setMyRequests(requestsResponse.data.requests || []);
+      setMyRequests(await fetchAllPages(`${API_URL}/loan/my_requests`));
     } catch (err) {
       console.error('Failed to fetch data:', err);
     } finally {